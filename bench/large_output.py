@@ -0,0 +1,83 @@
+'''
+Measure how fast the output of an example is read when the example
+prints a lot (PexpectMixin._expect_prompt).
+
+A shell example that prints <size> KB of numbers is run and the best
+time of <repeat> runs is reported.
+
+    $ python bench/large_output.py --size 8192
+
+The shell (bash) is needed.
+'''
+import argparse, os, tempfile, time
+
+from byexample.log import init_log_system
+from byexample.cmdline import parse_args
+from byexample.init import init
+
+
+def build_example(size):
+    # 'seq' prints about 8 bytes per line for these numbers
+    lines = size * 1024 // 8
+    return '''
+```
+$ seq 10000000 {last}      # byexample: +timeout=300 +output-limit={limit}
+10000000
+<...>
+{last}
+```
+'''.format(last=10000000 + lines - 1, limit=size * 1024 * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=8192,
+        help='size of the output in KB (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='take the best of these many runs (default: %(default)s).'
+    )
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, 'large-output.md')
+    with open(filename, 'wt') as f:
+        f.write(build_example(args.size))
+
+    init_log_system()
+    _, harvester, executor, _ = init(
+        parse_args(['-l', 'shell', '-q', '--pretty', 'none', filename])
+    )
+
+    # the runner is initialized (and shutdown) once per run
+    elapsed = float('inf')
+    for _ in range(args.repeat):
+        # an example cannot be parsed twice: get a fresh copy each run
+        examples = harvester.get_examples_from_file(filename)
+
+        begin = time.time()
+        failed, aborted, _, _ = executor.execute(examples, filename)
+        elapsed = min(elapsed, time.time() - begin)
+
+        if failed or aborted:
+            raise Exception("The example failed.")
+
+    os.unlink(filename)
+    os.rmdir(tmpdir)
+
+    print(
+        "%i KB of output read in %.3fs (%.1f MB/s)" %
+        (args.size, elapsed, args.size / 1024 / elapsed)
+    )
+
+
+if __name__ == '__main__':
+    main()
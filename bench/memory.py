@@ -0,0 +1,99 @@
+'''
+Measure how much memory the examples of a large file take once they
+are found and parsed (ExampleHarvest and Example.parse_yourself), like
+the examples of a generated API reference.
+
+A file with <examples> Python examples is generated; each example has
+an expected output of <lines> lines with a few tags. The memory
+allocated by the examples (traced with tracemalloc) is reported.
+
+The peak of memory when the examples are parsed while they are found
+(ExampleHarvest.iter_examples_from_file, like --dry does) is reported
+too.
+
+    $ python bench/memory.py --examples 100000
+
+The interpreters are not needed: the examples are parsed but not run.
+'''
+import argparse, os, tempfile, tracemalloc
+
+from byexample.log import init_log_system
+from byexample.cmdline import parse_args
+from byexample.init import init
+
+
+def build_file(nexamples, nlines):
+    doc = []
+    for k in range(nexamples):
+        expected = '\n'.join(
+            'item %i: <...>' % i if i % 4 == 0 else 'item %i: %i' % (i, k)
+            for i in range(nlines)
+        )
+        doc.append('```\n>>> api_call(%i)\n%s\n```\n' % (k, expected))
+    return '\n'.join(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--examples',
+        type=int,
+        default=20000,
+        help='examples in the file (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--lines',
+        type=int,
+        default=4,
+        help='lines of expected output per example (default: %(default)s).'
+    )
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, 'api-reference.md')
+    with open(filename, 'wt') as f:
+        f.write(build_file(args.examples, args.lines))
+
+    init_log_system()
+    _, harvester, executor, _ = init(
+        parse_args(['-l', 'python', '--dry', '-q', '--pretty', 'none', filename])
+    )
+
+    tracemalloc.start()
+    begin, _ = tracemalloc.get_traced_memory()
+
+    examples = harvester.get_examples_from_file(filename)
+    found, _ = tracemalloc.get_traced_memory()
+
+    executor.dry_execute(examples, filename)
+    parsed, peak = tracemalloc.get_traced_memory()
+
+    n = len(examples)
+    print(
+        "%i examples: found %.1f MB (%i bytes each), parsed %.1f MB (%i bytes each), peak %.1f MB"
+        % (
+            n, (found - begin) / 2**20, (found - begin) / n,
+            (parsed - begin) / 2**20, (parsed - begin) / n,
+            (peak - begin) / 2**20
+        )
+    )
+
+    del examples
+    tracemalloc.reset_peak()
+    begin, _ = tracemalloc.get_traced_memory()
+
+    executor.dry_execute(harvester.iter_examples_from_file(filename), filename)
+    _, peak = tracemalloc.get_traced_memory()
+    print(
+        "%i examples parsed while they are found: peak %.1f MB" %
+        (n, (peak - begin) / 2**20)
+    )
+
+    tracemalloc.stop()
+    os.unlink(filename)
+    os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+'''
+Compare how long takes to run long (multi-line) examples sending
+them line by line (the default) versus sending several lines at once
+(+batch-send).
+
+For each language, a file with <examples> examples of <lines> lines
+each is generated and executed by byexample with and without
++batch-send. The best time of <repeat> runs is reported.
+
+    $ python bench/send_modes.py -l python,shell --lines 400
+
+The gain grows with the lines per example and it depends on the
+interpreter. For shell, +batch-send was about 1.5x faster with 400
+lines, 1.2x with 100 lines and about the same with 10 lines; for
+Python there was no gain at all.
+
+Languages whose interpreter is not installed are skipped.
+'''
+import argparse, os, shutil, subprocess, sys, tempfile, time
+
+_byexample_cmd = [
+    sys.executable, '-c',
+    'import sys; from byexample.byexample import main; sys.exit(main())'
+]
+
+
+def python_snippets(nexamples, nlines):
+    for k in range(nexamples):
+        body = '\n'.join('...     s += 1' for _ in range(nlines))
+        yield '>>> def f%i():\n...     s = 0\n%s\n...     return s\n' % (
+            k, body
+        )
+        yield '>>> f%i()\n%i\n' % (k, nlines)
+
+
+def shell_snippets(nexamples, nlines):
+    for k in range(nexamples):
+        body = '\n'.join('>   s=$((s + 1))' for _ in range(nlines))
+        yield '$ f%i() {\n>   s=0\n%s\n>   echo $s\n> }\n' % (k, body)
+        yield '$ f%i\n%i\n' % (k, nlines)
+
+
+def ruby_snippets(nexamples, nlines):
+    for k in range(nexamples):
+        body = '\n'.join('..   s += 1' for _ in range(nlines))
+        yield '>> def f%i\n..   s = 0\n%s\n..   s\n.. end;\n' % (k, body)
+        yield '>> f%i\n=> %i\n' % (k, nlines)
+
+
+languages = {
+    'python': ('python', python_snippets),
+    'shell': ('bash', shell_snippets),
+    'ruby': ('irb', ruby_snippets),
+}
+
+
+def generate(dir, language, nexamples, nlines):
+    _, snippets = languages[language]
+    filename = os.path.join(dir, '%s.md' % language)
+    with open(filename, 'wt') as f:
+        for snippet in snippets(nexamples, nlines):
+            f.write('```\n%s```\n\n' % snippet)
+    return filename
+
+
+def run(filename, language, batch_send, timeout):
+    cmd = _byexample_cmd + [
+        '-l', language, '--pretty', 'none', '-q', '--timeout',
+        str(timeout), filename
+    ]
+    if batch_send:
+        cmd += ['-o', '+batch-send']
+
+    begin = time.time()
+    proc = subprocess.run(cmd)
+    elapsed = time.time() - begin
+
+    if proc.returncode != 0:
+        raise Exception(
+            "byexample failed (exit code %i): %s" %
+            (proc.returncode, ' '.join(cmd))
+        )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '-l',
+        '--languages',
+        default='python,ruby,shell',
+        help='languages to benchmark (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--examples',
+        type=int,
+        default=20,
+        help='examples per file (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--lines',
+        type=int,
+        default=400,
+        help='lines per example (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='take the best of these many runs (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=8,
+        help='timeout per example (default: %(default)s).'
+    )
+    args = parser.parse_args()
+
+    print(
+        "%-8s %12s %12s %8s" %
+        ('language', 'line-by-line', 'batch-send', 'speedup')
+    )
+    with tempfile.TemporaryDirectory() as dir:
+        for language in args.languages.split(','):
+            program, _ = languages[language]
+            if shutil.which(program) is None:
+                print("%-8s skipped: '%s' not found" % (language, program))
+                continue
+
+            filename = generate(dir, language, args.examples, args.lines)
+
+            times = {}
+            for batch_send in (False, True):
+                times[batch_send] = min(
+                    run(filename, language, batch_send, args.timeout)
+                    for _ in range(args.repeat)
+                )
+
+            print(
+                "%-8s %11.3fs %11.3fs %7.2fx" % (
+                    language, times[False], times[True],
+                    times[False] / times[True]
+                )
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+'''
+Run each stage of byexample over a synthetic corpus and save how long
+each one took as JSON to compare them between commits.
+
+The corpus has <files> files with <examples> examples each, written in
+the <languages>. The size of the expected output of each example varies
+from 1 to <lines> lines; a fraction of the lines have tags (<tags>),
+a fraction of the examples use +norm-ws (<norm-ws>) and another
+fraction type text with +input (<input>).
+
+The stages are:
+
+    zones           find the zones (ExampleHarvest._iter_zones)
+    find            find the examples
+                    (ExampleHarvest.get_examples_from_string)
+    parse           parse the examples (ExampleParser.parse that builds
+                    the regexs with expected_as_regexs)
+    check           check a good output (Expected.check_got_output)
+    captures-fail   get the captures of a bad output, the incremental
+                    match used to show a failure (Expected.get_captures),
+                    only for the first <failures> examples
+    run-j<n>        run the corpus with byexample --jobs <n>, end to end
+
+The best time of <repeat> runs of each stage is reported.
+
+The examples are checked with the given <match-engine> (+match-engine)
+and logged with the given <log-mask> (-x-log-mask): compare the
+results of different values to see how much each one costs.
+
+    $ python bench/suite.py --output before.json
+    $ git checkout <other commit>
+    $ python bench/suite.py --compare before.json --output after.json
+
+    $ python bench/suite.py --jobs 0 --match-engine linear
+    $ python bench/suite.py --jobs 0 --log-mask byexample.parser:chat
+
+The interpreters are needed only for the run-j<n> stages: disable them
+with --jobs 0.
+'''
+import argparse, json, multiprocessing, os, random, subprocess, sys
+import tempfile, time
+
+from byexample.log import init_log_system
+from byexample.cmdline import parse_args
+from byexample.init import init
+from byexample.finder import NewlineIndex
+from byexample import __version__
+
+_byexample_cmd = [
+    sys.executable, '-c',
+    'import sys; from byexample.byexample import main; sys.exit(main())'
+]
+
+
+def output_of(k, nlines):
+    return ['line %i of example %i' % (i, k) for i in range(1, nlines + 1)]
+
+
+def with_tags(k, lines, rnd, tags):
+    ''' Replace the number of some <lines> by a tag: a capture tag or
+        an ellipsis, alternating. '''
+    expected = []
+    for i, line in enumerate(lines):
+        if rnd.random() < tags:
+            tag = '<...>' if i % 2 else '<n%i>' % i
+            line = line.replace('line %i ' % (i + 1), 'line %s ' % tag, 1)
+        expected.append(line)
+    return expected
+
+
+def python_example(k, nlines):
+    return ">>> for i in range(1, %i): print('line %%i of example %i' %% i)" % (
+        nlines + 1, k
+    )
+
+
+def shell_example(k, nlines):
+    return "$ seq 1 %i | sed 's/.*/line & of example %i/'" % (nlines, k)
+
+
+def python_input():
+    return '>>> n = input("your name please: ")'
+
+
+def shell_input():
+    return "$ read -p 'your name please: ' n"
+
+
+languages = {
+    'python': (python_example, python_input),
+    'shell': (shell_example, shell_input),
+}
+
+
+def generate_example(language, k, rnd, args):
+    ''' Return the example as written in the file and the output
+        that the example should print. '''
+    example, input = languages[language]
+
+    if rnd.random() < args.input:
+        source = input() + '    # byexample: +input'
+        expected = 'your name please: [john]'
+        # the typed text is shown between brackets in the output too
+        return '%s\n%s\n' % (source, expected), expected + '\n'
+
+    nlines = rnd.randint(1, args.lines)
+    got = output_of(k, nlines)
+    expected = with_tags(k, got, rnd, args.tags)
+
+    source = example(k, nlines)
+    if rnd.random() < args.norm_ws:
+        source += '    # byexample: +norm-ws'
+        expected = [l.replace(' of ', '   of\t') for l in expected]
+
+    return '%s\n%s\n' % (source, '\n'.join(expected)), '\n'.join(got) + '\n'
+
+
+def generate_corpus(args):
+    ''' Return the content of each file and the outputs that its
+        examples should print, in order. '''
+    rnd = random.Random(args.seed)
+    langs = args.languages.split(',')
+
+    corpus = []
+    k = 0
+    for _ in range(args.files):
+        doc, gots = [], []
+        for _ in range(args.examples):
+            language = langs[k % len(langs)]
+            example, got = generate_example(language, k, rnd, args)
+            doc.append('Example %i\n\n```\n%s```\n' % (k, example))
+            gots.append(got)
+            k += 1
+        corpus.append(('\n'.join(doc), gots))
+
+    return corpus
+
+
+def best_of(repeat, func, prepare=lambda: None):
+    ''' Call <func> with what <prepare> returns <repeat> times and
+        return the best time. '''
+    elapsed = float('inf')
+    for _ in range(repeat):
+        arg = prepare()
+        begin = time.time()
+        func(arg)
+        elapsed = min(elapsed, time.time() - begin)
+    return elapsed
+
+
+def byexample_args(args):
+    ''' Return the command line arguments for byexample common to
+        all the stages. '''
+    cmdline = [
+        '-l', args.languages, '--pretty', 'none', '-q', '--options',
+        '+match-engine=%s' % args.match_engine
+    ]
+    if args.log_mask:
+        cmdline += ['-x-log-mask', args.log_mask]
+    return cmdline
+
+
+def in_process_stages(corpus, args):
+    init_log_system()
+    # init() needs a file to process even if we are not going to use it
+    _, harvester, _, _ = init(
+        parse_args(byexample_args(args) + ['--dry', __file__])
+    )
+    options = harvester.options
+
+    def find_all(_):
+        return [
+            harvester.get_examples_from_string(doc, 'f%i.md' % i)
+            for i, (doc, _) in enumerate(corpus)
+        ]
+
+    def parse_all(examples_by_file):
+        for examples in examples_by_file:
+            for example in examples:
+                example.parse_yourself(concerns=None)
+
+    def parsed_examples():
+        examples_by_file = find_all(None)
+        parse_all(examples_by_file)
+        return examples_by_file
+
+    def check_all(examples_by_file, bad=False):
+        pairs = []
+        for examples, (_, gots) in zip(examples_by_file, corpus):
+            assert len(examples) == len(gots)
+            pairs.extend(zip(examples, gots))
+
+        # the incremental match is slow: do it only on a few
+        if bad:
+            pairs = pairs[:args.failures]
+
+        for example, got in pairs:
+            options.up(example.options)
+            try:
+                if bad:
+                    # break the output in the middle
+                    lines = got.split('\n')
+                    lines[len(lines) // 2] = 'a bad line'
+                    got = '\n'.join(lines)
+                    example.expected.get_captures(example, got, options, 0)
+                elif not example.expected.check_got_output(
+                    example, got, options, 0
+                ):
+                    raise Exception(
+                        "The example did not pass:\n%s" % example.snippet
+                    )
+            finally:
+                options.down()
+
+    nexamples = sum(len(gots) for _, gots in corpus)
+    stages = [
+        (
+            'zones', lambda _: [
+                list(
+                    harvester._iter_zones(doc, 'f%i.md' % i, NewlineIndex(doc))
+                )
+                for i, (doc, _) in enumerate(corpus)
+            ]
+        ),
+        ('find', find_all),
+        ('parse', parse_all, lambda: find_all(None)),
+        ('check', check_all, parsed_examples),
+        (
+            'captures-fail', lambda e: check_all(e, bad=True),
+            parsed_examples
+        ),
+    ]
+
+    results = {}
+    for name, func, *prepare in stages:
+        elapsed = best_of(args.repeat, func, *prepare)
+        results[name] = {'seconds': elapsed, 'examples': nexamples}
+
+    results['captures-fail']['examples'] = min(nexamples, args.failures)
+    return results
+
+
+def end_to_end_stages(corpus, jobs, args):
+    results = {}
+    with tempfile.TemporaryDirectory() as dir:
+        filenames = []
+        for i, (doc, _) in enumerate(corpus):
+            filename = os.path.join(dir, 'f%i.md' % i)
+            with open(filename, 'wt') as f:
+                f.write(doc)
+            filenames.append(filename)
+
+        nexamples = sum(len(gots) for _, gots in corpus)
+        for n in jobs:
+            cmd = _byexample_cmd + byexample_args(args) + [
+                '--jobs', str(n), '--timeout',
+                str(args.timeout)
+            ] + filenames
+
+            def run(_):
+                proc = subprocess.run(cmd)
+                if proc.returncode != 0:
+                    raise Exception(
+                        "byexample failed (exit code %i): %s" %
+                        (proc.returncode, ' '.join(cmd))
+                    )
+
+            elapsed = best_of(args.repeat, run)
+            results['run-j%i' % n] = {
+                'seconds': elapsed,
+                'examples': nexamples
+            }
+    return results
+
+
+def jobs_from(string):
+    ''' Parse the list of jobs: "1,2,cpu" or "0" to skip
+        the end to end runs. By default, 1, 2, 4... up to the count
+        of cpus. '''
+    if string is None:
+        cpus = multiprocessing.cpu_count()
+        jobs = [1]
+        while jobs[-1] * 2 < cpus:
+            jobs.append(jobs[-1] * 2)
+        if cpus > 1:
+            jobs.append(cpus)
+        return jobs
+
+    jobs = []
+    for n in string.split(','):
+        n = multiprocessing.cpu_count() if n == 'cpu' else int(n)
+        if n > 0 and n not in jobs:
+            jobs.append(n)
+    return jobs
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def show(results, previous):
+    print(
+        "%-14s %10s %14s %12s" %
+        ('stage', 'time', 'per example', 'vs previous')
+    )
+    for name, r in results['stages'].items():
+        per_example = r['seconds'] / r['examples'] * 1e6
+
+        vs = ''
+        old = previous['stages'].get(name) if previous else None
+        if old:
+            vs = '%.2fx' % (old['seconds'] / r['seconds'])
+
+        print(
+            "%-14s %9.3fs %12.1fus %12s" %
+            (name, r['seconds'], per_example, vs)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '-l',
+        '--languages',
+        default='python,shell',
+        help='languages of the examples (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--files',
+        type=int,
+        default=10,
+        help='count of files (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--examples',
+        type=int,
+        default=50,
+        help='examples per file (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--lines',
+        type=int,
+        default=40,
+        help='maximum lines of expected output (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--tags',
+        type=float,
+        default=0.1,
+        help='fraction of the lines with a tag (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--norm-ws',
+        type=float,
+        default=0.2,
+        help='fraction of the examples with +norm-ws (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--input',
+        type=float,
+        default=0.05,
+        help='fraction of the examples with +input (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--failures',
+        type=int,
+        default=20,
+        help='examples checked against a bad output (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='seed to generate the corpus (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--match-engine',
+        default='regex',
+        choices=['regex', 'linear'],
+        help='the +match-engine to check the examples (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--log-mask',
+        default=None,
+        help='a -x-log-mask for byexample (default: none).'
+    )
+    parser.add_argument(
+        '--jobs',
+        default=None,
+        help='run the corpus end to end with these jobs, comma separated;\n'
+        '"cpu" means all the cpus; 0 disables the runs\n'
+        '(default: 1, 2, 4... up to the count of cpus).'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=8,
+        help='timeout per example (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='take the best of these many runs (default: %(default)s).'
+    )
+    parser.add_argument(
+        '--output',
+        metavar='<file>',
+        default=None,
+        help='save the results as JSON in <file>.'
+    )
+    parser.add_argument(
+        '--compare',
+        metavar='<file>',
+        default=None,
+        help='compare with the results saved in <file> (see --output).'
+    )
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'rt') as f:
+            previous = json.load(f)
+
+    corpus = generate_corpus(args)
+
+    stages = in_process_stages(corpus, args)
+    stages.update(end_to_end_stages(corpus, jobs_from(args.jobs), args))
+
+    results = {
+        'byexample': __version__,
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'cpus': multiprocessing.cpu_count(),
+        'params': {
+            k: v
+            for k, v in vars(args).items() if k not in ('output', 'compare')
+        },
+        'stages': stages,
+    }
+
+    if previous and previous['params'] != results['params']:
+        print(
+            "Warning: the results to compare with were got with other parameters."
+        )
+
+    show(results, previous)
+
+    if args.output:
+        with open(args.output, 'wt') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ if sys.version_info < (3, 0):
     sys.exit(1)
 
 from .cache import RegexCache
-from .jobs import Jobs, Status, allow_sigint
+from .jobs import Jobs, JobsHistory, Status, allow_sigint
 from .log import init_log_system
 
 
@@ -18,19 +18,61 @@ def execute_examples(filename, sigint_handler):
 
     with human_exceptions("processing the file '%s'" % filename) as exc, \
             cache.synced(label=filename), \
+            harvester.examples_cache.synced(label=filename), \
             allow_sigint(sigint_handler):
-        examples = harvester.get_examples_from_file(filename)
         if dry:
-            return executor.dry_execute(examples, filename)
-        else:
-            return executor.execute(examples, filename)
+            # parse each example while the rest are still being found
+            return executor.dry_execute(
+                harvester.iter_examples_from_file(filename), filename
+            )
+
+        examples = harvester.get_examples_from_file(filename)
+
+        results_cache = executor.results_cache
+        key = results_cache.key_of(filename, examples, options)
+        if results_cache.passed(key):
+            executor.concerns.event(
+                'cached_pass', filepath=filename, examples=examples
+            )
+            return False, False, False, False
+
+        failed, aborted, user_aborted, error = executor.execute(
+            examples, filename
+        )
+        if not (failed or aborted or user_aborted or error):
+            results_cache.record(key, filename)
+
+        return failed, aborted, user_aborted, error
 
     user_aborted = isinstance(exc.get('exc'), KeyboardInterrupt)
     error = not user_aborted
     return True, True, user_aborted, error
 
 
+def finalize_worker():
+    global executor
+    from .common import human_exceptions
+    from .runner import wait_for_reapers
+
+    with human_exceptions("shutting down the runners"):
+        try:
+            executor.shutdown_warm_runners()
+        finally:
+            wait_for_reapers()
+
+
 def main(args=None):
+    try:
+        return _main(args)
+    finally:
+        # the interpreters may be shutdown in background in this process
+        # too; if the runners were never loaded there is nothing to wait
+        runner = sys.modules.get('byexample.runner')
+        if runner is not None:
+            runner.wait_for_reapers()
+
+
+def _main(args):
     global cache, harvester, executor, options, dry
 
     init_log_system()
@@ -53,5 +95,25 @@ def main(args=None):
         if exc:
             sys.exit(Status.error)
 
-        jobs = Jobs(args.jobs)
-        return jobs.run(execute_examples, testfiles, options['fail_fast'])
+        # the history is used only to schedule the files among
+        # several jobs
+        if options['x']['no_jobs_history'] or args.jobs <= 1:
+            history = None
+        else:
+            history = JobsHistory(JobsHistory.default_filepath())
+
+        jobs = Jobs(args.jobs, history)
+        if args.watch:
+            from .watch import ChangedFiles
+            exit_status = jobs.run_and_watch(
+                execute_examples, testfiles, options['fail_fast'],
+                finalize_worker, ChangedFiles(testfiles, harvester)
+            )
+        else:
+            exit_status = jobs.run(
+                execute_examples, testfiles, options['fail_fast'],
+                finalize_worker
+            )
+
+        executor.concerns.event('finish_run', exit_status=exit_status)
+        return exit_status
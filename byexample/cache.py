@@ -1,12 +1,25 @@
 from __future__ import unicode_literals
-import sre_parse
-import sre_compile
 import appdirs
 import os
 import sys
 import contextlib
 import errno
 import warnings
+import hashlib
+import json
+import tempfile
+import shlex
+import shutil
+import sqlite3
+import time
+
+try:
+    # sre_parse and sre_compile are deprecated since Python 3.11
+    # and re does not use them anymore
+    from re import _parser as sre_parse, _compiler as sre_compile
+except ImportError:
+    import sre_parse
+    import sre_compile
 
 from .log import clog, log_context
 
@@ -76,13 +89,6 @@ def flock(file, read_lock=False):
         _release_flock_os(file)
 
 
-def create_file_new_or_fail(name):
-    # The 'x' means create a new file or fail
-    # Honestly, I'm not sure if 'x' is race-condition free
-    # this is a best effort implementation
-    return open(name, 'xb')
-
-
 '''
 >>> from byexample.log import init_log_system
 >>> init_log_system()
@@ -94,9 +100,62 @@ def create_file_new_or_fail(name):
 
 
 class RegexCache(object):
-    def __init__(self, filename, disabled=False, cache_verbose=False):
+    r''' Cache the compiled regexs (their bytecode) in a sqlite database
+        in the user's cache directory so they can be reused by other
+        runs and by other jobs running in parallel.
+
+        The database is in WAL mode so reading it does not block
+        (nor is blocked by) the jobs that are writing it and each
+        job writes only the entries that it added (misses) and
+        touches the ones that it used.
+
+        Once the database has more than <max_entries>, the least
+        recently used are evicted and the database is compacted.
+
+        >>> import tempfile, os, re
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> filename = os.path.join(tmpdir, 're')
+
+        For this test we use a temporal file instead of one in the
+        user's cache directory:
+
+        >>> cache = RegexCache(None, max_entries=5)
+        >>> cache.filename = filename
+        >>> with cache.synced():
+        ...     _ = [cache.get(p) for p in ('a+', 'b+', 'c+')]
+
+        Another cache instance (may be in another job) sees the entries
+        without reading the whole database:
+
+        >>> other = RegexCache(None, max_entries=5)
+        >>> other.filename = filename
+        >>> with other.synced():
+        ...     other.get('a+').match('aaa').group(0)
+        ...     _ = [other.get(p) for p in ('d+', 'e+', 'f+')]
+        'aaa'
+
+        >>> other._nentries()
+        4
+
+        The entries not used recently were evicted:
+
+        >>> [p for p, _ in other._db.execute('SELECT pattern, flags FROM regexs ORDER BY pattern')]
+        ['a+', 'd+', 'e+', 'f+']
+
+        >>> other.close(); cache.close()
+        >>> import shutil
+        >>> shutil.rmtree(tmpdir)
+        '''
+    def __init__(
+        self,
+        filename,
+        disabled=False,
+        cache_verbose=False,
+        max_entries=20000
+    ):
         self.disabled = disabled
         self.verbose = cache_verbose
+        self.max_entries = max_entries
         if self.disabled:
             return
 
@@ -105,27 +164,15 @@ class RegexCache(object):
             RuntimeWarning
         )
 
-        try:
-            _acquire_flock_os
-            _release_flock_os
-        except NameError:
-            # if we cannot prevent race condition due a lack of file locks,
-            # disable the cache
-            warnings.warn(
-                "Cache will be disabled because the current OS/file system does not support file locks",
-                RuntimeWarning
-            )
-            self.disabled = True
-
         if filename:
             self.filename = self._cache_filepath(filename)
-            self._cache = self._load_cache_from_disk()
         else:
             self.filename = None
-            self._cache = self._new_cache()
 
+        self._db, self._db_pid = None, None
+        self._cache = {}
         self.clear_stats()
-        clog().chat("Cache '%s': %i entries", self.filename, self._nkeys)
+        clog().chat("Cache '%s'", self.filename)
 
     @contextlib.contextmanager
     def synced(self, label=""):
@@ -166,7 +213,10 @@ class RegexCache(object):
 
     @log_context('byexample.cache')
     def clear_stats(self):
-        self._nkeys, self._hits = len(self._cache), 0
+        # the new entries (misses) and the ones read from
+        # the database (hits) since the last sync
+        self._new, self._used = {}, set()
+        self._hits = 0
 
     @classmethod
     def _cache_filepath(cls, filename):
@@ -193,85 +243,149 @@ class RegexCache(object):
         filename = os.path.basename(filename)
         return os.path.join(dir, filename)
 
-    def _load_cache_from_disk(self):
-        ''' Load the cache from disk, create an empty one if the
-            cache doesn't exist.
+    def _connect(self):
+        ''' Return a connection to the database, opening it if needed.
 
-            If the load/read fails, return a empty cache too.
-            '''
-        try:
-            with open(self.filename, 'rb') as f, flock(f, read_lock=True):
-                return self._read_cache_or_empty(f)
-        except FileNotFoundError as e:
-            return self._create_empty_cache_in_disk()
+            The connection is not shared between processes: a job
+            forked from the main process opens its own.
 
-    def _read_cache_or_empty(self, file):
-        ''' Read from the given file and load the cache.
-            Assumes that the file is open for reading and its read
-            pointer is at the begin of the file.
+            Return None if there is no database (the cache is in memory
+            only) or if it could not be opened.
+            '''
+        if self.filename is None:
+            return None
 
-            This does not set any lock: use flock yourself to avoid
-            a race condition.
+        if self._db is not None and self._db_pid == os.getpid():
+            return self._db
 
-            Return an empty cache if the read fails.
-            '''
         try:
-            return pickle.loads(file.read())
-        except:
-            # possible corrupt cache, ignore it
+            self._db = self._open_db(self.filename)
+        except sqlite3.DatabaseError:
+            # possible corrupt cache (or the old pickled one), start again
             clog().warn("Cache file '%s' corrupted.", self.filename)
-            return self._new_cache()
-
-    def _new_cache(self):
-        return {}
+            try:
+                os.unlink(self.filename)
+                self._db = self._open_db(self.filename)
+            except (OSError, sqlite3.Error) as err:
+                clog().info(
+                    "Cache file '%s' could not be created: %s", self.filename,
+                    err
+                )
+                self._db = None
+
+        self._db_pid = os.getpid()
+        return self._db
+
+    @staticmethod
+    def _open_db(filename):
+        db = sqlite3.connect(filename, timeout=30, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS regexs ('
+            '    pattern, flags INTEGER, bytecode BLOB, used REAL,'
+            '    UNIQUE (pattern, flags))'
+        )
+        db.execute(
+            'CREATE INDEX IF NOT EXISTS regexs_by_use ON regexs (used)'
+        )
+        return db
+
+    def close(self):
+        if not self.disabled and self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _nentries(self):
+        db = self._connect()
+        if db is None:
+            return len(self._cache)
+        return db.execute('SELECT count(*) FROM regexs').fetchone()[0]
+
+    def _lookup(self, key):
+        ''' Read the bytecode of the given key from the database,
+            None if it is not there.'''
+        db = self._connect()
+        if db is None:
+            return None
 
-    def _create_empty_cache_in_disk(self):
-        ''' Create an empty cache in disk if doesn't exist yet. '''
-        cache = self._new_cache()
         try:
-            clog().info(
-                "Cache file '%s' does not exist. Creating a new one...",
-                self.filename
-            )
-            with create_file_new_or_fail(self.filename) as f, flock(f):
-                # the open didn't fail, so it *must* be new:
-                # save an empty cache
-                pickle.dump(cache, f)
-        except FileExistsError as e:
-            pass
-
-        return cache
+            row = db.execute(
+                'SELECT bytecode FROM regexs WHERE pattern = ? AND flags = ?',
+                key
+            ).fetchone()
+            return pickle.loads(row[0]) if row else None
+        except Exception as err:
+            clog().info("Cache lookup failed: %s", err)
+            return None
 
     @log_context('byexample.cache')
     def _sync(self, label=""):
-        misses = len(self._cache) - self._nkeys
-        nohits = self._nkeys - self._hits
+        misses, hits = len(self._new), self._hits
 
         clog().chat(
-            "[%s] Cache stats: %i entries %i hits %i misses %i nohits.", label,
-            len(self._cache), self._hits, misses, nohits
+            "[%s] Cache stats: %i hits %i misses.", label, hits, misses
         )
-        if misses and self.filename != None:
+        db = self._connect()
+        if db is None or not (self._new or self._used):
+            self.clear_stats()
+            return
+
+        now = time.time()
+        try:
             clog().chat("[%s] Cache require sync.", label)
-            with open(self.filename, 'rb+') as f, flock(f):
-                # get a fresh disk version in case that other
-                # byexample instance had touched the cache but
-                # do not keep updating if we have too many nohits (useless
-                # keys/entries)
-                if nohits < 1000:
-                    cache = self._read_cache_or_empty(f)
-                    cache.update(self._cache)
-                else:
-                    cache = self._cache
-
-                # write to disk the new updated cache, truncate
-                # and shrink it if the new is smaller than the original.
-                f.seek(0, 0)
-                # XXX pickletools.optimize ??
-                pickle.dump(cache, f)
-                f.truncate()
+            with self._transaction(db):
+                db.executemany(
+                    'INSERT OR IGNORE INTO regexs VALUES (?, ?, ?, ?)',
+                    (
+                        (pattern, flags, pickle.dumps(bytecode), now)
+                        for (pattern, flags), bytecode in self._new.items()
+                    )
+                )
+                db.executemany(
+                    'UPDATE regexs SET used = ? WHERE pattern = ? AND flags = ?',
+                    ((now, pattern, flags) for pattern, flags in self._used)
+                )
+
+            self._evict(db, label)
+        except sqlite3.Error as err:
+            clog().info("[%s] Cache could not be synced: %s", label, err)
 
-            self.clear_stats()
+        self.clear_stats()
+
+    def _evict(self, db, label):
+        ''' Evict the least recently used entries if there are too many
+            and compact the database. Leave some room for the next
+            syncs so we don't do this on each one.
+            '''
+        n = db.execute('SELECT count(*) FROM regexs').fetchone()[0]
+        if n <= self.max_entries:
+            return
+
+        nevicted = n - int(self.max_entries * 0.9)
+        clog().chat(
+            "[%s] Cache evicting %i entries and compacting.", label, nevicted
+        )
+        with self._transaction(db):
+            db.execute(
+                'DELETE FROM regexs WHERE rowid IN '
+                '(SELECT rowid FROM regexs ORDER BY used LIMIT ?)',
+                (nevicted, )
+            )
+
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.execute('VACUUM')
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _transaction(db):
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
 
     def get(self, pattern, flags=0):
         ''' RegexCache.get compiles a pattern into a regex object like
@@ -310,12 +424,18 @@ class RegexCache(object):
                 type(pattern)
             )
 
-        key = (pattern, flags)
+        key = (pattern, int(flags))
         try:
             bytecode = self._cache[key]
-            self._hits += 1
         except KeyError:
-            bytecode = self._pattern_to_bytecode(pattern, flags)
+            bytecode = self._lookup(key)
+            if bytecode is not None:
+                self._hits += 1
+                self._used.add(key)
+            else:
+                bytecode = self._pattern_to_bytecode(pattern, flags)
+                self._new[key] = bytecode
+
             self._cache[key] = bytecode
 
         return self._bytecode_to_regex(pattern, bytecode)
@@ -330,10 +450,12 @@ class RegexCache(object):
         p = sre_parse.parse(pattern, flags)
         code = [i.real for i in sre_compile._code(p, flags)]
 
-        flags = flags | p.pattern.flags
-        ngroups = p.pattern.groups
+        # since Python 3.11 the pattern's state is in 'state'
+        state = getattr(p, 'state', None) or p.pattern
+        flags = int(flags | state.flags)
+        ngroups = state.groups
 
-        return (flags, code, ngroups, p.pattern.groupdict)
+        return (flags, code, ngroups, state.groupdict)
 
     def _bytecode_to_regex(self, pattern, bytecode):
         flags, code, ngroups, groupindex = bytecode
@@ -360,3 +482,489 @@ class RegexCache(object):
     @log_context('byexample.cache')
     def _unpatch(self, *args, **kargs):
         sre_compile.compile = self._original__sre_compile__compile
+
+
+class ExamplesCache(object):
+    r''' Keep in disk, one entry per file, the examples found in the
+        file and the regexs built from their expected outputs so the next
+        time we can skip the finding and the parsing of the file if it
+        didn't change.
+
+        Each entry is valid while the content of the file and the <salt>
+        (byexample's version, languages, finders, ...) do not change.
+
+        >>> from byexample.cache import ExamplesCache
+        >>> import tempfile
+        >>> tmpdir = tempfile.mkdtemp()
+
+        The entries are loaded within a synced block. If the cache
+        doesn't have the entry, the caller fills it with the examples
+        found and the regexs built and the cache writes it to disk
+        on exit:
+
+        >>> cache = ExamplesCache(tmpdir, salt='v1')
+        >>> with cache.synced(label='foo.md'):
+        ...     entry = cache.load('foo.md', 'some content')
+        ...     print(entry['examples'])
+        ...     entry['examples'] = [('1 + 2', '3')]
+        ...     entry['regexs']['3'] = ('\\A', '3', '\\n*\\Z')
+        None
+
+        >>> cache = ExamplesCache(tmpdir, salt='v1')
+        >>> entry = cache.load('foo.md', 'some content')
+        >>> entry['examples']
+        [('1 + 2', '3')]
+
+        If the content of the file or the salt changes, the entry
+        is discarded:
+
+        >>> cache.load('foo.md', 'other content')['examples'] is None
+        True
+
+        >>> cache = ExamplesCache(tmpdir, salt='v2')
+        >>> cache.load('foo.md', 'some content')['examples'] is None
+        True
+
+        >>> import shutil
+        >>> shutil.rmtree(tmpdir)
+        '''
+    def __init__(self, dirname=None, disabled=False, salt=''):
+        self.disabled = disabled
+        self.salt = salt
+        self._loaded = {}
+
+        if self.disabled:
+            return
+
+        if dirname is None:
+            dirname = self._cache_dirpath()
+        self.dirname = dirname
+
+    @contextlib.contextmanager
+    def synced(self, label=""):
+        ''' Write to disk on exit the entries loaded and
+            updated since the enter.
+            '''
+        if self.disabled:
+            yield self
+            return
+
+        self._loaded.clear()
+        try:
+            yield self
+        finally:
+            self._sync(label)
+
+    @classmethod
+    def _cache_dirpath(cls):
+        ''' Return the path of the directory, in the user's cache directory,
+            where the entries are stored. Like RegexCache, it depends on the
+            platform and python version.
+
+            Note: this function *will* create any directory needed.
+            '''
+        version = "examples-%s-%08i" % (sys.platform, sys.hexversion)
+        dir = appdirs.user_cache_dir(appname='byexample', version=version)
+        os.makedirs(dir, exist_ok=True)
+        return dir
+
+    def _entry_filepath(self, filepath):
+        path = os.path.abspath(filepath).encode('utf-8', 'surrogateescape')
+        return os.path.join(self.dirname, hashlib.sha1(path).hexdigest())
+
+    def _content_key(self, content):
+        h = hashlib.sha256(self.salt.encode('utf-8', 'surrogateescape'))
+        h.update(content.encode('utf-8', 'surrogateescape'))
+        return h.hexdigest()
+
+    def _new_entry(self, key):
+        return {'key': key, 'examples': None, 'regexs': {}}
+
+    @log_context('byexample.cache')
+    def load(self, filepath, content):
+        ''' Return the entry of <filepath> given its <content>.
+
+            If the cache doesn't have one or it is outdated, return
+            a new entry without examples (None) and without regexs.
+            '''
+        key = self._content_key(content)
+        if self.disabled:
+            return self._new_entry(key)
+
+        entry = None
+        try:
+            with open(self._entry_filepath(filepath), 'rb') as f:
+                entry = pickle.loads(f.read())
+        except FileNotFoundError:
+            pass
+        except:
+            # possible corrupt entry, ignore it
+            clog().warn("Cache entry for '%s' corrupted.", filepath)
+
+        if not isinstance(entry, dict) or entry.get('key') != key:
+            clog().chat("Cache entry for '%s': miss", filepath)
+            entry = self._new_entry(key)
+            stale = True
+        else:
+            clog().chat("Cache entry for '%s': hit", filepath)
+            stale = False
+
+        self._loaded[filepath] = (entry, stale, len(entry['regexs']))
+        return entry
+
+    @log_context('byexample.cache')
+    def _sync(self, label=""):
+        for filepath, (entry, stale, nregexs) in self._loaded.items():
+            if not stale and nregexs == len(entry['regexs']):
+                continue  # nothing new
+
+            if entry['examples'] is None:
+                continue  # incomplete, the file couldn't be processed
+
+            clog().chat(
+                "[%s] Cache entry for '%s' require sync.", label, filepath
+            )
+
+            # write a new file and replace the old one (if any) atomically
+            # so concurrent readers see either the old or the new entry
+            fd, tmpname = tempfile.mkstemp(dir=self.dirname)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(entry, f)
+                os.replace(tmpname, self._entry_filepath(filepath))
+            except Exception as err:
+                os.unlink(tmpname)
+                clog().info(
+                    "Cache entry for '%s' could not be saved: %s", filepath,
+                    err
+                )
+
+        self._loaded.clear()
+
+
+class ModulesManifest(object):
+    r''' Remember which languages each module registers so the next
+        time we can skip the import of the modules of the languages
+        that were not selected.
+
+        Each module is tracked by its path; its record is valid while
+        the module's modification time and size do not change.
+
+        The manifest is a small JSON file that lives in the user's
+        cache directory, next to the jobs history. If <filename> is None,
+        the manifest is kept in memory only.
+
+        >>> from byexample.cache import ModulesManifest
+        >>> import tempfile, os
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> manifest_filename = os.path.join(tmpdir, 'manifest.json')
+        >>> module_filename = os.path.join(tmpdir, 'foo.py')
+
+        >>> with open(module_filename, 'wt') as f:
+        ...     _ = f.write('class FooRunner: pass')
+
+        A module never seen has no languages known (None):
+
+        >>> manifest = ModulesManifest(manifest_filename)
+        >>> manifest.languages_of(module_filename) is None
+        True
+
+        Once recorded, the languages are written to disk on save:
+
+        >>> manifest.record(module_filename, ['foo'])
+        >>> manifest.save()
+
+        >>> manifest = ModulesManifest(manifest_filename)
+        >>> manifest.languages_of(module_filename)
+        ['foo']
+
+        If the module changes, its record is discarded:
+
+        >>> with open(module_filename, 'wt') as f:
+        ...     _ = f.write('class FooRunner: language = "foo"')
+        >>> manifest.languages_of(module_filename) is None
+        True
+
+        >>> import shutil
+        >>> shutil.rmtree(tmpdir)
+        '''
+    def __init__(self, filename):
+        self.filename = filename
+        self._updated = False
+        if filename:
+            self._modules = self._load_from_disk()
+        else:
+            self._modules = {}
+
+    @classmethod
+    def default_filepath(cls):
+        ''' Return the path to the manifest file in the user's
+            cache directory, creating any directory needed.
+            '''
+        dir = appdirs.user_cache_dir(appname='byexample')
+        os.makedirs(dir, exist_ok=True)
+        return os.path.join(dir, 'modules-manifest.json')
+
+    def _load_from_disk(self):
+        try:
+            with open(self.filename, 'rt') as f:
+                modules = json.loads(f.read() or '{}')
+            assert isinstance(modules, dict)
+            return modules
+        except FileNotFoundError:
+            return {}
+        except:
+            # possible corrupt manifest, ignore it
+            clog().info("Modules manifest '%s' corrupted.", self.filename)
+            return {}
+
+    def _stamp_of(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime, st.st_size]
+
+    def languages_of(self, path):
+        ''' Return the languages that the module at <path> registers
+            or None if it is unknown (or the module changed).
+            '''
+        key = os.path.abspath(path)
+        try:
+            stamp, languages = self._modules[key]
+        except (KeyError, ValueError, TypeError):
+            return None
+
+        if stamp != self._stamp_of(key):
+            return None
+
+        return languages
+
+    def record(self, path, languages):
+        ''' Record that the module at <path> registers <languages>. '''
+        key = os.path.abspath(path)
+        record = [self._stamp_of(key), sorted(languages)]
+        if self._modules.get(key) != record:
+            self._modules[key] = record
+            self._updated = True
+
+    def save(self):
+        if not self.filename or not self._updated:
+            return
+
+        # like ExamplesCache, write a new file and replace the old one
+        # atomically so concurrent readers see either the old or the new
+        dirname = os.path.dirname(self.filename)
+        fd, tmpname = tempfile.mkstemp(dir=dirname)
+        try:
+            with os.fdopen(fd, 'wt') as f:
+                json.dump(self._modules, f)
+            os.replace(tmpname, self.filename)
+        except Exception as err:
+            os.unlink(tmpname)
+            clog().info(
+                "Modules manifest '%s' could not be saved: %s", self.filename,
+                err
+            )
+            return
+
+        self._updated = False
+
+
+class ResultsCache(object):
+    r''' Remember which files passed so they are not run again
+        while nothing that could change their results changes.
+
+        Each file that passed is recorded in <dirname> under a key that
+        it is the hash of:
+         - the content of the file
+         - the <salt>: byexample's version, the modules loaded and the
+           options given from the command line
+         - the interpreters of the runners used (their executables
+           are found from the command lines that the runners would
+           spawn with the options of the file)
+         - the content of the files and the values of the environment
+           variables declared as inputs with +depends-on and
+           +depends-on-env.
+
+        If <dirname> is None, the cache is disabled.
+
+        >>> from byexample.cache import ResultsCache
+        >>> from byexample.finder import _build_fake_example
+        >>> from byexample.options import Options
+        >>> import tempfile, os
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> filename = os.path.join(tmpdir, 'foo.md')
+        >>> data_filename = os.path.join(tmpdir, 'data.txt')
+
+        >>> for name in (filename, data_filename):
+        ...     with open(name, 'wt') as f:
+        ...         _ = f.write('hello')
+
+        >>> opts = Options({'depends_on': [data_filename],
+        ...                 'depends_on_env': []})
+        >>> examples = [_build_fake_example('1 + 2', '3', opts=opts,
+        ...                                 fully_parsed=False)]
+
+        >>> cache = ResultsCache(tmpdir, salt='some options')
+        >>> key = cache.key_of(filename, examples, opts)
+        >>> cache.passed(key)
+        False
+
+        Once recorded, the file is known to pass while its key does
+        not change:
+
+        >>> cache.record(key, filename)
+        >>> cache.passed(cache.key_of(filename, examples, opts))
+        True
+
+        >>> with open(data_filename, 'wt') as f:
+        ...     _ = f.write('hello world')
+        >>> cache.passed(cache.key_of(filename, examples, opts))
+        False
+
+        >>> cache = ResultsCache(tmpdir, salt='other options')
+        >>> cache.passed(cache.key_of(filename, examples, opts))
+        False
+
+        The interpreters are found from the command line that each
+        runner would spawn with the options of the file so two
+        options that select different interpreters yield different keys:
+
+        >>> import sys
+        >>> class Runner:
+        ...     language = 'fake'
+        ...     def build_cmd(self, options):
+        ...         return '/usr/bin/env %s -i' % options['interpreter']
+
+        >>> examples[0].runner = Runner()
+        >>> key1 = cache.key_of(filename, examples, Options(opts, interpreter='sh'))
+        >>> key2 = cache.key_of(filename, examples, Options(opts, interpreter=sys.executable))
+        >>> key1 != key2
+        True
+
+        >>> cache._interpreter_of(Runner(), Options(interpreter=sys.executable))
+        ['<...>python<...>', <...>, <...>]
+
+        >>> import shutil
+        >>> shutil.rmtree(tmpdir)
+        '''
+    def __init__(self, dirname, salt=''):
+        self.dirname = dirname
+        self.disabled = not dirname
+        self.salt = salt
+
+        # the stamps of the interpreters by their command line
+        self._interpreters = {}
+
+        if not self.disabled:
+            os.makedirs(dirname, exist_ok=True)
+
+    def _entry_filepath(self, key):
+        return os.path.join(self.dirname, key + '.json')
+
+    def _hash_of_file(self, filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def _interpreter_of(self, runner, options):
+        ''' Return the path, size and modification time of the
+            executable (interpreter) that <runner> would spawn with
+            the given <options>.
+
+            The runner is not run: the command that its initialize
+            would use (build_cmd) is used to find the executable.
+            '''
+        try:
+            cmd = runner.build_cmd(options)
+        except (AttributeError, NotImplementedError):
+            return None  # the runner does not spawn any interpreter
+        except Exception as err:
+            clog().info(
+                "The interpreter of the runner '%s' could not be found: %s",
+                runner.language, err
+            )
+            return None
+
+        try:
+            return self._interpreters[cmd]
+        except KeyError:
+            pass
+
+        stamp = None
+        try:
+            # skip 'env' and its options and variables
+            args = shlex.split(cmd)
+            if os.path.basename(args[0]) == 'env':
+                args = [
+                    a for a in args[1:]
+                    if not a.startswith('-') and '=' not in a
+                ]
+
+            path = os.path.realpath(shutil.which(args[0]))
+            st = os.stat(path)
+            stamp = [path, st.st_size, st.st_mtime_ns]
+        except Exception as err:
+            clog().info(
+                "The interpreter of the runner '%s' could not be found: %s",
+                runner.language, err
+            )
+
+        self._interpreters[cmd] = stamp
+        return stamp
+
+    def key_of(self, filepath, examples, options):
+        ''' Return the key of the file <filepath> with the given
+            <examples> and <options> (the options of the file) or None
+            if the cache is disabled or there is nothing to cache.
+            '''
+        if self.disabled or not examples:
+            return None
+
+        from .finder import declared_inputs
+        files, envs = declared_inputs(examples)
+
+        runners = {e.runner.language: e.runner for e in examples}
+        key = {
+            'salt': self.salt,
+            'file': self._hash_of_file(filepath),
+            'interpreters':
+            {l: self._interpreter_of(r, options)
+             for l, r in runners.items()},
+            'files': {f: self._hash_of_file(f)
+                      for f in files},
+            'envs': {e: os.getenv(e)
+                     for e in envs},
+        }
+
+        key = json.dumps(key, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(key).hexdigest()
+
+    def passed(self, key):
+        ''' Return if the file with the given <key> passed before. '''
+        if key is None:
+            return False
+
+        return os.path.exists(self._entry_filepath(key))
+
+    def record(self, key, filepath):
+        ''' Record that the file <filepath> with the given <key> passed. '''
+        if key is None:
+            return
+
+        # like ModulesManifest, write a new file and move it atomically
+        # so concurrent readers never see a partial entry
+        fd, tmpname = tempfile.mkstemp(dir=self.dirname)
+        try:
+            with os.fdopen(fd, 'wt') as f:
+                json.dump({'file': filepath, 'time': time.time()}, f)
+            os.replace(tmpname, self._entry_filepath(key))
+        except Exception as err:
+            os.unlink(tmpname)
+            clog().info(
+                "Results cache '%s' could not be saved: %s", self.dirname,
+                err
+            )
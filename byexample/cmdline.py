@@ -226,6 +226,20 @@ def parse_args(args=None):
         default=[],
         help='skip these files'
     )
+    g.add_argument(
+        "--watch",
+        action='store_true',
+        help="keep running: run again the files that change (or any file " +
+        "that they depend on, see +depends-on)."
+    )
+    g.add_argument(
+        "--results-cache",
+        metavar='<dir>',
+        default=None,
+        help="remember in <dir> which files passed and do not run them " +
+        "again while they, their inputs (see +depends-on and " +
+        "+depends-on-env), the options and the interpreters do not change."
+    )
 
     g = parser.add_argument_group("Diff Options")
     g.add_argument(
@@ -288,6 +302,13 @@ def parse_args(args=None):
         default='all',
         help="control how to pretty print the output."
     )
+    g.add_argument(
+        "--profile-out",
+        metavar='<file>',
+        default=None,
+        help=
+        "measure how long takes each phase of the execution and save it in <file> as a Chrome trace; show the slowest files and examples at the end."
+    )
     g.add_argument(
         '-V',
         '--version',
@@ -377,12 +398,38 @@ def parse_args(args=None):
         help=
         "minimum match length around a capture tag to perform a guess (default: %(default)s)."
     )
+    g.add_argument(
+        "-x-parse-ahead",
+        metavar="<n>",
+        default=0,
+        type=int,
+        help=
+        "parse in background the next <n> examples while the current one runs; 0 disables this (default: %(default)s, disabled)."
+    )
     g.add_argument(
         "-x-not-recover-timeout",
         action='store_true',
         help=
         "do not try to recover from a timeout; abort the execution immediately (beware, this could leave some resources without the proper clean up)."
     )
+    g.add_argument(
+        "-x-warm-runners",
+        action='store_true',
+        help=
+        "keep the runners/interpreters running between files, resetting them instead of initializing them again for each file (experimental)."
+    )
+    g.add_argument(
+        "-x-examples-cache",
+        action='store_true',
+        help=
+        "keep in disk the examples found and parsed in each file and reuse them in the next runs while the file does not change (experimental)."
+    )
+    g.add_argument(
+        "-x-no-jobs-history",
+        action='store_true',
+        help=
+        "do not record how long took to run each file and do not use that to run the longest files first."
+    )
     g.add_argument(
             "-x-log-mask",
             action='append',
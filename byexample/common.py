@@ -81,44 +81,40 @@ def colored(s, color, use_colors):
         return s
 
 
-try:
-    import pygments
-    import pygments.lexers
-    import pygments.formatters
-    import pygments.formatters.terminal
-    import pygments.formatters.terminal256
-
-    def highlight_syntax(example, use_colors):
-        snippet = example.snippet
-        if not use_colors:
-            return snippet
-
-        try:
-            # we want to use colors, let's try to find a valid lexer
-            language = example.runner.language
-            lexer = pygments.lexers.get_lexer_by_name(language)
-
-            # we want the output to be valid for a terminal...
-            # pygments supports:
-            #  - terminal.TerminalFormatter
-            #  - terminal256.Terminal256Formatter
-            #  - terminal256.TerminalTrueColorFormatter
-            #
-            # should we allow the user to change this?
-            formatter = pygments.formatters.terminal.TerminalFormatter()
-
-            return pygments.highlight(snippet, lexer, formatter)
-        except:
-            pass
-
-        # if something fails, just keep going: the highlight syntax is
-        # nice to have but not a must to have.
+def highlight_syntax(example, use_colors):
+    snippet = example.snippet
+    if not use_colors:
         return snippet
 
-except ImportError:
-    # do not use any highlight syntax
-    def highlight_syntax(example, use_colors):
-        return example.snippet
+    try:
+        # pygments takes a while to be imported so we do it only
+        # if we are going to use it (colors enabled)
+        import pygments
+        import pygments.lexers
+        import pygments.formatters
+        import pygments.formatters.terminal
+
+        # we want to use colors, let's try to find a valid lexer
+        language = example.runner.language
+        lexer = pygments.lexers.get_lexer_by_name(language)
+
+        # we want the output to be valid for a terminal...
+        # pygments supports:
+        #  - terminal.TerminalFormatter
+        #  - terminal256.Terminal256Formatter
+        #  - terminal256.TerminalTrueColorFormatter
+        #
+        # should we allow the user to change this?
+        formatter = pygments.formatters.terminal.TerminalFormatter()
+
+        return pygments.highlight(snippet, lexer, formatter)
+    except:
+        pass
+
+    # if something fails (pygments is not installed for example),
+    # just keep going: the highlight syntax is nice to have but not
+    # a must to have.
+    return snippet
 
 
 def tohuman(s):
@@ -67,13 +67,15 @@ class Concern(ExtendOptionParserMixin):
         Called at the begin of the execution of the given examples
         found in the specific filepath with the given runners.
 
-        The runners are already initialized but no example was built nor
-        was executed yet.
+        No example was built nor was executed yet and the runners
+        may not be initialized yet: each runner is initialized right
+        before running its first (not skipped) example.
 
         You could use this opportunity to alter the example, or
         even alter the example list (the parameter) in place.
-        Or you could inject some code to the given runners
-        before running any example.
+        If you want to inject some code to the runners before
+        running any example, do it on the 'finish_initialize' and
+        'finish_reset' events (see event).
 
         Keep in mind that we are talking about examples that are not fully
         parsed yet so you may not get all their attributs.
@@ -126,7 +128,7 @@ class Concern(ExtendOptionParserMixin):
         and if it was aborted by the user, crashed, timedout or the build
         was broken.
 
-        The runners given in start are still up and running
+        The runners initialized are still up and running
         but may not be in a consistent state if the user aborted the
         execution or if the runner crashed.
 
@@ -257,6 +259,21 @@ class Concern(ExtendOptionParserMixin):
         '''
         Called on arbitrary moments, for arbitrary reasons defined
         in <what> and optionally in <data>.
+
+        For example, the executor calls 'start_initialize' and
+        'finish_initialize' (and the same for 'reset' and 'shutdown')
+        around the initialization of each runner (data['runner']).
+        The 'finish_*' events have the exception raised in data['error']
+        or None if the runner was initialized (reset or shutdown) fine.
+
+        When two or more runners are initialized at the same time, the
+        'start_initialize' and 'finish_initialize' are called from the
+        thread that initializes each runner.
+
+        If a file passed in a previous run and nothing changed since then
+        (see --results-cache), neither start nor finish are called
+        but 'cached_pass' with the file (data['filepath']) and its
+        examples (data['examples']).
         '''
         pass  # pragma: no cover
 
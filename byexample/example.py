@@ -10,6 +10,9 @@ import pprint
 
 
 class Where(object):
+    # one per example and per zone: keep them small, like Example
+    __slots__ = ('start_lineno', 'end_lineno', 'filepath', 'zdelimiter')
+
     def __init__(self, start_lineno, end_lineno, filepath, zdelimiter):
         self.start_lineno = start_lineno
         self.end_lineno = end_lineno
@@ -29,6 +32,8 @@ class Where(object):
 
 
 class Zone(object):
+    __slots__ = ('zdelimiter', 'str', 'where')
+
     def __init__(self, zdelimiter, zone_str, where):
         self.zdelimiter = zdelimiter
         self.str = zone_str
@@ -88,6 +93,16 @@ class Example(object):
      'tags': True}
 
     '''
+
+    # a file may have a lot of examples: the __dict__ is created only if
+    # an attribute other than these is set (by a module, for example)
+    __slots__ = (
+        'finder', 'runner', 'parser', 'snippet', 'expected_str', 'indentation',
+        'start_lineno', 'end_lineno', 'filepath', 'zdelimiter', 'fully_parsed',
+        'regexs_cache', 'source', 'options', 'expected', 'input_list', 'got',
+        '__dict__'
+    )
+
     def __init__(
         self, finder, runner, parser, snippet, expected_str, indent, where
     ):
@@ -98,6 +113,17 @@ class Example(object):
 
         self.fully_parsed = False
 
+        # regexs built from the expected outputs of a previous run
+        # (see ExamplesCache)
+        self.regexs_cache = None
+
+    def __getattr__(self, name):
+        # called only if the attribute was not found; before Python 3.10
+        # the error of a slot not set yet has only the attribute's name
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+        )
+
     def parse_yourself(self, concerns=None):
         if self.fully_parsed:
             raise ValueError("You cannot parse/build an example twice: " + \
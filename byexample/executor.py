@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
+import contextlib, threading
 from .common import enhance_exceptions
-from .log import clog, log_context, log_with
+from .options import Options
+from .log import clog, log_context, log_with, log_muted, getLogger, DEBUG
 
 
 class TimeoutException(Exception):
@@ -18,9 +20,199 @@ class InputPrefixNotFound(TimeoutException):
         self.prefix, self.input = prefix, input
 
 
+class _RunnerInitializer(threading.Thread):
+    ''' Initialize a runner in background. '''
+    def __init__(self, executor, runner, options, log):
+        threading.Thread.__init__(self, daemon=True)
+        self.executor, self.runner = executor, runner
+        self.options, self.log = options, log
+        self.exc = None
+
+    def run(self):
+        try:
+            self.executor.initialize_runner(
+                self.runner, self.options, self.log
+            )
+        except BaseException as e:
+            self.exc = e
+
+    def wait(self):
+        ''' Wait for the initialization and raise if it failed. '''
+        self.join()
+        if self.exc is not None:
+            raise self.exc
+
+
+class _ParseAhead(threading.Thread):
+    r''' Build in background the regexs of the next <ahead> examples
+        while the current one runs (see ExampleParser.parse_ahead).
+
+        The regexs built are left in each example's regexs_cache, only
+        if the example was not parsed yet: the parse, still done in
+        order, uses them if they are still valid.
+
+        >>> import threading
+        >>> from byexample.executor import _ParseAhead
+        >>> from byexample.log import init_log_system
+        >>> from byexample.cmdline import parse_args
+        >>> from byexample.init import init
+
+        >>> init_log_system()
+        >>> filepath = 'test/ds/parse-ahead'
+        >>> _, harvester, executor, _ = init(parse_args(['-l', 'python',
+        ...             '-q', '--pretty', 'none', '-x-parse-ahead', '1',
+        ...             filepath]))
+        >>> examples = harvester.get_examples_from_file(filepath)
+
+        Nothing can be guessed until an example is parsed so parse
+        the first one before starting. With an <ahead> larger than the
+        count of examples, the thread builds all the regexs and ends.
+
+        >>> ahead = _ParseAhead(examples, 8)
+        >>> ahead.parsing(0)
+        >>> examples[0].parse_yourself(concerns=None)
+        Example [python] in file test/ds/parse-ahead, lines 1-1
+        >>> ahead.parsed(0)
+
+        >>> ahead.start()
+        >>> ahead.join()
+
+        The regexs were built with the options of the first example.
+        The fourth example has a repeated capture tag: its regexs
+        could not be built and it is left as is.
+
+        >>> sorted(ahead.guessed)
+        [1, 2, 4, 5]
+        >>> guessed = [e.regexs_cache for e in examples]
+        >>> guessed[3] is None
+        True
+
+        The second example has +norm-ws: when it is parsed, in order,
+        its guess does not match and its regexs are built again.
+
+        >>> ahead.parsing(1)
+        >>> examples[1].parse_yourself(concerns=None).expected.regexs
+        ('\\A', 'a', '\\s+(?!\\s)', 'b', '\\s*\\Z')
+        >>> ahead.parsed(1)
+
+        The third one has the same options than the first one so
+        its guess is used.
+
+        >>> ahead.parsing(2)
+        >>> regexs = examples[2].parse_yourself(concerns=None).expected.regexs
+        >>> regexs is list(guessed[2].values())[0][0]
+        True
+        >>> ahead.parsed(2)
+
+        Once parsed, the guesses are dropped (the regexs are in the
+        Expected of the example now)
+
+        >>> sorted(ahead.guessed), examples[1].regexs_cache
+        ([4, 5], None)
+
+        The fourth example fails in its place, when it is parsed
+
+        >>> ahead.parsing(3)
+        >>> examples[3].parse_yourself(concerns=None)
+        Traceback (most recent call last):
+        <...>
+        ValueError: The same capture tag cannot be used twice
+        <...>
+
+        A thread waiting for the next example to be parsed can be
+        stopped at any moment
+
+        >>> ahead = _ParseAhead(examples, 1)
+        >>> ahead.start()
+        >>> ahead.stop()
+        >>> ahead.is_alive()
+        False
+
+        The executor stops its thread even if the execution ends early:
+        here, the fourth example cannot be parsed so the last ones are
+        never run.
+
+        >>> examples = harvester.get_examples_from_file(filepath)
+        >>> executor.execute(examples, filepath)
+        (False, True, False, False)
+        >>> examples[-1].fully_parsed
+        False
+
+        >>> [t for t in threading.enumerate() if isinstance(t, _ParseAhead)]
+        []
+        '''
+    def __init__(self, examples, ahead):
+        threading.Thread.__init__(self, daemon=True)
+        self.examples, self.ahead = examples, ahead
+
+        # the index of the example being parsed (or already parsed)
+        self.position = -1
+        self.guessed = set()
+        self.stopped = False
+        self.cond = threading.Condition()
+
+    def run(self):
+        with log_muted():
+            for i, example in enumerate(self.examples):
+                with self.cond:
+                    self.cond.wait_for(
+                        lambda: self.stopped or
+                        i <= self.position + self.ahead
+                    )
+                    if self.stopped:
+                        return
+
+                    if i <= self.position:
+                        continue  # already parsed or being parsed
+
+                    if example.regexs_cache is not None:
+                        continue  # from the examples cache
+
+                try:
+                    regexs = example.parser.parse_ahead(example)
+                except Exception:
+                    # let the parse fail and report it in its place
+                    continue
+
+                if regexs is None:
+                    continue
+
+                with self.cond:
+                    if i > self.position:
+                        example.regexs_cache = regexs
+                        self.guessed.add(i)
+
+    def parsing(self, i):
+        ''' The i-th example is about to be parsed. '''
+        with self.cond:
+            self.position = i
+            self.cond.notify()
+
+    def parsed(self, i):
+        ''' The i-th example was parsed: its regexs are in its
+            Expected now so drop the ones built in background. '''
+        with self.cond:
+            if i in self.guessed:
+                self.guessed.remove(i)
+                self.examples[i].regexs_cache = None
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        self.join()
+
+
 class FileExecutor(object):
     def __init__(
-        self, concerns, differ, verbosity, use_colors, options, **unused
+        self,
+        concerns,
+        differ,
+        verbosity,
+        use_colors,
+        options,
+        results_cache=None,
+        **unused
     ):
         self.concerns = concerns
         self.differ = differ
@@ -29,26 +221,73 @@ class FileExecutor(object):
 
         self.options = options
 
-    def initialize_runners(self, runners, options):
-        tmp = []
-        for runner in runners:
-            with log_with(runner.language) as log:
+        # files that passed in a previous run (only if --results-cache
+        # is set)
+        self.results_cache = results_cache
+
+        # runners that are still running from a previous file
+        # (only if -x-warm-runners is set)
+        self.warm_runners = options['x']['warm_runners']
+        self._warm = set()
+
+    @contextlib.contextmanager
+    def _runner_event(self, what, runner):
+        ''' Notify the concerns the start and the finish of <what>
+            (initialize, reset or shutdown) the <runner>.
+
+            The finish has the exception if <what> failed or None.'''
+        self.concerns.event('start_' + what, runner=runner)
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.concerns.event('finish_' + what, runner=runner, error=error)
+
+    def initialize_runner(self, runner, options, log):
+        try:
+            if runner in self._warm:
+                with self._runner_event('reset', runner):
+                    self._reset_runner(runner, options, log)
+            else:
                 log.info("Initializing %s", str(runner))
-                try:
+                with self._runner_event('initialize', runner):
                     runner.initialize(options)
-                    tmp.append(runner)
-                except:
-                    self.shutdown_runners(tmp, stop_on_failure=False)
-                    log.warn("Initialization of %s failed.", str(runner))
-                    raise
+        except:
+            log.warn("Initialization of %s failed.", str(runner))
+            raise
+
+    def _reset_runner(self, runner, options, log):
+        log.info("Resetting %s", str(runner))
+        self._warm.discard(runner)
+        try:
+            runner.reset(options)
+            return
+        except Exception as e:
+            log.warn(
+                "Reset of %s failed (%s). Initializing it again.",
+                str(runner), str(e)
+            )
+
+        try:
+            runner.shutdown()
+        except Exception:
+            pass
+
+        log.info("Initializing %s", str(runner))
+        runner.initialize(options)
 
     def shutdown_runners(self, runners, stop_on_failure=True):
         tmp = list(runners)
+        self._warm.difference_update(runners)
         for runner in runners:
             with log_with(runner.language) as log:
                 log.info("Shutting down %s", str(runner))
                 try:
-                    runner.shutdown()
+                    with self._runner_event('shutdown', runner):
+                        runner.shutdown()
                     del tmp[0]
                 except:
                     del tmp[0]
@@ -60,6 +299,19 @@ class FileExecutor(object):
                     if stop_on_failure:
                         raise
 
+    def keep_runners_warm(self, runners):
+        ''' Keep the <runners> running so they can be reset and reused
+            for the next file instead of being initialized again.'''
+        for runner in runners:
+            with log_with(runner.language) as log:
+                log.info("Keeping %s running", str(runner))
+        self._warm.update(runners)
+
+    @log_context('byexample.exec')
+    def shutdown_warm_runners(self):
+        ''' Shutdown any runner kept running between files. '''
+        self.shutdown_runners(list(self._warm), stop_on_failure=False)
+
     def __repr__(self):
         return 'File Executor'
 
@@ -67,47 +319,162 @@ class FileExecutor(object):
     def dry_execute(self, examples, filepath):
         for example in examples:
             with enhance_exceptions(example, example.parser, self.use_colors), \
-                log_with(runner.language):
+                log_with(example.runner.language):
                 # build but ignore any output; even do not use the concerns
                 example.parse_yourself(concerns=None)
 
         return False, False, False, False
 
+    def _runners_surely_needed(self, examples, options):
+        ''' Return the runners that have at least one example that
+            will be run unless something fails before: those that are
+            not skipped nor conditionally executed (+if/+unless).
+            '''
+        needed = []
+        for example in examples:
+            if example.runner in needed:
+                continue
+
+            try:
+                local_options = example.parser.extract_options(
+                    example.snippet
+                )
+            except Exception:
+                continue  # let _exec to deal with this later
+
+            options.up(local_options)
+            try:
+                conditional = options.get('if', False) is not False or \
+                              options.get('unless', True) is not True
+                if not options['skip'] and not conditional:
+                    needed.append(example.runner)
+            finally:
+                options.down()
+
+        return needed
+
+    def _initialize_runners_in_background(self, runners, init_options):
+        ''' Initialize the <runners> concurrently, each in its own thread,
+            and return them in a dictionary with the threads that
+            are initializing them.
+
+            Each runner gets its own copy of <init_options>: the
+            runners may modify them during their initialization.
+            '''
+        pending = {}
+        for runner in runners:
+            # each thread has its own logger's stack, starting with
+            # the root logger only: pass to it the logger to use
+            log = clog().getChild(runner.language)
+            pending[runner] = _RunnerInitializer(
+                self, runner, Options(init_options), log
+            )
+            pending[runner].start()
+
+        return pending
+
     @log_context('byexample.exec')
     def execute(self, examples, filepath):
         options = self.options
         runners = list(set(e.runner for e in examples))
 
-        self.initialize_runners(runners, options)
+        # the runners are initialized on demand, before running their
+        # first example (see _exec) so the runners of skipped examples
+        # are never initialized; keep track of which were initialized
+        started = []
+
+        # take a snapshot: the runners are initialized with the options
+        # of the file, not with the ones of the example that needed them
+        init_options = options.as_dict()
+
+        # but if two or more runners will be needed for sure,
+        # initialize them all at the same time in background
+        pending = {}
+        needed = self._runners_surely_needed(examples, options)
+        if len(needed) > 1:
+            pending = self._initialize_runners_in_background(
+                needed, init_options
+            )
+
+        keep_warm = False
+        ahead = None
         try:
             self.concerns.start(examples, runners, filepath, options)
+            ahead = self._parse_ahead_in_background(examples, options)
             failed, user_aborted, crashed, broken, timedout = self._exec(
-                examples, filepath, options, runners
+                examples, filepath, options, started, pending, init_options,
+                ahead
             )
             self.concerns.finish(
                 failed, user_aborted, crashed, broken, timedout
             )
+
+            # do not reuse a runner that may be in an undefined state
+            keep_warm = self.warm_runners and not (
+                user_aborted or crashed or timedout
+            )
         finally:
-            self.shutdown_runners(runners)
+            if ahead is not None:
+                ahead.stop()
+
+            # the runners initialized in background but not used
+            # (the execution finished early) must be shutdown too
+            for runner, initializer in pending.items():
+                try:
+                    initializer.wait()
+                    started.append(runner)
+                except BaseException:
+                    pass
+
+            if keep_warm:
+                self.keep_runners_warm(started)
+            else:
+                self.shutdown_runners(started)
 
         return failed, (crashed or broken or timedout), user_aborted, False
 
-    def _exec(self, examples, filepath, options, runners):
+    def _parse_ahead_in_background(self, examples, options):
+        ''' Start building the regexs of the examples in background
+            (see -x-parse-ahead) and return the thread that does it,
+            or None if it is not worth it. '''
+        ahead = options['x']['parse_ahead']
+        if ahead <= 0 or len(examples) < 2:
+            return None
+
+        # the regexs built in background are not logged (see log_muted):
+        # if the parser is being debugged, build them all in order
+        if getLogger('byexample.parser').isEnabledFor(DEBUG):
+            return None
+
+        ahead = _ParseAhead(examples, ahead)
+        ahead.start()
+        return ahead
+
+    def _exec(
+        self, examples, filepath, options, started, pending, init_options,
+        ahead
+    ):
         failing_fast = False
         failed = False
         user_aborted = False
         crashed = False
         timedout = False
         broken = False
-        for example in examples:
+        for i, example in enumerate(examples):
             try:
                 with log_with(example.runner.language):
+                    if ahead is not None:
+                        ahead.parsing(i)
+
                     example = self._parse(example, options)
 
                     if example == None:
                         broken = True
                         break  # cancel if an example couldn't get parsed
 
+                    if ahead is not None:
+                        ahead.parsed(i)
+
                 with enhance_exceptions(example, self, self.use_colors), \
                      log_with(example.runner.language):
                     # are we in failing fast mode? if we do, skip all the
@@ -129,6 +496,23 @@ class FileExecutor(object):
                             self.concerns.skip_example(example, options)
                             continue
 
+                        if example.runner not in started:
+                            try:
+                                with enhance_exceptions(
+                                    example, example.runner, self.use_colors
+                                ):
+                                    self._start_runner(
+                                        example.runner, pending, init_options
+                                    )
+                            except Exception as e:
+                                # report it like a crash of the example
+                                # that needed the runner
+                                self.concerns.crashed(example, e)
+                                crashed = failed = True
+                                self.concerns.aborted(example, False, options)
+                                break
+                            started.append(example.runner)
+
                         clog().chat(
                             'ex:', example=example, disable_prefix=True
                         )
@@ -231,6 +615,15 @@ class FileExecutor(object):
 
         return failed, user_aborted, crashed, broken, timedout
 
+    def _start_runner(self, runner, pending, init_options):
+        ''' Initialize the <runner> or wait for its initialization
+            if it was started in background. '''
+        initializer = pending.pop(runner, None)
+        if initializer is None:
+            self.initialize_runner(runner, Options(init_options), clog())
+        else:
+            initializer.wait()
+
     def _parse(self, example, options):
         try:
             with enhance_exceptions(example, example.parser, self.use_colors):
@@ -1,5 +1,5 @@
 from __future__ import unicode_literals
-from .log import clog, log_context
+from .log import clog, log_context, lazy
 import string, re, time
 '''
 >>> from byexample.log import init_log_system
@@ -12,6 +12,12 @@ def regex_name_as_tag_name(name):
 
 
 class Expected(object):
+    # there is one per example and there may be a lot of them
+    __slots__ = (
+        'str', 'regexs', 'charnos', 'rcounts', 'tags_by_idx', '_full_regex',
+        'check_good', 'verbosity', '_check_got_output_called'
+    )
+
     def __init__(self, expected_str, regexs, charnos, rcounts, tags_by_idx):
         self.str = expected_str
         self.regexs = regexs
@@ -19,6 +25,59 @@ class Expected(object):
         self.rcounts = rcounts
         self.tags_by_idx = tags_by_idx
 
+        self._full_regex = None
+
+    def full_regex(self):
+        ''' Return the compiled regex that matches the whole expected:
+            it is compiled once and only if it is needed.
+            '''
+        if self._full_regex is None:
+            self._full_regex = re.compile(
+                ''.join(self.regexs), re.MULTILINE | re.DOTALL
+            )
+        return self._full_regex
+
+
+def _as_literal(regex):
+    r''' Return the string matched by the regex if the regex is a literal
+        (a string escaped with re.escape); None otherwise.
+
+        >>> import re
+        >>> from byexample.expected import _as_literal
+        >>> _as_literal(re.escape('a.b\nc'))
+        'a.b\nc'
+
+        >>> _as_literal(re.escape(r'a\b'))
+        'a\\b'
+
+        >>> _as_literal(r'\A') is None
+        True
+        '''
+    if '\\\\' in regex:
+        literal = _unescape_re.sub(r'\1', regex)
+    else:
+        # no escaped backslash: cheaper than the regex substitution
+        literal = regex.replace('\\', '')
+    return literal if re.escape(literal) == regex else None
+
+
+_unescape_re = re.compile(r'\\(.)', re.DOTALL)
+
+# Regexs emitted by the parser at the begin and at the end of the expected
+# (see parser_sm.py) and the chars that the latter consumes
+_at_begin_re = r'\A'
+_at_end_chars_by_re = {r'\n*\Z': '\n', r'\s*\Z': None}
+
+# Parts of the regex of a tag that keep the whitespace around out of
+# the capture (see emit_tag in parser_sm.py)
+_ws_before_capture = r'\s*(?!\s)'
+_no_ws_after_capture = r'(?<!\s)'
+
+# Kinds of steps of the linear matching (see _build_linear_steps)
+_FIND, _BEGIN, _END, _WHOLE, _REGEX = range(5)
+
+_flags = re.MULTILINE | re.DOTALL
+
 
 class _LinearExpected(Expected):
     ''' Assume that all the example's tags are of the form .*
@@ -160,25 +219,41 @@ class _LinearExpected(Expected):
         >>> exp.get_captures(ex, got, opts, 0)
         (' 12A B 34 C 1', {'a': '12', 'bc': '34', 'c': '1'})
         '''
+    __slots__ = ('_regex_expected', '_steps')
+
     def __init__(self, *args, **kargs):
         Expected.__init__(self, *args, **kargs)
-        self._regex_expected = _RegexExpected(*args, **kargs)
-        self.check_good = self._regex_expected.check_good = False
+        self.check_good = False
 
         self._check_got_output_called = False
 
+        # built once, the first time that we check the expected against
+        # a got (a dry run never does it)
+        self._steps = None
+
+        # built only if the captures are needed, see _as_regex_expected
+        self._regex_expected = None
+
+    def _as_regex_expected(self):
+        ''' Return a _RegexExpected of the same expected: it shares
+            the regexs, charnos and rcounts with us. '''
+        if self._regex_expected is None:
+            self._regex_expected = _RegexExpected(
+                self.str, self.regexs, self.charnos, self.rcounts,
+                self.tags_by_idx
+            )
+        return self._regex_expected
+
     def check_got_output(self, example, got, options, verbosity):
         self.check_good = False
         self.verbosity = verbosity
 
-        regexs = example.expected.regexs
-        tags_by_idx = example.expected.tags_by_idx
-        expected_str = example.expected.str
-        charnos = example.expected.charnos
+        if self._steps is None:
+            self._steps = self._build_linear_steps(
+                self.regexs, self.tags_by_idx
+            )
 
-        self.check_good = self._linear_matching(
-            regexs, tags_by_idx, charnos, expected_str, got
-        )
+        self.check_good = self._linear_matching(self._steps, got)
         self._check_got_output_called = True
         return self.check_good
 
@@ -187,14 +262,15 @@ class _LinearExpected(Expected):
             self.check_got_output(example, got, options, verbosity)
 
         self.verbosity = verbosity
-        self._regex_expected.check_good = self.check_good
-        self._regex_expected.verbosity = self.verbosity
+        regex_expected = self._as_regex_expected()
+        regex_expected.check_good = self.check_good
+        regex_expected.verbosity = self.verbosity
 
         # relay on _RegexExpected's get_captures algorithm
         # it is more complex and less safer than _LinearExpected but
         # yield results of much better quality
         if self.check_good:
-            captured = self._regex_expected._get_all_capture_or_none(
+            captured = regex_expected._get_all_capture_or_none(
                 example, got, options
             )
             assert captured != None
@@ -202,14 +278,13 @@ class _LinearExpected(Expected):
             return got, captured
 
         else:
-            return self._regex_expected._get_all_capture_as_possible(
+            return regex_expected._get_all_capture_as_possible(
                 example, got, options
             )
 
-    def _linear_matching(
-        self, regexs, tags_by_idx, charnos, expected_str, got
-    ):
-        ''' Assume that all (if any) example's capture tags are regex
+    @staticmethod
+    def _build_linear_steps(regexs, tags_by_idx):
+        r''' Assume that all (if any) example's capture tags are regex
             of the form '.*'.
             If that's true, then the example will pass if all the literal
             regexs of the example's expected match the got strings.
@@ -225,42 +300,114 @@ class _LinearExpected(Expected):
             For example matching 'aa.*bb.*cc' could be too expensive but
             matching ['aa', 'bb', 'cc'] is the same and faster.
 
-            '''
+            Build the list of steps to match, one for each chunk of literal
+            regexs between the tags. Chunks that are plain strings are
+            searched with str.find/startswith; only the rest are compiled
+            as regexs.
+
+            >>> from byexample.expected import _LinearExpected
+            >>> _steps = _LinearExpected._build_linear_steps
+
+            >>> regexs = [r'\A', 'aa', '(.*?)', r'b\.b', '(.*?)', 'cc', r'\n*\Z']
+            >>> [what for _, what, _ in _steps(regexs, {2: None, 4: None})]
+            ['aa', 'b.b', 'cc']
 
+            >>> regexs = [r'\A', 'aa', r'\s+(?!\s)', 'cc', r'\s*\Z']
+            >>> [what.pattern for _, what, _ in _steps(regexs, {})]
+            ['\\Aaa\\s+(?!\\s)cc\\s*\\Z']
+            '''
         prev = 0
-        literals = []
+        steps = []
         capture_idxs = list(sorted(tags_by_idx.keys()))
         for capture_idx in capture_idxs + [len(regexs)]:
-            literal = ''.join(regexs[prev:capture_idx])
-            if literal:
-                literals.append(literal)
-
+            chunk = regexs[prev:capture_idx]
             prev = capture_idx + 1
+            if not ''.join(chunk):
+                continue
 
-        pos = 0
-        for literal in literals:
-            r = re.compile(literal, re.MULTILINE | re.DOTALL)
-            m = r.search(got, pos)
+            # the anchors at the begin and at the end of the expected
+            # can be checked without a regex too
+            literals = chunk
+            at_begin = literals[0] == _at_begin_re
+            if at_begin:
+                literals = literals[1:]
+
+            at_end = bool(literals) and literals[-1] in _at_end_chars_by_re
+            chars = None
+            if at_end:
+                chars = _at_end_chars_by_re[literals[-1]]
+                literals = literals[:-1]
+
+            literals = [_as_literal(r) for r in literals]
+            if None in literals:
+                r = re.compile(''.join(chunk), re.MULTILINE | re.DOTALL)
+                steps.append((_REGEX, r, None))
+                continue
+
+            literal = ''.join(literals)
+            if at_begin and at_end:
+                kind = _WHOLE
+            elif at_begin:
+                kind = _BEGIN
+            elif at_end:
+                kind = _END
+            else:
+                kind = _FIND
+
+            steps.append((kind, literal, chars))
 
-            if not m:
-                return False
+        return steps
 
-            pos = m.end()
+    @staticmethod
+    def _linear_matching(steps, got):
+        pos = 0
+        for kind, what, chars in steps:
+            if kind == _FIND:
+                at = got.find(what, pos)
+                if at < 0:
+                    return False
+                pos = at + len(what)
+
+            elif kind == _REGEX:
+                m = what.search(got, pos)
+                if not m:
+                    return False
+                pos = m.end()
+
+            elif kind == _BEGIN:
+                if pos != 0 or not got.startswith(what):
+                    return False
+                pos = len(what)
+
+            else:
+                # the literal must be followed by the chars only
+                # up to the end of got
+                end = len(got.rstrip(chars))
+                stripped = what.rstrip(chars)
+                if stripped:
+                    at = end - len(stripped)
+                else:
+                    at = max(pos, end)
+
+                if at < pos or not got.startswith(what, at):
+                    return False
+                if kind == _WHOLE and at != 0:
+                    return False
+                pos = len(got)
 
         return True
 
 
 class _RegexExpected(Expected):
+    __slots__ = ('_captures_from_good_check', )
+
     def __init__(self, *args, **kargs):
         Expected.__init__(self, *args, **kargs)
         self.check_good = False
         self._check_got_output_called = False
 
     def _get_all_capture_or_none(self, example, got, options):
-        r = re.compile(
-            ''.join(example.expected.regexs), re.MULTILINE | re.DOTALL
-        )
-        m = r.match(got)
+        m = self.full_regex().match(got)
 
         if m:
             replaced_captures = m.groupdict('')
@@ -330,7 +477,7 @@ class _RegexExpected(Expected):
 
             >>> from byexample.expected import _RegexExpected
             >>> from functools import partial
-            >>> exp = _RegexExpected(0, 0, 0, 0, 0)
+            >>> exp = _RegexExpected('', [], [], [], {})
             >>> exp.verbosity = 0
             >>> _replace_captures = exp._get_captures_by_incremental_match
 
@@ -463,7 +610,9 @@ class _RegexExpected(Expected):
             {}
         '''
 
-        regs = expected_regexs
+        # the regexs may be shared with other examples (a tuple)
+        # but we need to concatenate them with other lists
+        regs = list(expected_regexs)
 
         def _compile(regexs):
             return re.compile(''.join(regexs), re.MULTILINE | re.DOTALL)
@@ -477,7 +626,7 @@ class _RegexExpected(Expected):
         timeout_right = timeout - timeout_left
 
         clog().debug(
-            "Partial Matching:\nGot string to target:\n%s\n", repr(got)
+            "Partial Matching:\nGot string to target:\n%r\n", got
         )
         # from left to right, find the left most regex that match
         # a prefix of got by doing an incremental compile/matching
@@ -497,7 +646,8 @@ class _RegexExpected(Expected):
 
             clog().debug(
                 "|-->  | best at index % 3i (accum rcount % 3i/%i):\nTrying partial left regex: %s",
-                i, accum, min_rcount, repr(''.join(regs[:i + 1]))
+                i, accum, min_rcount,
+                lazy(lambda: repr(''.join(regs[:i + 1])))
             )
 
             begin = time.time()
@@ -554,7 +704,11 @@ class _RegexExpected(Expected):
                 clog().debug(
                     "|  <--| best at index % 3i (accum rcount % 3i/%i):\nTrying partial regex: %s",
                     i, accum, min_rcount,
-                    repr(''.join(left_side + [buffer_re] + regs[i:]))
+                    lazy(
+                        lambda: repr(
+                            ''.join(left_side + [buffer_re] + regs[i:])
+                        )
+                    )
                 )
 
                 begin = time.time()
@@ -606,9 +760,406 @@ class _RegexExpected(Expected):
             for n, v in replaced_captures.items()
         }
         clog().debug(
-            "Incremental Match:\n##Elapsed: %0.2f secs\n##Left: %s\n\n##Middle: %s\n\n##Right: %s\n\n##Captured: %s\n\n##Buffer: %s",
-            elapsed, got_left, middle_part, got_right, repr(replaced_captures),
+            "Incremental Match:\n##Elapsed: %0.2f secs\n##Left: %s\n\n##Middle: %s\n\n##Right: %s\n\n##Captured: %r\n\n##Buffer: %s",
+            elapsed, got_left, middle_part, got_right, replaced_captures,
             buffer_captured
         )
 
         return got_left + middle_part + got_right, replaced_captures
+
+
+# How to reverse the regexs emitted by the parser (see parser_sm.py) that
+# are not literals, so we can match from the right to the left
+_reversed_regexs = {
+    r'\A': r'\Z',
+    r'\n*\Z': r'\A\n*',
+    r'\s*\Z': r'\A\s*',
+    r'\s': r'\s',
+    r'\s+(?!\s)': r'(?<!\s)\s+',
+}
+
+
+def _reverse_regexs(regexs):
+    r''' Build a regex that matches the reversed strings that the
+        given list of regexs matches; None if we don't know how to
+        reverse one of them.
+
+        >>> from byexample.expected import _reverse_regexs
+        >>> _reverse_regexs([r'\A', 'ab', r'\s+(?!\s)', r'c\.'])
+        '\\.c(?<!\\s)\\s+ba\\Z'
+
+        >>> _reverse_regexs([r'(?P<foo>.*?)']) is None
+        True
+        '''
+    reversed_regexs = []
+    for regex in reversed(regexs):
+        rx = _reversed_regexs.get(regex)
+        if rx is None:
+            literal = _as_literal(regex)
+            if literal is None:
+                return None
+            rx = re.escape(literal[::-1])
+        reversed_regexs.append(rx)
+    return ''.join(reversed_regexs)
+
+
+class _LinearTimeExpected(_LinearExpected):
+    r''' Like _LinearExpected but the captures are guessed in linear
+        time too, without using the regex engine to match the whole
+        expected (see +match-engine).
+
+        The expected is split into chunks by its tags and each chunk is
+        searched once from the left to the right; a tag captures whatever
+        is between the chunk at its left and the chunk at its right.
+        When the example fails, the chunks are searched from the right to
+        the left too in the same way.
+
+        There is no backtracking at all. In exchange, the tags
+        are assumed to be of the form .* or .*? and any other
+        restriction on them is ignored: the captures are a best-effort.
+
+        >>> from byexample.options import Options
+        >>> from byexample.finder import _build_fake_example as build_example
+
+        >>> opts = Options({'norm_ws': False, 'tags': True, 'rm': [], 'input': False,
+        ...         'input_prefix_range': (6, 12), 'match_engine': 'linear',
+        ...         'x': {'min_rcount': 2, 'dfl_timeout': 1}})
+
+        >>> ex = build_example('f()', 'aa<foo>bb<...>cc<bar>', opts=opts)
+        >>> exp = ex.expected
+        >>> type(exp).__name__
+        '_LinearTimeExpected'
+
+        >>> got = 'aaXYZbbxccABC'
+        >>> exp.check_got_output(ex, got, opts, 0)
+        True
+
+        >>> exp.get_captures(ex, got, opts, 0)
+        ('aaXYZbbxccABC', {'bar': 'ABC', 'foo': 'XYZ'})
+
+        The unnamed tags at the end of a line are greedy:
+
+        >>> ex = build_example('f()', '<...>\nx <foo> end\nx <bar> end', opts=opts)
+        >>> got = 'x 1 end\nx 2 end\nx 3 end\nx 4 end'
+
+        >>> ex.expected.get_captures(ex, got, opts, 0)
+        ('x 1 end\nx 2 end\nx 3 end\nx 4 end', {'bar': '4', 'foo': '3'})
+
+        When the example fails, we capture as much as possible
+        from the left and from the right; the rest is left as it
+        is in the expected:
+
+        >>> ex = build_example('f()', 'aa<foo>bb<...>cc<bar>dd', opts=opts)
+        >>> exp = ex.expected
+
+        >>> got = 'aaXYZbbxcABCdd'
+        >>> exp.check_got_output(ex, got, opts, 0)
+        False
+
+        >>> exp.get_captures(ex, got, opts, 0)
+        ('aaXYZbb<...>cc<bar>dd', {'foo': 'XYZ'})
+
+        Like in _RegexExpected, a chunk needs to have a minimum
+        rcount (x.min_rcount) to be trusted:
+
+        >>> opts['x']['min_rcount'] = 3
+        >>> exp.get_captures(ex, got, opts, 0)
+        ('aa<foo>bb<...>cc<bar>dd', {})
+
+        With +norm-ws, the whitespace around a tag is not captured,
+        the same than with the regex engine:
+
+        >>> def captures_by_engine(expected, got):
+        ...     captures = []
+        ...     for engine in ('regex', 'linear'):
+        ...         o = Options({'norm_ws': True, 'tags': True, 'rm': [],
+        ...                 'input': False, 'input_prefix_range': (6, 12),
+        ...                 'match_engine': engine,
+        ...                 'x': {'min_rcount': 2, 'dfl_timeout': 1}})
+        ...         ex = build_example('f()', expected, opts=o)
+        ...         captures.append(ex.expected.get_captures(ex, got, o, 0)[1])
+        ...     return captures
+
+        >>> captures_by_engine('a <foo> b <bar>', 'a   x  y   b  z  ')
+        [{'bar': 'z', 'foo': 'x  y'}, {'bar': 'z', 'foo': 'x  y'}]
+
+        >>> captures_by_engine('<foo> b\n<bar>\nc', '  x  b \n  z \n c')
+        [{'bar': 'z', 'foo': '  x'}, {'bar': 'z', 'foo': '  x'}]
+        '''
+    __slots__ = ('_chunks', '_compiled')
+
+    def __init__(self, *args, **kargs):
+        _LinearExpected.__init__(self, *args, **kargs)
+        self._chunks = None
+        self._compiled = {}
+
+    def get_captures(self, example, got, options, verbosity):
+        if not self._check_got_output_called:
+            self.check_got_output(example, got, options, verbosity)
+
+        self.verbosity = verbosity
+        if not self.tags_by_idx:
+            return (got if self.check_good else self.str), {}
+
+        return self._get_captures_by_linear_match(
+            got, min_rcount=options['x']['min_rcount']
+        )
+
+    def _linear_chunks(self):
+        ''' Split the regexs by the tags in chunks, one more than the
+            count of tags. For each chunk keep:
+             - the chunk as a plain string if it has only literals, or None
+             - the regex to search it from the left to the right
+             - the regex to search it reversed, or None
+             - its rcount
+             - the indexes of its first and past-the-last regexs
+             - the name of the tag at its left, if any
+             - if the tag at its left is greedy or not
+            '''
+        if self._chunks is not None:
+            return self._chunks
+
+        regexs, rcounts = self.regexs, self.rcounts
+
+        chunks = []
+        prev, name, greedy = 0, None, False
+        capture_idxs = list(sorted(self.tags_by_idx.keys()))
+        for capture_idx in capture_idxs + [len(regexs)]:
+            chunk = regexs[prev:capture_idx]
+            literals = [_as_literal(r) for r in chunk]
+            if None in literals:
+                literal = None
+                fwd, bwd = ''.join(chunk), _reverse_regexs(chunk)
+            else:
+                # plain strings: search them with str.find/rfind
+                literal, fwd, bwd = ''.join(literals), None, None
+
+            chunks.append(
+                (
+                    literal, fwd, bwd, sum(rcounts[prev:capture_idx]), prev,
+                    capture_idx, name, greedy
+                )
+            )
+
+            if capture_idx < len(regexs):
+                name = self.tags_by_idx[capture_idx]
+                tag = regexs[capture_idx]
+                greedy = '.*?' not in tag and '.+?' not in tag
+
+            prev = capture_idx + 1
+
+        self._chunks = chunks
+        return chunks
+
+    def _compile(self, regex):
+        ''' Compile the regex once, only if it is really used: compiling
+            is much more expensive than searching. '''
+        try:
+            return self._compiled[regex]
+        except KeyError:
+            r = self._compiled[regex] = re.compile(regex, _flags)
+            return r
+
+    @log_context('byexample.match')
+    def _get_captures_by_linear_match(self, got, min_rcount):
+        chunks = self._linear_chunks()
+        nchunks = len(chunks)
+        rgot = got[::-1]
+
+        # the most right position of each chunk, matching from the right;
+        # only the greedy tags need it
+        rspans = {}
+        if any(chunk[7] for chunk in chunks):
+            rspans = self._match_from_right(chunks, got, rgot, 0, -1)
+
+        # match from the left to the right: the lazy tags take the
+        # leftmost occurrence of the chunk at their right, the greedy
+        # ones take the rightmost
+        lspans = []
+        pos = 0
+        for j, chunk in enumerate(chunks):
+            if chunk[7] and j in rspans and rspans[j][0] >= pos:
+                span = rspans[j]
+            elif chunk[0] is not None:
+                at = got.find(chunk[0], pos)
+                if at < 0:
+                    break
+                span = (at, at + len(chunk[0]))
+            else:
+                m = self._compile(chunk[1]).search(got, pos)
+                if not m:
+                    break
+                span = m.span()
+
+            lspans.append(span)
+            pos = span[1]
+
+        if len(lspans) == nchunks:
+            # all the chunks were found: full match
+            return got, self._captures_between(chunks, lspans, 0, nchunks, got)
+
+        # the first chunk not found may be found partially: see
+        # how much of it we can find
+        failed = len(lspans)
+        partial = self._longest_partial_match(
+            chunks[failed], got, rgot, pos, len(got), from_left=True
+        )
+        if partial and partial[2] >= min_rcount:
+            lspans.append(partial[1])
+            last = failed
+            left_end = partial[1][1]
+            left_ends_at = self.charnos[chunks[failed][4] + partial[0]]
+
+        else:
+            # keep from the left only the chunks up to the last one
+            # with enough rcount
+            last = -1
+            for j in range(failed):
+                if chunks[j][3] >= min_rcount:
+                    last = j
+
+            del lspans[last + 1:]
+            left_end = lspans[last][1] if last >= 0 else 0
+            left_ends_at = self.charnos[chunks[last][5]] if last >= 0 else 0
+
+        # redo the match from the right up to the left side
+        rspans = self._match_from_right(chunks, got, rgot, left_end, last)
+
+        failed = min(rspans) - 1 if rspans else nchunks - 1
+        right = rspans[failed + 1][0] if rspans else len(got)
+        partial = None
+        if failed > last:
+            partial = self._longest_partial_match(
+                chunks[failed], got, rgot, left_end, right, from_left=False
+            )
+
+        if partial and partial[2] >= min_rcount:
+            rspans[failed] = partial[1]
+            first = failed
+            right_begin = partial[1][0]
+            right_begin_at = self.charnos[chunks[failed][5] - partial[0]]
+
+        else:
+            first = nchunks
+            for j in sorted(rspans, reverse=True):
+                if chunks[j][3] >= min_rcount:
+                    first = j
+
+            if first < nchunks:
+                right_begin = rspans[first][0]
+                right_begin_at = self.charnos[chunks[first][4]]
+            else:
+                # like in _RegexExpected, the trailing whitespace of the got
+                # is matched by the end of the expected
+                chars = _at_end_chars_by_re.get(self.regexs[-1], '')
+                right_begin = max(left_end, len(got.rstrip(chars)))
+                right_begin_at = self.charnos[-1]
+
+        captures = self._captures_between(chunks, lspans, 0, last + 1, got)
+        captures.update(
+            self._captures_between(chunks, rspans, first, nchunks, got)
+        )
+
+        # the expected between the left and the right sides is left as is
+        middle_part = self.str[left_ends_at:right_begin_at]
+        clog().debug(
+            "Linear Match:\n##Left: %s\n\n##Middle: %s\n\n##Right: %s\n\n##Captured: %r",
+            lazy(lambda: got[:left_end]), middle_part,
+            lazy(lambda: got[right_begin:]), captures
+        )
+
+        return got[:left_end] + middle_part + got[right_begin:], captures
+
+    def _match_from_right(self, chunks, got, rgot, left_end, last):
+        ''' Search the chunks from the right to the left, up to the
+            chunk <last> (not included), each as much on the right
+            as possible without overlapping the next one and without
+            going before <left_end>.
+
+            <rgot> is the got reversed.
+
+            Return their spans indexed by chunk.
+            '''
+        n = len(got)
+
+        spans = {}
+        right = n
+        for j in range(len(chunks) - 1, last, -1):
+            literal, _, bwd = chunks[j][:3]
+            if literal is not None:
+                at = got.rfind(literal, left_end, right)
+                if at < 0:
+                    break
+                spans[j] = (at, at + len(literal))
+            elif bwd is None:
+                break
+            else:
+                m = self._compile(bwd).search(rgot, n - right, n - left_end)
+                if not m:
+                    break
+                spans[j] = (n - m.end(), n - m.start())
+
+            right = spans[j][0]
+
+        return spans
+
+    def _longest_partial_match(
+        self, chunk, got, rgot, left, right, from_left
+    ):
+        ''' Find the longest prefix (from_left is True) or suffix (False)
+            of the regexs of the chunk that can be found between <left>
+            and <right>, as much on the left (or right) as possible.
+
+            Because if a prefix (or suffix) can be found, any shorter one
+            can be found too, do a binary search.
+
+            Return the count of regexs found, their span and their rcount;
+            None if nothing was found.
+            '''
+        begin, end = chunk[4:6]
+        n = len(got)
+
+        found = None
+        lo, hi = 0, end - begin - 1  # the whole chunk was not found
+        while lo < hi:
+            k = (lo + hi + 1) // 2
+            if from_left:
+                idxs = (begin, begin + k)
+                m = self._compile(''.join(self.regexs[begin:begin + k])
+                                  ).search(got, left, right)
+                span = m and m.span()
+            else:
+                idxs = (end - k, end)
+                bwd = _reverse_regexs(self.regexs[end - k:end])
+                m = bwd and self._compile(bwd).search(rgot, n - right, n - left)
+                span = m and (n - m.end(), n - m.start())
+
+            if m:
+                lo = k
+                found = (k, span, sum(self.rcounts[idxs[0]:idxs[1]]))
+            else:
+                hi = k - 1
+
+        return found
+
+    def _captures_between(self, chunks, spans, begin, end, got):
+        ''' Return the captures of the named tags that are between
+            the chunks in [begin, end) with known spans.
+
+            Like the regex of the tag, the capture does not begin or end
+            with whitespace if the tag's regex says so (+norm-ws).'''
+        captures = {}
+        for j in range(begin + 1, end):
+            name = chunks[j][6]
+            if name is not None:
+                captured = got[spans[j - 1][1]:spans[j][0]]
+
+                # the tag is right before the chunk
+                tag = self.regexs[chunks[j][4] - 1]
+                if _ws_before_capture in tag:
+                    captured = captured.lstrip()
+                if _no_ws_after_capture in tag:
+                    captured = captured.rstrip()
+
+                captures[regex_name_as_tag_name(name)] = captured
+        return captures
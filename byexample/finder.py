@@ -1,10 +1,11 @@
 from __future__ import unicode_literals
-import re, os
+import re, os, bisect
 from .common import build_where_msg, tohuman, \
                     enhance_exceptions
 
 from .parser import ExampleParser
 from .options import Options
+from .cache import ExamplesCache
 from .log import clog, log_context, DEBUG, CHAT, log_with
 
 from .example import Where, Zone, Example
@@ -14,6 +15,42 @@ from .example import Where, Zone, Example
 '''
 
 
+class NewlineIndex(object):
+    r''' Offsets of the newlines of a string to count them in any
+        range of the string by bisection, without copying it.
+
+        The index is built on the first use.
+
+        >>> from byexample.finder import NewlineIndex
+        >>> newlines = NewlineIndex('foo\nbar\n\nbaz')
+
+        >>> newlines.count(0, 3)     # from 'f' to 'o', both inclusive
+        0
+        >>> newlines.count(0, 4)     # now the first '\n' is included
+        1
+        >>> newlines.count(4, 12)    # from 'b' of 'bar' to the end
+        2
+        >>> newlines.count(0)
+        3
+        '''
+    def __init__(self, string):
+        self.string = string
+        self._offsets = None
+
+    def count(self, begin, end=None):
+        ''' Count how many newlines are in string[begin:end]. '''
+        if self._offsets is None:
+            self._offsets = [
+                m.start() for m in re.finditer('\n', self.string)
+            ]
+
+        if end is None:
+            end = len(self.string)
+
+        return bisect.bisect_left(self._offsets, end) - \
+               bisect.bisect_left(self._offsets, begin)
+
+
 def _build_fake_example(
     snippet,
     expected,
@@ -65,6 +102,39 @@ def _build_fake_example(
     return e
 
 
+def declared_inputs(examples):
+    r''' Return the files and the environment variables that the
+        <examples> declared as their inputs with +depends-on and
+        +depends-on-env.
+
+        Only the options of the examples are extracted, the examples
+        are not parsed.
+
+        >>> from byexample.finder import declared_inputs, _build_fake_example
+        >>> from byexample.options import Options
+
+        >>> ex1 = _build_fake_example('cat a.txt', '', fully_parsed=False,
+        ...             opts=Options({'depends_on': ['a.txt'],
+        ...                           'depends_on_env': ['HOME']}))
+        >>> ex2 = _build_fake_example('1 + 2', '3', fully_parsed=False)
+
+        >>> files, envs = declared_inputs([ex1, ex2])
+        >>> sorted(files), sorted(envs)
+        (['a.txt'], ['HOME'])
+        '''
+    files, envs = set(), set()
+    for example in examples:
+        try:
+            options = example.parser.extract_options(example.snippet)
+        except Exception:
+            continue
+
+        files.update(options.get('depends_on', []))
+        envs.update(options.get('depends_on_env', []))
+
+    return files, envs
+
+
 class ExampleHarvest(object):
     '''
                   Finding process             Parsing process
@@ -92,8 +162,15 @@ class ExampleHarvest(object):
                                        \         .
     '''
     def __init__(
-        self, allowed_languages, registry, verbosity, options, use_colors,
-        encoding, **unused
+        self,
+        allowed_languages,
+        registry,
+        verbosity,
+        options,
+        use_colors,
+        encoding,
+        examples_cache=None,
+        **unused
     ):
         self.allowed_languages = allowed_languages
         self.verbosity = verbosity
@@ -101,6 +178,23 @@ class ExampleHarvest(object):
         self.available_finders = registry['finders'].values()
         self.encoding = encoding
 
+        self.finder_by_target = registry['finders']
+
+        # see get_examples_from_string
+        self.finders_and_prefilters = [
+            (finder, finder.example_prefilter())
+            for finder in self.available_finders
+        ]
+        self.target_of_finder = {
+            finder: target
+            for target, finder in registry['finders'].items()
+        }
+
+        # see -x-examples-cache
+        if examples_cache is None:
+            examples_cache = ExamplesCache(disabled=True)
+        self.examples_cache = examples_cache
+
         self.parser_by_language = registry['parsers']
         self.runner_by_language = registry['runners']
         self.zdelimiter_by_file_extension = registry['zdelimiters']
@@ -110,70 +204,181 @@ class ExampleHarvest(object):
     def __repr__(self):
         return 'Example Harvester'
 
-    def get_examples_from_file(self, filepath):
+    def _read(self, filepath):
         f = open(filepath, 'rtU', encoding=self.encoding)
 
         with f as f:
-            string = f.read()
+            return f.read()
+
+    def iter_examples_from_file(self, filepath):
+        ''' Like get_examples_from_file but yield the examples, in order,
+            while they are found (see iter_examples_from_string).
+
+            The examples are not cached (-x-examples-cache): if the cache
+            is enabled, all the examples are found (or loaded from the
+            cache) first.
+            '''
+        if not self.examples_cache.disabled:
+            yield from self.get_examples_from_file(filepath)
+            return
+
+        yield from self.iter_examples_from_string(
+            self._read(filepath), filepath
+        )
+
+    def get_examples_from_file(self, filepath):
+        string = self._read(filepath)
+
+        if self.examples_cache.disabled:
+            return self.get_examples_from_string(string, filepath)
+
+        entry = self.examples_cache.load(filepath, string)
+        if entry['examples'] is None:
+            examples = self.get_examples_from_string(string, filepath)
+            entry['examples'] = [self._as_cache_record(e) for e in examples]
+        else:
+            examples = [
+                self._from_cache_record(record, filepath)
+                for record in entry['examples']
+            ]
+            clog().chat(
+                "File '%s': %i examples (from the cache)", filepath,
+                len(examples)
+            )
+
+        # the parser will reuse the regexs built from the previous runs
+        # and it will add the new ones here
+        for example in examples:
+            example.regexs_cache = entry['regexs']
+
+        return examples
 
-        return self.get_examples_from_string(string, filepath)
+    def _as_cache_record(self, example):
+        ''' Return the minimum to rebuild the <example>, not parsed yet,
+            with _from_cache_record.'''
+        return (
+            self.target_of_finder[example.finder], example.runner.language,
+            example.snippet, example.expected_str, example.indentation,
+            example.start_lineno, example.end_lineno
+        )
+
+    def _from_cache_record(self, record, filepath):
+        target, language, snippet, expected, indent, start_lineno, end_lineno = record
 
-    @log_context('byexample.zones')
-    def _get_zones(self, string, filepath='<string>'):
+        where = Where(start_lineno, end_lineno, filepath, None)
+        return Example(
+            self.finder_by_target[target],
+            self.runner_by_language[language],
+            self.parser_by_language[language], snippet, expected, indent,
+            where
+        )
+
+    def _iter_zones(self, string, filepath, newlines):
         _, ext = os.path.splitext(filepath)
 
         zdelimiter = self.zdelimiter_by_file_extension.get(
             ext, self.zdelimiter_by_file_extension['no-delimiter']
         )
-        zones = self.get_zones_using(
-            zdelimiter, string, filepath, start_lineno=1
-        )
-
-        clog().chat(
-            "File '%s': %i zones [%s]", filepath, len(zones), str(zdelimiter)
+        zones = self.iter_items_using(
+            zdelimiter, string, self.get_zone, filepath, start_lineno=1,
+            newlines=newlines
         )
 
-        if clog().isEnabledFor(DEBUG):
-            for zone in zones:
+        nzones = 0
+        for zone in zones:
+            nzones += 1
+            with log_with('byexample.zones', child=False):
                 clog().debug("Zone %s", zone.where)
+            yield zone
 
-        return zones
+        with log_with('byexample.zones', child=False):
+            clog().chat(
+                "File '%s': %i zones [%s]", filepath, nzones, str(zdelimiter)
+            )
 
     @log_context('byexample.find')
     def get_examples_from_string(self, string, filepath='<string>'):
-        all_examples = []
-        zones = self._get_zones(string, filepath)
-
-        for finder in self.available_finders:
-            nexamples = 0
-            for zone in zones:
-                examples = self.get_examples_using(
-                    finder, zone.str, zone.where.filepath,
-                    zone.where.start_lineno
+        return list(self.iter_examples_from_string(string, filepath))
+
+    def iter_examples_from_string(self, string, filepath='<string>'):
+        r'''
+        Like get_examples_from_string but yield the examples, in order, as
+        they are found: the examples of a zone are yielded before looking
+        for the next zone.
+
+        The examples of different zones cannot overlap so the overlap
+        is checked within each zone (see check_example_overlap).
+        '''
+        file_newlines = NewlineIndex(string)
+
+        # visit each zone once, running only the finders that could
+        # find something there according to their prefilters
+        found = dict.fromkeys(self.available_finders, 0)
+        kept = dict.fromkeys(self.available_finders, 0)
+        languages = set()
+        nzones = 0
+        for zone in self._iter_zones(string, filepath, file_newlines):
+            nzones += 1
+            examples = self._get_examples_from_zone(
+                zone, string, file_newlines, found
+            )
+            for example in examples:
+                kept[example.finder] += 1
+                languages.add(example.runner.language)
+
+            yield from examples
+
+        with log_with('byexample.find', child=False):
+            log = clog()
+            for finder in self.available_finders:
+                log.chat(
+                    "File '%s': %i examples [%s]", filepath, found[finder],
+                    str(finder)
                 )
-                all_examples.extend(examples)
-                nexamples += len(examples)
 
-            clog().chat(
-                "File '%s': %i examples [%s]", filepath, nexamples,
-                str(finder)
+            if log.isEnabledFor(CHAT):
+                log.debug("Examples after removing any overlapping")
+                for finder in self.available_finders:
+                    if kept[finder]:
+                        log.chat(
+                            "File '%s': %i examples [%s]", filepath,
+                            kept[finder], str(finder)
+                        )
+
+            log.chat(
+                "Findings in file '%s': %i examples written in %i different languages in %i zones were found.",
+                filepath, sum(kept.values()), len(languages), nzones
+            )
+
+    @log_context('byexample.find')
+    def _get_examples_from_zone(self, zone, string, file_newlines, found):
+        # the zone may be the whole string (no zone delimiter);
+        # otherwise index its newlines, once for all the finders
+        if zone.str is string:
+            newlines = file_newlines
+        else:
+            newlines = NewlineIndex(zone.str)
+
+        all_examples = []
+        for finder, prefilter in self.finders_and_prefilters:
+            if prefilter is not None and prefilter not in zone.str:
+                continue
+
+            examples = self.get_examples_using(
+                finder, zone.str, zone.where.filepath, zone.where.start_lineno,
+                newlines
             )
+            all_examples.extend(examples)
+            found[finder] += len(examples)
 
         # sort the examples in the same order
-        # that they were found in the file/string;
+        # that they were found in the zone;
         # see check_example_overlap
         all_examples.sort(
             key=lambda this: (this.start_lineno, -this.end_lineno)
         )
 
-        all_examples = self.check_example_overlap(all_examples, filepath)
-
-        tmp = set(e.runner.language for e in all_examples)
-        clog().chat(
-            "Findings in file '%s': %i examples written in %i different languages in %i zones were found.",
-            filepath, len(all_examples), len(tmp), len(zones)
-        )
-        return all_examples
+        return self.check_example_overlap(all_examples, zone.where.filepath)
 
     def check_example_overlap(self, examples, filepath):
         r'''
@@ -239,36 +444,34 @@ class ExampleHarvest(object):
 
         '''
 
-        collision_free = False
-        while not collision_free:
-            collision_free = True
-            if not examples:
-                return examples  # pragma: no cover
-
-            prev = examples[0]
-            for i, example in enumerate(examples[1:], 1):
-                collision_type_1 = prev.start_lineno == example.start_lineno
-                collision_type_2 = not collision_type_1 and \
-                                    (example.end_lineno <= prev.end_lineno)
-                collision_type_3 = not collision_type_1 and \
-                                    not collision_type_2 and \
-                                    example.start_lineno <= prev.end_lineno
-
-                any_collision = collision_type_1 or collision_type_2 or collision_type_3
-                if not any_collision:
-                    prev = example
-                    continue
-
-                collision_free = not any_collision
-                curr_where = Where(
-                    example.start_lineno, example.end_lineno, filepath,
-                    example.zdelimiter
-                )
-                prev_where = Where(
-                    prev.start_lineno, prev.end_lineno, filepath,
-                    prev.zdelimiter
-                )
+        if not examples:
+            return examples  # pragma: no cover
+
+        # a single sweep: the examples are sorted so an example can only
+        # collide with the last one kept (the examples dropped are inside
+        # of it)
+        debug = clog().isEnabledFor(DEBUG)
+        kept = [examples[0]]
+        for example in examples[1:]:
+            prev = kept[-1]
+            collision_type_1 = prev.start_lineno == example.start_lineno
+            collision_type_2 = not collision_type_1 and \
+                                (example.end_lineno <= prev.end_lineno)
+            collision_type_3 = not collision_type_1 and \
+                                not collision_type_2 and \
+                                example.start_lineno <= prev.end_lineno
+
+            any_collision = collision_type_1 or collision_type_2 or collision_type_3
+            if not any_collision:
+                kept.append(example)
+                continue
+
+            curr_where = Where(
+                example.start_lineno, example.end_lineno, filepath,
+                example.zdelimiter
+            )
 
+            if debug:
                 self._log_debug(" * Collision Type (1/2/3): %s/%s/%s\n"        \
                                 " * Languages (prev/current): %s/%s\n"         \
                                     % (collision_type_1, collision_type_2,
@@ -277,30 +480,21 @@ class ExampleHarvest(object):
                 prev.pretty_print()
                 example.pretty_print()
 
-                if collision_type_2:
-                    del examples[i]
-                    self._log_drop("inner example", curr_where)
-                    break
-
-                msg = "In %s, examples at lines %i-%i (found by %s) and " +\
-                      "at lines %i-%i (found by %s) overlap each other."
-                msg = msg % (
-                    filepath, example.start_lineno, example.end_lineno,
-                    example.finder, prev.start_lineno, prev.end_lineno,
-                    prev.finder
-                )
-                raise ValueError(msg)
-
-        if clog().isEnabledFor(CHAT):
-            clog().debug("Examples after removing any overlapping")
-            for finder in set(e.finder for e in examples):
-                clog().chat(
-                    "File '%s': %i examples [%s]", filepath,
-                    len([e for e in examples if e.finder == finder]),
-                    str(finder)
-                )
+            if collision_type_2:
+                self._log_drop("inner example", curr_where)
+                continue
+
+            msg = "In %s, examples at lines %i-%i (found by %s) and " +\
+                  "at lines %i-%i (found by %s) overlap each other."
+            msg = msg % (
+                filepath, example.start_lineno, example.end_lineno,
+                example.finder, prev.start_lineno, prev.end_lineno,
+                prev.finder
+            )
+            raise ValueError(msg)
 
-        if True or clog().isEnabledFor(DEBUG):
+        examples = kept
+        if debug:
             for e in examples:
                 e.pretty_print()
         return examples
@@ -309,17 +503,34 @@ class ExampleHarvest(object):
         self._log_debug(" => Dropped example: " + reason, where)
 
     def _log_debug(self, what, where):
-        clog().debug(build_where_msg(where, self, what))
+        log = clog()
+        if log.isEnabledFor(DEBUG):
+            log.debug(build_where_msg(where, self, what))
 
-    def get_examples_using(self, finder, string, filepath, start_lineno):
+    def get_examples_using(
+        self, finder, string, filepath, start_lineno, newlines=None
+    ):
         return self.from_string_get_items_using(
-            finder, string, self.get_example, 'examples', filepath,
-            start_lineno
+            finder,
+            string,
+            self.get_example,
+            'examples',
+            filepath,
+            start_lineno,
+            newlines=newlines
         )
 
-    def get_zones_using(self, zdelimiter, string, filepath, start_lineno):
+    def get_zones_using(
+        self, zdelimiter, string, filepath, start_lineno, newlines=None
+    ):
         return self.from_string_get_items_using(
-            zdelimiter, string, self.get_zone, 'zones', filepath, start_lineno
+            zdelimiter,
+            string,
+            self.get_zone,
+            'zones',
+            filepath,
+            start_lineno,
+            newlines=newlines
         )
 
     def get_example(self, finder, match, where):
@@ -381,30 +592,49 @@ class ExampleHarvest(object):
         what,
         filepath='<string>',
         start_lineno=1,
-        zdelimiter=None
+        zdelimiter=None,
+        newlines=None
+    ):
+        return list(
+            self.iter_items_using(
+                matcher, string, getter, filepath, start_lineno, zdelimiter,
+                newlines
+            )
+        )
+
+    def iter_items_using(
+        self,
+        matcher,
+        string,
+        getter,
+        filepath='<string>',
+        start_lineno=1,
+        zdelimiter=None,
+        newlines=None
     ):
+        if newlines is None:
+            newlines = NewlineIndex(string)
+
         charno = 0
-        items = []
 
         for match in matcher.get_matches(string):
-            str_matched = string[match.start():match.end()]
-            if str_matched.endswith('\n'):
-                str_matched = str_matched[:-1]
+            begin, end = match.span()
+            if end > begin and string[end - 1] == '\n':
+                end -= 1  # ignore the trailing newline (if any)
 
             # start_lineno and end_lineno are inclusive
-            start_lineno += string[charno:match.start()].count('\n')
-            end_lineno = start_lineno + str_matched.count('\n')
+            start_lineno += newlines.count(charno, begin)
+            end_lineno = start_lineno + newlines.count(begin, end)
 
             # update charno here
-            charno = match.start()
+            charno = begin
 
             # where we are, used for the messages of the exceptions
             where = Where(start_lineno, end_lineno, filepath, zdelimiter)
 
             item = getter(matcher, match, where)
             if item is not None:
-                items.append(item)
-        return items
+                yield item
 
 
 class ExampleFinder(object):
@@ -420,6 +650,16 @@ class ExampleFinder(object):
     def get_matches(self, string):
         return self.example_regex().finditer(string)
 
+    def example_prefilter(self):
+        ''' Return a string that must be in any string where this finder
+            could find an example (typically its prompt) or None if
+            there is no such string.
+
+            The zones that do not have it are skipped without running
+            the (more expensive) example_regex on them.
+            '''
+        return None
+
     def get_language_of(self, options, match, where):
         raise NotImplementedError()  # pragma: no cover
 
@@ -1,9 +1,10 @@
 from __future__ import unicode_literals
-import sys, pkgutil, inspect, pprint, os
+import sys, pkgutil, inspect, pprint, os, time
 
 from .options import Options, OptionParser
 from .runner import ExampleRunner
 from .finder import ExampleHarvest, ExampleFinder, ZoneDelimiter
+from .cache import ExamplesCache, ModulesManifest, ResultsCache
 from .executor import FileExecutor
 from .differ import Differ
 from .parser import ExampleParser
@@ -66,8 +67,71 @@ def is_a(target_class, key_attr, warn_missing_key_attr):
     return _is_X
 
 
+def _module_filepath(importer, name):
+    try:
+        return importer.find_spec(name).origin
+    except Exception:
+        return None
+
+
 @log_context('byexample.load')
-def load_modules(dirnames, cfg):
+def load_modules(dirnames, cfg, languages=None, manifest=None):
+    ''' Load the modules from <dirnames> and return a registry
+        of the runners, finders, parsers, concerns and zone delimiters
+        found in them.
+
+        If <languages> is given, the modules that the <manifest> knows
+        that register runners and parsers only for other languages are
+        not even imported. The rest (new, modified or language-agnostic
+        modules) are imported and recorded in the <manifest>.
+
+        Note that a module that defines a concern or a zone delimiter
+        is language-agnostic and it is always imported even if it
+        also defines runners or parsers. The time spent in the skipped
+        modules is not known so it is not reported.
+
+        >>> from byexample.init import load_modules
+        >>> from byexample.cache import ModulesManifest
+        >>> from byexample.log import init_log_system
+        >>> import tempfile, os, shutil
+        >>> init_log_system()
+
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> with open(os.path.join(tmpdir, 'foolang.py'), 'wt') as f:
+        ...     _ = f.write(
+        ...         'from byexample.runner import ExampleRunner\n'
+        ...         'print("foolang imported")\n'
+        ...         'class FooRunner(ExampleRunner):\n'
+        ...         '    language = "foo"\n'
+        ...     )
+
+        >>> cfg = {'verbosity': 0, 'encoding': 'utf-8'}
+        >>> manifest = ModulesManifest(None)
+
+        The first time the module is unknown so it is imported even if
+        its language was not selected:
+
+        >>> registry = load_modules([tmpdir], cfg, ['bar'], manifest)
+        foolang imported
+        >>> list(registry['runners'])
+        ['foo']
+
+        The second time the manifest knows that the module is only
+        for 'foo' so it is not imported:
+
+        >>> registry = load_modules([tmpdir], cfg, ['bar'], manifest)
+        >>> list(registry['runners'])
+        []
+
+        But it is if 'foo' is selected:
+
+        >>> registry = load_modules([tmpdir], cfg, ['foo'], manifest)
+        foolang imported
+        >>> list(registry['runners'])
+        ['foo']
+
+        >>> shutil.rmtree(tmpdir)
+        '''
     verbosity = cfg['verbosity']
     registry = {
         'runners': {},
@@ -76,11 +140,29 @@ def load_modules(dirnames, cfg):
         'concerns': {},
         'zdelimiters': {},
     }
+    languages = set(languages or [])
+
+    begin = time.time()
+    nloaded = nskipped = 0
     for importer, name, is_pkg in pkgutil.iter_modules(dirnames):
         path = importer.path
+        filepath = _module_filepath(importer, name)
+
+        known = None
+        if manifest is not None and filepath:
+            known = manifest.languages_of(filepath)
+
+        if languages and known and not languages.intersection(known):
+            clog().chat(
+                "From '%s' skipped '%s': it is for %s only.", path, name,
+                ', '.join(known)
+            )
+            nskipped += 1
+            continue
 
         clog().debug("From '%s' loading '%s'...", path, name)
 
+        module_begin = time.time()
         try:
             module = importer.find_module(name).load_module(name)
         except Exception as e:
@@ -95,7 +177,14 @@ def load_modules(dirnames, cfg):
         ):
             stability = 'experimental/%s?' % str(stability)
 
-        clog().chat("From '%s' loaded '%s' (%s)", path, name, stability)
+        clog().info(
+            "From '%s' loaded '%s' (%s) in %0.1f ms", path, name, stability,
+            (time.time() - module_begin) * 1000
+        )
+        nloaded += 1
+
+        module_languages = set()
+        language_agnostic = False
         for klass, key, what in [
             (ExampleRunner, 'language', 'runners'),
             (ExampleParser, 'language', 'parsers'),
@@ -135,12 +224,28 @@ def load_modules(dirnames, cfg):
                             container[k] = obj
                         loaded_objs.append(obj)
 
+                        # concerns and zone delimiters don't depend on
+                        # the language: the module is always needed
+                        if what in ('runners', 'parsers'):
+                            module_languages.update(key_value)
+                        elif what in ('concerns', 'zdelimiters'):
+                            language_agnostic = True
+
                 clog().chat(
                     "\n".join((" - %s" % repr(i)) for i in loaded_objs)
                 )
             else:
                 clog().chat("No classes found for '%s'.", what)
 
+        if manifest is not None and filepath:
+            manifest.record(
+                filepath, [] if language_agnostic else module_languages
+            )
+
+    clog().info(
+        "Modules loaded in %0.1f ms (%i loaded, %i skipped).",
+        (time.time() - begin) * 1000, nloaded, nskipped
+    )
     return registry
 
 
@@ -198,6 +303,14 @@ def _range(x):
     return (min, max)
 
 
+def _output_limit(x):
+    limit = int(x)
+    if limit <= 0:
+        raise ValueError("Invalid output limit %s" % x)
+
+    return limit
+
+
 def get_default_options_parser(cmdline_args):
     options_parser = OptionParser()
     options_parser.add_flag(
@@ -230,18 +343,45 @@ def get_default_options_parser(cmdline_args):
         action='append',
         help="remove a character from the got and expected strings."
     )
+    options_parser.add_argument(
+        "+depends-on",
+        default=[],
+        action='append',
+        help=
+        "with --watch or --results-cache, run the file again if this other file changes."
+    )
+    options_parser.add_argument(
+        "+depends-on-env",
+        default=[],
+        action='append',
+        help=
+        "with --results-cache, run the file again if this environment variable changes."
+    )
     options_parser.add_argument(
         "+timeout",
         default=cmdline_args.timeout,
         type=float,
         help="timeout in seconds to complete the example."
     )
+    options_parser.add_argument(
+        "+output-limit",
+        default=1024 * 1024,
+        type=_output_limit,
+        help=
+        "maximum count of characters of output to keep, the first and the last half; the rest is truncated (default to 1048576)."
+    )
     options_parser.add_argument(
         "+diff",
         default=cmdline_args.diff,
         choices=['none', 'unified', 'ndiff', 'context', 'tool'],
         help="select diff algorithm."
     )
+    options_parser.add_argument(
+        "+match-engine",
+        default='regex',
+        choices=['regex', 'linear'],
+        help="select the engine to match the expected output and guess the captures: regex (default) or linear (linear time, best-effort captures)."
+    )
     options_parser.add_argument(
         "+geometry",
         default=(24, 80),
@@ -267,6 +407,12 @@ def get_default_options_parser(cmdline_args):
         help=
         "amount of characters that must precede at minimum/maximum an input tag in the form min:max"
     )
+    options_parser.add_flag(
+        "batch-send",
+        default=False,
+        help=
+        "send several lines of the example at once instead of one by one; it makes long shell examples faster (ignored with +input)."
+    )
 
     return options_parser
 
@@ -280,6 +426,7 @@ def get_options(args, cfg):
             'interact': False,
             'shebangs': args.shebangs,
             'difftool': args.difftool,
+            'profile_out': args.profile_out,
         }
     )
     clog().chat("Options (cmdline): %s", options)
@@ -415,10 +562,12 @@ def verbosity_to_log_levels(verbosity, quiet):
         },
         {
             'byexample': NOTE,
+            'byexample.load': INFO,
             'byexample.exec': INFO
         },  # -v
         {
             'byexample': NOTE,
+            'byexample.load': INFO,
             'byexample.exec': CHAT
         },  # -vv
         {
@@ -439,6 +588,47 @@ def verbosity_to_log_levels(verbosity, quiet):
     return tmp[min(verbosity, len(tmp) - 1)]
 
 
+def examples_cache_salt(registry, allowed_languages):
+    ''' Return a string that summarizes what the examples found and parsed
+        depend on besides the content of the file: byexample's version,
+        the languages allowed and the finders, parsers, runners and
+        zone delimiters loaded (and when their modules were modified).
+        '''
+    from . import __version__
+    salt = [__version__, ','.join(sorted(allowed_languages))]
+    for what in ('finders', 'parsers', 'runners', 'zdelimiters'):
+        for key, obj in sorted(registry[what].items()):
+            klass = type(obj)
+            try:
+                module = sys.modules[klass.__module__]
+                mtime = os.path.getmtime(module.__file__)
+            except (KeyError, AttributeError, TypeError, OSError):
+                mtime = None
+
+            salt.append(
+                '%s:%s:%s.%s:%s' %
+                (what, key, klass.__module__, klass.__name__, mtime)
+            )
+
+    return '\n'.join(salt)
+
+
+def results_cache_salt(args, registry, allowed_languages):
+    ''' Return a string that summarizes what the results of the examples
+        depend on besides the content of the file and its inputs:
+        the same that the examples depend on (see examples_cache_salt)
+        plus the options from the command line that may change a result.
+        '''
+    salt = [examples_cache_salt(registry, allowed_languages)]
+    for name in (
+        'options_str', 'timeout', 'encoding', 'shebangs', 'x_dfl_timeout',
+        'x_delaybeforesend', 'x_not_recover_timeout'
+    ):
+        salt.append('%s:%r' % (name, getattr(args, name, None)))
+
+    return '\n'.join(salt)
+
+
 @log_context('byexample.init')
 def init(args):
     lvl = verbosity_to_log_levels(args.verbosity, args.quiet)
@@ -468,7 +658,11 @@ def init(args):
     # if the output has not color support, disable the color anyways
     cfg['use_colors'] &= are_tty_colors_supported(cfg['output'])
 
-    registry = load_modules(args.modules_dirs, cfg)
+    manifest = ModulesManifest(ModulesManifest.default_filepath())
+    registry = load_modules(
+        args.modules_dirs, cfg, languages=args.languages, manifest=manifest
+    )
+    manifest.save()
 
     allowed_languages = get_allowed_languages(registry, args.languages)
 
@@ -506,8 +700,27 @@ def init(args):
 
     differ = Differ(**cfg)
 
-    harvester = ExampleHarvest(allowed_languages, registry, **cfg)
-    executor = FileExecutor(concerns, differ, **cfg)
+    examples_cache = ExamplesCache(
+        disabled=not options['x']['examples_cache'],
+        salt=examples_cache_salt(registry, allowed_languages)
+    )
+
+    harvester = ExampleHarvest(
+        allowed_languages, registry, examples_cache=examples_cache, **cfg
+    )
+    # in watch mode the files are executed again and again: keep
+    # the runners alive between the runs
+    if args.watch:
+        options['x']['warm_runners'] = True
+
+    results_cache = ResultsCache(
+        args.results_cache,
+        salt=results_cache_salt(args, registry, allowed_languages)
+    )
+
+    executor = FileExecutor(
+        concerns, differ, results_cache=results_cache, **cfg
+    )
 
     configure_log_system(use_colors=cfg['use_colors'], concerns=concerns)
     return testfiles, harvester, executor, options
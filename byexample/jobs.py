@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 from multiprocessing import Queue, Process
-import signal, contextlib
+import signal, contextlib, time, os, json
+import appdirs
 from .log import clog, CHAT
 
 
@@ -11,26 +12,211 @@ class Status:
     error = 3
 
 
-def worker(func, sigint_handler, input, output):
+def worker(func, sigint_handler, input, output, finalize=None):
     ''' Generic worker: call <func> for each item pulled from
         the <input> queue until a None gets pulled.
 
         For each result obtained from calling <func>, push the
+        item, the time elapsed (wall time in seconds) and the
         result into <output> queue.
 
-        After receiving a None, close the <output> queue.
+        After receiving a None, call <finalize> (if any) and
+        close the <output> queue. <finalize> is called even if
+        <func> raised.
         '''
-    for item in iter(input.get, None):
-        output.put(func(item, sigint_handler))
+    try:
+        for item in iter(input.get, None):
+            begin = time.time()
+            result = func(item, sigint_handler)
+            output.put((item, time.time() - begin, result))
+    finally:
+        if finalize is not None:
+            finalize()
     output.close()
     output.join_thread()
 
 
+def _file_size(filename):
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+class JobsHistory(object):
+    r''' Keep track of how long took to process each file in the
+        previous runs so the longest files can be scheduled first.
+
+        The history is a small JSON file that lives in the user's
+        cache directory, next to the regex cache. If <filename> is None,
+        the history is kept in memory only.
+
+        >>> from byexample.jobs import JobsHistory
+        >>> history = JobsHistory(None)
+
+        Without any history, the longest files are estimated
+        by their sizes:
+
+        >>> sizes = {'a.md': 10, 'b.md': 300, 'c.md': 20}
+        >>> history.longest_first(['a.md', 'b.md', 'c.md'], sizes.get)
+        ['b.md', 'c.md', 'a.md']
+
+        Once we record how long took each file, the recorded wall times
+        are used instead. The files without history are estimated from
+        their sizes and from the seconds-per-byte rate seen so far:
+
+        >>> history.record('a.md', 5.0, size=10)
+        >>> history.record('c.md', 1.0, size=20)
+        >>> history.longest_first(['a.md', 'b.md', 'c.md'], sizes.get)
+        ['b.md', 'a.md', 'c.md']
+
+        New records are averaged with the previous ones to smooth
+        out the noise of a single run:
+
+        >>> history.record('c.md', 11.0, size=20)
+        >>> history.longest_first(['a.md', 'c.md'], sizes.get)
+        ['c.md', 'a.md']
+
+        When the history is saved, the entries of the files that
+        do not exist any longer are dropped so the history does not
+        grow without bound:
+
+        >>> import json, os, tempfile
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> filename = os.path.join(tmpdir, 'history.json')
+        >>> existing = os.path.join(tmpdir, 'existing.md')
+        >>> with open(existing, 'wt') as f:
+        ...     _ = f.write('foo')
+
+        >>> history = JobsHistory(filename)
+        >>> history.record(existing, 1.0)
+        >>> history.record(os.path.join(tmpdir, 'removed.md'), 2.0, size=4)
+        >>> history.save()
+
+        >>> with open(filename, 'rt') as f:
+        ...     list(json.load(f)) == [existing]
+        True
+
+        >>> os.remove(existing); os.remove(filename); os.rmdir(tmpdir)
+        '''
+    def __init__(self, filename):
+        self.filename = filename
+        self._updated = {}
+        if filename:
+            self._durations = self._load_from_disk()
+        else:
+            self._durations = {}
+
+    @classmethod
+    def default_filepath(cls):
+        ''' Return the path to the history file in the user's
+            cache directory, creating any directory needed.
+            '''
+        dir = appdirs.user_cache_dir(appname='byexample')
+        os.makedirs(dir, exist_ok=True)
+        return os.path.join(dir, 'jobs-history.json')
+
+    def _load_from_disk(self):
+        from .cache import flock
+        try:
+            with open(self.filename, 'rt') as f, flock(f, read_lock=True):
+                return self._read_or_empty(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as err:
+            clog().info(
+                "Jobs history '%s' could not be loaded: %s", self.filename,
+                err
+            )
+            return {}
+
+    def _read_or_empty(self, file):
+        try:
+            durations = json.loads(file.read() or '{}')
+            assert isinstance(durations, dict)
+            return durations
+        except:
+            # possible corrupt history, ignore it
+            clog().info("Jobs history '%s' corrupted.", self.filename)
+            return {}
+
+    def record(self, item, elapsed, size=None):
+        ''' Record that <item> (a file) took <elapsed> seconds
+            to be processed.'''
+        key = os.path.abspath(item)
+        if size is None:
+            size = _file_size(item)
+
+        if key in self._durations:
+            elapsed = (self._durations[key][0] + elapsed) / 2
+
+        self._durations[key] = self._updated[key] = [elapsed, size]
+
+    def longest_first(self, items, size_of=_file_size):
+        ''' Return a copy of <items> sorted by their expected
+            processing time, the longest first.'''
+        durations = self._durations
+        known = [
+            durations[key] for key in (os.path.abspath(i) for i in items)
+            if key in durations
+        ]
+
+        # seconds per byte; if we don't know anything the files
+        # are sorted by size
+        total_size = sum(size for _, size in known)
+        if total_size:
+            rate = sum(elapsed for elapsed, _ in known) / total_size
+        else:
+            rate = 1
+
+        def expected_time(item):
+            try:
+                return durations[os.path.abspath(item)][0]
+            except KeyError:
+                return (size_of(item) or 0) * rate
+
+        return sorted(items, key=expected_time, reverse=True)
+
+    def save(self):
+        ''' Merge the new records into the history in disk. '''
+        if not self.filename or not self._updated:
+            return
+
+        from .cache import flock
+        try:
+            with open(self.filename, 'a+') as f, flock(f):
+                # get a fresh disk version in case that other
+                # byexample instance had touched the history
+                f.seek(0, 0)
+                durations = self._read_or_empty(f)
+                durations.update(self._updated)
+
+                # forget the files removed or renamed
+                durations = {
+                    key: val
+                    for key, val in durations.items() if os.path.exists(key)
+                }
+
+                f.seek(0, 0)
+                f.truncate()
+                json.dump(durations, f)
+        except Exception as err:
+            clog().info(
+                "Jobs history '%s' could not be saved: %s", self.filename,
+                err
+            )
+            return
+
+        self._updated = {}
+
+
 class Jobs(object):
-    def __init__(self, njobs):
+    def __init__(self, njobs, history=None):
         self.njobs = njobs
+        self.history = history
+        self.user_aborted = False
 
-    def spawn_jobs(self, func, items):
+    def spawn_jobs(self, func, items, finalize=None):
         ''' Spawn <njobs> jobs to process <items> in parallel/concurrently.
 
             The processes are started and feeded with the first <njobs> items
@@ -38,6 +224,9 @@ class Jobs(object):
             calling send_next_item_from; the result of each file processed can
             be fetched from the <output>.
 
+            Once there are no more items, each job calls <finalize>
+            (if any) before finishing.
+
             Return the <rest> of the <items> not sent,
             and the <output> queue.
             '''
@@ -53,21 +242,29 @@ class Jobs(object):
             Process(
                 target=worker,
                 name=str(n),
-                args=(func, self.sigint_handler, self.input, self.output)
+                args=(
+                    func, self.sigint_handler, self.input, self.output,
+                    finalize
+                )
             ) for n in range(njobs)
         ]
         for p in self.processes:
             p.start()
 
-        # feed the workers with enough data so all of them can start to work
-        for item in items[:njobs]:
-            self.input.put(item)
-
         if clog().isEnabledFor(CHAT):
             for p in self.processes:
                 clog().chat("Worker %s (PID %i).", p.name, p.pid)
 
-        return items[njobs:]
+        return self.feed(items)
+
+    def feed(self, items):
+        ''' Feed the workers with enough <items> so all of them can
+            start to work. Return the rest of the <items> not sent.'''
+        njobs = self.njobs
+        for item in items[:njobs]:
+            self.input.put(item)
+
+        return list(items[njobs:])
 
     def ignore_sigint(self):
         return signal.signal(signal.SIGINT, signal.SIG_IGN)
@@ -88,15 +285,15 @@ class Jobs(object):
         for p in self.processes:
             p.join()
 
-    def loop(self, nitems, rest, fail_fast):
+    def loop(self, nitems, rest, fail_fast, stop=True):
         ''' Loop <nitems> times fetching from <output> the
             result of each processed file done in background.
 
             For each fetch, send (feed) to the workers the next
             item in <rest>.
 
-            The loop will close the workers at the end; it will
-            return the exit status (see Status).
+            The loop will close the workers at the end unless <stop>
+            is False; it will return the exit status (see Status).
 
             Cancel the loop earlier if a run fails and <fail_fast>
             is True (keep in mind that because several jobs are running
@@ -106,9 +303,18 @@ class Jobs(object):
         exit_status = Status.ok
         end_sentinels_sent = False
         while nitems:
-            failed, aborted, user_aborted, error = self.output.get()
+            item, elapsed, result = self.output.get()
+            failed, aborted, user_aborted, error = result
             nitems -= 1
 
+            # a file that was cut short tells us nothing about how long
+            # it really takes
+            cut_short = aborted or user_aborted or error or (
+                failed and fail_fast
+            )
+            if self.history is not None and not cut_short:
+                self.history.record(item, elapsed)
+
             if failed:
                 exit_status = max(exit_status, Status.failed)
 
@@ -118,6 +324,9 @@ class Jobs(object):
             if error:
                 exit_status = max(exit_status, Status.error)
 
+            if user_aborted:
+                self.user_aborted = True
+
             if ((failed or aborted) and fail_fast) or user_aborted or error:
                 nitems -= len(rest)
                 rest = []
@@ -125,19 +334,98 @@ class Jobs(object):
             if rest:
                 self.send_next_item_from(rest)
 
-            if not rest and not end_sentinels_sent:
+            if stop and not rest and not end_sentinels_sent:
                 end_sentinels_sent = True
                 self.stop_workers()
 
-        self.join_jobs()
+        if stop:
+            self.join_jobs()
         return exit_status
 
-    def run(self, func, items, fail_fast):
+    def run(self, func, items, fail_fast, finalize=None):
         ''' Process all the <items> in background, aborting earlier
             if one fails and <fail_fast> is True (see loop()).
+
+            Each job calls <finalize> (if any) once it has
+            no more items to process (see spawn_jobs()).
+
+            If there is a history and there are more than one job,
+            the <items> are processed longest first so no worker
+            ends up processing a long file alone at the end.
+            '''
+        if self.history is not None and self.njobs > 1:
+            items = self.history.longest_first(items)
+
+        rest = self.spawn_jobs(func, items, finalize)
+        exit_status = self.loop(len(items), rest, fail_fast)
+
+        if self.history is not None:
+            self.history.save()
+        return exit_status
+
+    def run_and_watch(self, func, items, fail_fast, finalize, next_items):
+        ''' Process all the <items> like run() does but keep the
+            jobs alive once done.
+
+            Then call <next_items> to get (wait for) more items to
+            process and repeat until <next_items> returns None, the user
+            presses ctrl-c or an item is aborted by the user.
+
+            <next_items> is called with the exit status of the
+            previous round and it is the only place where ctrl-c
+            is allowed in the main process.
+
+            Return the exit status of the last round.
+
+            >>> from byexample.log import init_log_system
+            >>> init_log_system()
+
+            >>> from byexample.jobs import Jobs
+            >>> import signal
+            >>> prev_handler = signal.getsignal(signal.SIGINT)
+
+            >>> def func(item, sigint_handler):
+            ...     # failed, aborted, user aborted, error
+            ...     return item.startswith('bad'), False, False, False
+
+            >>> rounds, statuses = [['b.md'], ['bad.md', 'c.md']], []
+            >>> def next_items(exit_status):
+            ...     statuses.append(exit_status)
+            ...     return rounds.pop(0) if rounds else None
+
+            >>> jobs = Jobs(2)
+            >>> jobs.run_and_watch(func, ['a.md', 'bad.md'], False, None, next_items)
+            1
+            >>> statuses
+            [1, 0, 1]
+
+            >>> _ = signal.signal(signal.SIGINT, prev_handler)
             '''
-        rest = self.spawn_jobs(func, items)
-        return self.loop(len(items), rest, fail_fast)
+        rest = self.spawn_jobs(func, items, finalize)
+        try:
+            while True:
+                exit_status = self.loop(len(items), rest, fail_fast, stop=False)
+                if self.history is not None:
+                    self.history.save()
+
+                if self.user_aborted:
+                    break
+
+                try:
+                    with allow_sigint(signal.default_int_handler):
+                        items = next_items(exit_status)
+                except KeyboardInterrupt:
+                    items = None
+
+                if items is None:
+                    break
+
+                rest = self.feed(items)
+        finally:
+            self.stop_workers()
+            self.join_jobs()
+
+        return exit_status
 
 
 @contextlib.contextmanager
@@ -1,5 +1,5 @@
 from logging import Formatter, Logger, getLogger
-import sys, logging
+import sys, logging, threading
 import contextlib
 
 from .common import colored, highlight_syntax, indent
@@ -108,17 +108,24 @@ class XLogger(Logger):
     def __init__(self, name, *args, **kargs):
         Logger.__init__(self, name, *args, **kargs)
 
+    # the most verbose levels are checked before doing anything else:
+    # they are called in the hot paths and they are usually disabled
+    # (isEnabledFor is cached by logging)
     def trace(self, msg, *args, **kargs):
-        return self.log(TRACE, msg, *args, **kargs)
+        if self.isEnabledFor(TRACE):
+            return self.log(TRACE, msg, *args, **kargs)
 
     def debug(self, msg, *args, **kargs):
-        return self.log(DEBUG, msg, *args, **kargs)
+        if self.isEnabledFor(DEBUG):
+            return self.log(DEBUG, msg, *args, **kargs)
 
     def info(self, msg, *args, **kargs):
-        return self.log(INFO, msg, *args, **kargs)
+        if self.isEnabledFor(INFO):
+            return self.log(INFO, msg, *args, **kargs)
 
     def chat(self, msg, *args, **kargs):
-        return self.log(CHAT, msg, *args, **kargs)
+        if self.isEnabledFor(CHAT):
+            return self.log(CHAT, msg, *args, **kargs)
 
     def note(self, msg, *args, **kargs):
         return self.log(NOTE, msg, *args, **kargs)
@@ -138,6 +145,9 @@ class XLogger(Logger):
     crit = critical
 
     def log(self, level, msg, *args, **kargs):
+        if not self.isEnabledFor(level) or _stack.muted:
+            return
+
         extra = kargs.pop('extra', {})
         if 'example' in kargs:
             extra['example'] = kargs.pop('example')
@@ -183,46 +193,124 @@ class XLogger(Logger):
             )
 
 
-_logger_stack = []
+class _LoggerStack(threading.local):
+    ''' The stack of loggers (see log_context and log_with) of each
+        thread; a new thread starts with the root logger only. '''
+    def __init__(self):
+        self.loggers = [] if _root_logger is None else [_root_logger]
+        self.muted = False  # see log_muted
+
+
+# set by init_log_system
+_root_logger = None
+_stack = _LoggerStack()
+
+# If all the loggers have the same level (no log masks) and the name
+# of the logger is not shown in the messages, which logger is used
+# makes no difference: log_context and log_with do not push any
+# logger then and clog() is always the root logger.
+# See _update_fast_path
+_fast_path = False
+
+# children loggers by parent and name, see log_with
+_children = {}
 
 
 def clog():
-    return _logger_stack[-1]
+    return _stack.loggers[-1]
 
 
-def log_context(logger_name):
-    global _logger_stack
+class lazy(object):
+    r''' Call <func> with <args> only if the log message is formatted:
+
+        >>> from byexample.log import lazy
+        >>> msg = lazy(lambda: ', '.join(['a', 'b']))
+        >>> print("Joined: %s" % msg)
+        Joined: a, b
+        '''
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
 
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+def log_context(logger_name):
     def decorator(func):
+        current = None
+
         def wrapped(*args, **kargs):
-            assert _logger_stack
-            current = getLogger(name=logger_name)
+            nonlocal current
+            if _fast_path:
+                return func(*args, **kargs)
+
+            assert _stack.loggers
+            if current is None:
+                # the logger is got here and not before because the logger
+                # class is not set until init_log_system is called
+                current = getLogger(name=logger_name)
 
             try:
-                _logger_stack.append(current)
+                _stack.loggers.append(current)
                 return func(*args, **kargs)
             finally:
-                _logger_stack.pop()
+                _stack.loggers.pop()
 
         return wrapped
 
     return decorator
 
 
-@contextlib.contextmanager
+class _LogWith(object):
+    __slots__ = ('logger_name', 'child', 'pushed')
+
+    def __init__(self, logger_name, child):
+        self.logger_name = logger_name
+        self.child = child
+
+    def __enter__(self):
+        assert _stack.loggers
+        if _fast_path:
+            self.pushed = False
+            return _stack.loggers[-1]
+
+        if self.child:
+            parent = _stack.loggers[-1]
+            key = (parent.name, self.logger_name)
+            try:
+                current = _children[key]
+            except KeyError:
+                current = _children[key] = parent.getChild(self.logger_name)
+        else:
+            current = getLogger(name=self.logger_name)
+
+        _stack.loggers.append(current)
+        self.pushed = True
+        return current
+
+    def __exit__(self, *exc):
+        if self.pushed:
+            _stack.loggers.pop()
+        return False
+
+
 def log_with(logger_name, child=True):
-    global _logger_stack
-    assert _logger_stack
-    if child:
-        current = _logger_stack[-1].getChild(logger_name)
-    else:
-        current = getLogger(name=logger_name)
+    return _LogWith(logger_name, child)
 
+
+@contextlib.contextmanager
+def log_muted():
+    ''' Do not log anything from the current thread in this context,
+        like when the work done is speculative. '''
+    prev = _stack.muted
+    _stack.muted = True
     try:
-        _logger_stack.append(current)
-        yield current
+        yield
     finally:
-        _logger_stack.pop()
+        _stack.muted = prev
 
 
 class XStreamHandler(logging.StreamHandler):
@@ -251,7 +339,7 @@ class XStreamHandler(logging.StreamHandler):
 
 
 def init_log_system(level=NOTE, use_colors=False):
-    global _logger_stack
+    global _root_logger
 
     logging.setLoggerClass(XLogger)
 
@@ -277,7 +365,8 @@ def init_log_system(level=NOTE, use_colors=False):
     # Set up the global logger.
     # Activate and deactivate sub loggers using log_context
     # decorator on the top level functions
-    _logger_stack.append(rlog)
+    _root_logger = rlog
+    _stack.loggers.append(rlog)
 
     assert level is not None
     assert use_colors is not None
@@ -296,6 +385,22 @@ def configure_log_system(default_level=None, use_colors=None, concerns=None):
     if concerns is not None:
         rlog.xstream_handler.concerns = concerns
 
+    _update_fast_path()
+
+
+def _update_fast_path():
+    global _fast_path
+    rlog = getLogger(name='byexample')  # root
+
+    masked = any(
+        l.level != logging.NOTSET
+        for name, l in logging.root.manager.loggerDict.items()
+        if name.startswith('byexample.') and isinstance(l, Logger)
+    )
+
+    # the name of the logger is shown from CHAT (see XFormatter)
+    _fast_path = not masked and not rlog.isEnabledFor(CHAT)
+
 
 def setLogLevels(levels):
     prev_lvls = {}
@@ -307,4 +412,5 @@ def setLogLevels(levels):
         prev_lvls[name] = l.level
         l.setLevel(lvl)
 
+    _update_fast_path()
     return prev_lvls
@@ -4,3 +4,9 @@ var _repl = _repl_module.start({prompt: 'node > ',
                                 useColors: false,
                                 terminal: false,
                                 ignoreUndefined: true})
+
+// without a terminal (pipes), do not print any prompt
+if (process.env.BYEXAMPLE_REPL_NO_PROMPT) {
+    _repl.setPrompt('')
+    _repl.displayPrompt = function () {}
+}
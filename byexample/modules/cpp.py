@@ -58,6 +58,9 @@ class CppPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '?: '
+
     def get_language_of(self, *args, **kargs):
         return 'cpp'
 
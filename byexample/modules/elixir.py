@@ -80,6 +80,9 @@ class ElixirPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return 'iex> '
+
     def get_language_of(self, *args, **kargs):
         return 'elixir'
 
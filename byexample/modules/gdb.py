@@ -40,6 +40,9 @@ class GDBPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '(gdb) '
+
     def get_language_of(self, *args, **kargs):
         return 'gdb'
 
@@ -33,11 +33,11 @@ Example:
 """
 
 from __future__ import unicode_literals
-import re
+import re, os, json
 from byexample.common import constant, abspath
 from byexample.parser import ExampleParser
 from byexample.finder import ExampleFinder
-from byexample.runner import ExampleRunner, PexpectMixin, ShebangTemplate
+from byexample.runner import ExampleRunner, PexpectMixin, PipeMixin, ShebangTemplate
 
 stability = 'experimental'
 
@@ -61,6 +61,9 @@ class JavascriptPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '> '
+
     def get_language_of(self, *args, **kargs):
         return 'javascript'
 
@@ -85,20 +88,38 @@ class JavascriptParser(ExampleParser):
         return re.compile(r'//\s*byexample:\s*([^\n\'"]*)$', re.MULTILINE)
 
     def extend_option_parser(self, parser):
-        pass
+        parser.add_argument(
+            "+js-transport",
+            choices=['pty', 'pipe'],
+            default='pty',
+            help=
+            "talk with the interpreter through a pseudo terminal (pty, the default) or through plain pipes (pipe)."
+        )
 
 
-class JavascriptInterpreter(ExampleRunner, PexpectMixin):
+class JavascriptInterpreter(ExampleRunner, PexpectMixin, PipeMixin):
     language = 'javascript'
 
     def __init__(self, verbosity, encoding, **unused):
         PexpectMixin.__init__(
             self, PS1_re=r'node > ', any_PS_re=r'(?:node > )|(?:\.\.\. )'
         )
+        PipeMixin.__init__(
+            self, sentinel_cmd='console.log("%s")', transport_flag='+js-transport'
+        )
 
         self.encoding = encoding
+        self.transport = 'pty'
+
+    def _exec_and_wait(self, source, options, **kargs):
+        if self.transport == 'pipe':
+            return self._pipe_exec_and_wait(source, options, **kargs)
+        return PexpectMixin._exec_and_wait(self, source, options, **kargs)
 
     def run(self, example, options):
+        if self.transport == 'pipe':
+            # there is no terminal so there is no geometry to change
+            return self._run_impl(example, options)
         return PexpectMixin._run(self, example, options)
 
     def _run_impl(self, example, options):
@@ -107,6 +128,8 @@ class JavascriptInterpreter(ExampleRunner, PexpectMixin):
         )
 
     def interact(self, example, options):
+        if self.transport == 'pipe':
+            raise Exception("Interact is not supported with pipes.")
         PexpectMixin.interact(self)
 
     def get_default_cmd(self, *args, **kargs):
@@ -123,12 +146,35 @@ class JavascriptInterpreter(ExampleRunner, PexpectMixin):
         cmd = ShebangTemplate(shebang).quote_and_substitute(tokens)
 
         # run!
-        self._spawn_interpreter(cmd, options)
+        self.transport = options['js_transport']
+        if self.transport == 'pipe':
+            # byexample-repl.js will not print any prompt
+            self._pipe_spawn_interpreter(
+                cmd, options, env={'BYEXAMPLE_REPL_NO_PROMPT': '1'}
+            )
+        else:
+            self._spawn_interpreter(cmd, options)
 
         self._drop_output()  # discard banner and things like that
 
+    def reset(self, options):
+        dfl_timeout = options['x']['dfl_timeout']
+
+        # reset the REPL's context to an empty one
+        self._exec_and_wait('.clear', options, timeout=dfl_timeout)
+        self._exec_and_wait(
+            'process.chdir(%s)' % json.dumps(os.getcwd()),
+            options,
+            timeout=dfl_timeout
+        )
+
+        self._drop_output()
+
     def shutdown(self):
-        self._shutdown_interpreter()
+        if self.transport == 'pipe':
+            self._pipe_shutdown_interpreter()
+        else:
+            self._shutdown_interpreter()
 
     def cancel(self, example, options):
         return False  # not supported by nodejs
@@ -65,6 +65,9 @@ class PHPPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return 'php> '
+
     def get_language_of(self, *args, **kargs):
         return 'php'
 
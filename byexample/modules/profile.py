@@ -0,0 +1,245 @@
+from __future__ import unicode_literals
+import json, os, time, multiprocessing
+from byexample.concern import Concern
+
+stability = 'experimental'
+
+
+class Profiler(Concern):
+    r'''
+    Measure how long takes each phase of the execution (initialization,
+    reset and shutdown of the runners, parse, run and check of each example
+    and each file as whole) and save it as a Chrome trace (--profile-out).
+
+    Each job/worker records its spans and appends them to a spool
+    file at the end of each file; at the end of the run, the main
+    process merges them into the trace file, one track per job,
+    and shows the slowest files and examples.
+
+    The trace can be loaded in chrome://tracing or in Perfetto.
+
+    >>> from byexample.modules.profile import Profiler
+    >>> import tempfile, os, io, json
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> trace_filename = os.path.join(tmpdir, 'trace.json')
+
+    >>> from byexample.options import Options
+    >>> output = io.StringIO()
+    >>> profiler = Profiler(
+    ...     options=Options({'profile_out': trace_filename}),
+    ...     output=output, quiet=False)
+
+    >>> class Runner:
+    ...     language = 'python'
+    >>> class Example:
+    ...     filepath, start_lineno, runner = 'foo.md', 3, Runner()
+
+    >>> runner, example = Runner(), Example()
+
+    >>> profiler.event('start_initialize', runner=runner)
+    >>> profiler.event('finish_initialize', runner=runner)
+    >>> profiler.start([example], [runner], 'foo.md', None)
+    >>> profiler.start_parse(example, None)
+    >>> profiler.finish_parse(example, None, None)
+    >>> profiler.start_example(example, None)
+    >>> profiler.finish_example(example, None)
+    >>> profiler.finally_example(example, None)
+    >>> profiler.success(example, '', None)
+    >>> profiler.finish(False, False, False, False, False)
+
+    >>> profiler.event('finish_run')
+    >>> print(output.getvalue().strip())        # byexample: +norm-ws
+    Slowest files:
+      <...>s foo.md
+    Slowest examples:
+      <...>s foo.md:3 [python]
+
+    >>> with open(trace_filename, 'rt') as f:
+    ...     trace = json.load(f)
+    >>> sorted(set(e['name'] for e in trace['traceEvents']))
+    ['check foo.md:3',
+     'foo.md',
+     'initialize python',
+     'parse foo.md:3',
+     'process_name',
+     'run foo.md:3']
+
+    The trace file must be in a directory that we can write:
+
+    >>> Profiler(
+    ...     options=Options({'profile_out': os.path.join(tmpdir, 'nodir', 'trace.json')}),
+    ...     output=output, quiet=False)
+    Traceback (most recent call last):
+    <...>
+    ValueError: The trace file of --profile-out '<...>/nodir/trace.json' cannot be written: No such file or directory
+
+    >>> import shutil
+    >>> shutil.rmtree(tmpdir)
+    '''
+    target = None  # profile
+
+    # how many files and examples to show in the summary
+    top = 5
+
+    def __init__(self, options, output, quiet, **unused):
+        self.filename = options.get('profile_out', None)
+        if not self.filename:
+            self.target = None  # disable ourselves
+            return
+
+        self.target = 'profile'
+        self.output = output
+        self.quiet = quiet
+
+        # shared with the jobs/workers
+        self.spool_filename = self.filename + '.spool'
+        self.spool_lock = multiprocessing.Lock()
+        try:
+            open(self.spool_filename, 'wt').close()
+        except OSError as err:
+            raise ValueError(
+                "The trace file of --profile-out '%s' cannot be written: %s"
+                % (self.filename, err.strerror)
+            )
+
+        self.spans = []
+        self.open_spans = {}
+
+    def _now(self):
+        # Chrome trace's timestamps are in microseconds
+        return time.time() * 1e6
+
+    def _begin(self, key):
+        self.open_spans[key] = self._now()
+
+    def _end(self, key, name, cat, **args):
+        try:
+            begin = self.open_spans.pop(key)
+        except KeyError:
+            return
+
+        self.spans.append(
+            {
+                'name': name,
+                'cat': cat,
+                'ph': 'X',
+                'ts': begin,
+                'dur': self._now() - begin,
+                'pid': os.getpid(),
+                'tid': os.getpid(),
+                'args': args
+            }
+        )
+
+    def _where(self, example):
+        return '%s:%i' % (example.filepath, example.start_lineno)
+
+    def _flush(self):
+        ''' Append the spans recorded so far to the spool file. '''
+        if not self.spans:
+            return
+
+        worker = {
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': os.getpid(),
+            'args': {
+                'name': 'Job %s' % multiprocessing.current_process().name
+            }
+        }
+        lines = [json.dumps(span) for span in [worker] + self.spans]
+        with self.spool_lock, open(self.spool_filename, 'at') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        del self.spans[:]
+
+    def start(self, examples, runners, filepath, options):
+        self.filepath = filepath
+        self._begin('file')
+
+    def finish(self, failed, user_aborted, crashed, broken, timedout):
+        self._end('file', self.filepath, 'file', failed=failed)
+        self._flush()
+
+    def start_parse(self, example, options):
+        self._begin('parse')
+
+    def finish_parse(self, example, options, exception):
+        self._end('parse', 'parse ' + self._where(example), 'parse')
+
+    def start_example(self, example, options):
+        self._begin('run')
+
+    def finish_example(self, example, options):
+        self._end(
+            'run',
+            'run ' + self._where(example),
+            'run',
+            language=example.runner.language,
+            where=self._where(example)
+        )
+
+    def timedout(self, example, exception):
+        self._end('run', 'run ' + self._where(example), 'timedout')
+
+    def crashed(self, example, exception):
+        self._end('run', 'run ' + self._where(example), 'crashed')
+
+    def finally_example(self, example, options):
+        # the output is checked against the expected after this
+        self._begin('check')
+
+    def success(self, example, got, differ):
+        self._end('check', 'check ' + self._where(example), 'check')
+
+    def failure(self, example, got, differ):
+        self._end(
+            'check', 'check ' + self._where(example), 'check', failed=True
+        )
+
+    def event(self, what, **data):
+        if what.startswith('start_') and 'runner' in data:
+            self._begin((what[6:], data['runner']))
+        elif what.startswith('finish_') and 'runner' in data:
+            action = what[7:]
+            self._end((action, data['runner']),
+                      '%s %s' % (action, data['runner'].language), 'runner')
+
+            if action == 'shutdown':
+                self._flush()  # the runners may be shutdown after a finish
+        elif what == 'finish_run':
+            self._save_trace()
+
+    def _save_trace(self):
+        ''' Merge the spans from all the jobs into the trace file and
+            summarize them. Called once, in the main process, at the end.
+            '''
+        with open(self.spool_filename, 'rt') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        os.unlink(self.spool_filename)
+
+        with open(self.filename, 'wt') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+        if self.quiet:
+            return
+
+        files = [e for e in events if e.get('cat') == 'file']
+        examples = [e for e in events if e.get('cat') == 'run']
+
+        def slowest(spans):
+            spans = sorted(spans, key=lambda e: e['dur'], reverse=True)
+            return spans[:self.top]
+
+        lines = ['\nSlowest files:']
+        for e in slowest(files):
+            lines.append('  %0.2fs %s' % (e['dur'] / 1e6, e['name']))
+
+        lines.append('Slowest examples:')
+        for e in slowest(examples):
+            lines.append(
+                '  %0.2fs %s [%s]' %
+                (e['dur'] / 1e6, e['args']['where'], e['args']['language'])
+            )
+
+        self.output.write('\n'.join(lines) + '\n')
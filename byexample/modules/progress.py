@@ -1,32 +1,16 @@
 from __future__ import unicode_literals
-import traceback, time, os, sys, multiprocessing
+import traceback, time, os, sys, multiprocessing, threading, importlib.util
 from byexample.executor import InputPrefixNotFound
 from byexample.common import colored, highlight_syntax, indent, short_string
 from byexample.concern import Concern
 
-try:
-    from tqdm import tqdm
-    progress_bar_available = True
-except ImportError:
-    progress_bar_available = False
+# tqdm takes a while to be imported: check here that it is installed
+# but import it only when a progress bar is really used
+progress_bar_available = importlib.util.find_spec('tqdm') is not None
 
 stability = 'provisional'
 
 
-class _DummyLock(object):
-    def __enter__(self):
-        return
-
-    def __exit__(self, *args):
-        pass
-
-    def acquire(self, *args, **kargs):
-        pass
-
-    def release(self, *args, **kargs):
-        pass
-
-
 class SimpleReporter(Concern):
     target = None  # progress
 
@@ -45,7 +29,9 @@ class SimpleReporter(Concern):
         if self.jobs != 1:
             self.write_lock = multiprocessing.RLock()
         else:
-            self.write_lock = _DummyLock()
+            # the runners may be initialized in background threads
+            # and log concurrently
+            self.write_lock = threading.RLock()
 
         self.header_printed = False
 
@@ -236,11 +222,22 @@ class SimpleReporter(Concern):
         self.fail += 1
 
     def event(self, what, **data):
+        if what == 'cached_pass':
+            self._cached_pass(data['filepath'], data['examples'])
+            return
+
         if what != 'log':
             return
 
         self._write(data['msg'], nl=True)
 
+    def _cached_pass(self, filepath, examples):
+        status_str = colored("[PASS]", 'green', self.use_colors)
+        msg = '\nFile %s, %i/%i test passed in a previous run\n%s Cached\n' % (
+            filepath, len(examples), len(examples), status_str
+        )
+        self._write(msg)
+
     def _error_header(self, example):
         if self.header_printed:
             return ''
@@ -324,6 +321,7 @@ class ProgressBarReporter(SimpleReporter):
 
         SimpleReporter.start(self, examples, runners, filepath, options)
 
+        from tqdm import tqdm
         bar_format = '{desc} |{bar}| [{n_fmt}/{total_fmt}{postfix}]'
         self.bar = tqdm(
             total=len(examples),
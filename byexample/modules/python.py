@@ -20,15 +20,27 @@ Example:
   is a multiline
   string
 
+  Send all the lines at once:
+  >>> def fib(n):             # byexample: +batch-send
+  ...     a, b = 0, 1
+  ...     for _ in range(n):
+  ...         a, b = b, a + b
+  ...     return a
+  ...
+  ... [fib(i) for i in range(8)]
+  [0, 1, 1, 2, 3, 5, 8, 13]
+
 """
 
 from __future__ import unicode_literals
-import re, pexpect, sys, time
+import re, pexpect, sys, time, os, json
+import subprocess, shlex, signal, termios, fcntl, struct
+from pexpect.fdpexpect import fdspawn
 from byexample.common import constant
 from byexample.log import clog
 from byexample.parser import ExampleParser, ExtendOptionParserMixin
 from byexample.finder import ExampleFinder
-from byexample.runner import ExampleRunner, PexpectMixin, ShebangTemplate
+from byexample.runner import ExampleRunner, PexpectMixin, PipeMixin, ShebangTemplate
 
 stability = 'stable'
 
@@ -55,6 +67,9 @@ class PythonPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '>>> '
+
     def get_language_of(self, *args, **kargs):
         return 'python'
 
@@ -191,6 +206,25 @@ class PythonParser(ExampleParser):
             default=True,
             help="enable the deletion of empty lines (enabled by default)."
         )
+        parser.add_flag(
+            "py-zygote",
+            default=False,
+            help=
+            "fork the interpreter from a pre-initialized python process (the zygote) instead of starting a new one (pty transport only)."
+        )
+        parser.add_argument(
+            "+py-zygote-preload",
+            default=[],
+            action='append',
+            help="import this module in the zygote before forking any interpreter."
+        )
+        parser.add_argument(
+            "+py-transport",
+            choices=['pty', 'pipe'],
+            default='pty',
+            help=
+            "talk with the interpreter through a pseudo terminal (pty, the default) or through plain pipes (pipe)."
+        )
 
         if getattr(self, 'compatibility_mode', True):
             parser.add_flag(
@@ -460,7 +494,198 @@ class PythonParser(ExampleParser):
         return snippet
 
 
-class PythonInterpreter(ExampleRunner, PexpectMixin):
+# The code run by the zygote: it imports the modules given in
+# the command line and then it waits for requests in its stdin, one per line.
+#
+# For each request, it forks a child that opens the given tty, makes it
+# its controlling terminal and starts an interactive console on it
+# in a clean __main__ namespace.
+#
+# The pid of the child is written back in the stdout of the zygote.
+_zygote_code = r'''
+import sys, os, json, signal
+for name in sys.argv[1:]:
+    __import__(name)
+def _child(request):
+    # the namespace of __main__ will be cleared before starting the
+    # console so everything that we use from here must be a local
+    import sys, os, signal, builtins, code, importlib.machinery
+    os.setsid()
+    # opening a tty after setsid makes it our controlling terminal
+    fd = os.open(request["tty"], os.O_RDWR)
+    for i in range(3):
+        os.dup2(fd, i)
+    os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, "w", buffering=1, closefd=False)
+    sys.stderr = sys.__stderr__ = open(
+        2, "w", buffering=1, errors="backslashreplace", closefd=False
+    )
+    sys.argv = [""]
+    try:
+        import readline
+    except ImportError:
+        pass
+    exit, flush = os._exit, sys.stdout.flush
+    main = sys.modules["__main__"].__dict__
+    console = code.InteractiveConsole(main, filename="<stdin>")
+    main.clear()
+    main.update(
+        __name__="__main__",
+        __doc__=None,
+        __package__=None,
+        __loader__=importlib.machinery.BuiltinImporter,
+        __spec__=None,
+        __annotations__={},
+        __builtins__=builtins
+    )
+    try:
+        console.interact(banner="", exitmsg="")
+    finally:
+        flush()
+        exit(0)
+# we don't wait for our children, let the OS reap them
+signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+for line in sys.stdin:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _child(json.loads(line))
+        finally:
+            os._exit(1)
+    sys.stdout.write("%i\n" % pid)
+    sys.stdout.flush()
+'''
+
+
+class ZygoteChild(fdspawn):
+    ''' A pexpect's spawn-like object connected to the master side
+        of the tty of an interpreter forked by a PythonZygote.
+
+        The interpreter is not our child: we cannot wait for it so
+        we only signal it.
+        '''
+    def __init__(self, fd, tty_fd, pid, **kargs):
+        fdspawn.__init__(self, fd, **kargs)
+        self.pid = pid
+
+        # keep the slave side of the tty open until the interpreter
+        # opens it too, otherwise we would read an EOF
+        self._tty_fd = tty_fd
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        s = fdspawn.read_nonblocking(self, size, timeout)
+        if self._tty_fd is not None:
+            # the interpreter wrote something so it has the tty opened:
+            # close our copy so we get an EOF when it exits
+            self._close_tty()
+        return s
+
+    def _close_tty(self):
+        os.close(self._tty_fd)
+        self._tty_fd = None
+
+    def setwinsize(self, rows, cols):
+        s = struct.pack('HHHH', rows, cols, 0, 0)
+        fcntl.ioctl(self.child_fd, termios.TIOCSWINSZ, s)
+
+    def sendcontrol(self, char):
+        return self.send(chr(ord(char.lower()) & 0x1f))
+
+    def sendeof(self):
+        return self.sendcontrol('d')
+
+    def isalive(self):
+        try:
+            os.kill(self.pid, 0)
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        if self._tty_fd is not None:
+            self._close_tty()
+        fdspawn.close(self)
+
+    def terminate(self, force=False):
+        try:
+            os.kill(self.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except OSError:
+            pass
+        return True
+
+
+class PythonZygote(object):
+    ''' A pre-initialized python process that forks a new interpreter
+        on request (see _zygote_code).
+
+        The zygote exits when its stdin is closed, which happens
+        at the latest when our process finishes.
+        '''
+    def __init__(self, cmd, preload):
+        self.cmd = cmd
+        self.preload = tuple(preload)
+
+        self.process = subprocess.Popen(
+            shlex.split(cmd),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+
+    def isalive(self):
+        return self.process.poll() is None
+
+    def spawn(self, rows, cols, env, encoding):
+        master_fd, tty_fd = os.openpty()
+        try:
+            attrs = termios.tcgetattr(tty_fd)
+            attrs[3] &= ~termios.ECHO
+            termios.tcsetattr(tty_fd, termios.TCSANOW, attrs)
+
+            s = struct.pack('HHHH', rows, cols, 0, 0)
+            fcntl.ioctl(tty_fd, termios.TIOCSWINSZ, s)
+
+            request = {
+                'tty': os.ttyname(tty_fd),
+                'cwd': os.getcwd(),
+                'env': env
+            }
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+
+            pid = self.process.stdout.readline()
+            if not pid:
+                raise Exception(
+                    "The python zygote '%s' is dead (exit code: %s)." %
+                    (self.cmd, self.process.poll())
+                )
+
+            return ZygoteChild(
+                master_fd, tty_fd, int(pid), encoding=encoding
+            )
+        except:
+            os.close(master_fd)
+            os.close(tty_fd)
+            raise
+
+    def shutdown(self):
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class PythonInterpreter(ExampleRunner, PexpectMixin, PipeMixin):
     language = 'python'
 
     def __init__(self, verbosity, encoding, **unused):
@@ -472,15 +697,51 @@ class PythonInterpreter(ExampleRunner, PexpectMixin):
         PexpectMixin.__init__(
             self, PS1_re=self._PS1, any_PS_re=r'/byexample/py/ps\d> '
         )
+        PipeMixin.__init__(
+            self, sentinel_cmd='print("%s")', transport_flag='+py-transport'
+        )
+
+        self.transport = 'pty'
+        self.zygote = None
+        self._zygote_requested = None
 
     def get_default_cmd(self, *args, **kargs):
-        return "%e %p %a", {
-            'e': "/usr/bin/env",
-            'p': "python",
-            'a': [
+        transport = kargs.pop('transport', 'pty')
+        zygote = kargs.pop('zygote', None)
+        if zygote is not None:
+            # run the zygote's code followed by the modules to preload
+            args = ["-c", _zygote_code] + list(zygote)
+        else:
+            args = [
                 "-i",  # mean interactive, even if we run a script
-            ]
-        }
+            ] + ([
+                "-u",  # unbuffered: we are not in a terminal
+            ] if transport == 'pipe' else [])
+
+        return "%e %p %a", {'e': "/usr/bin/env", 'p': "python", 'a': args}
+
+    def _pexpect_spawn(self, cmd, rows, cols, env):
+        if self._zygote_requested is None:
+            return PexpectMixin._pexpect_spawn(self, cmd, rows, cols, env)
+
+        # reuse the zygote unless it is dead or it was started
+        # with a different command or preload list
+        preload = self._zygote_requested
+        z = self.zygote
+        if z is None or z.cmd != cmd or z.preload != tuple(
+            preload
+        ) or not z.isalive():
+            if z is not None:
+                z.shutdown()
+            clog().chat("Starting python zygote (preload: %s)", preload)
+            self.zygote = z = PythonZygote(cmd, preload)
+
+        return z.spawn(rows, cols, env, self.encoding)
+
+    def _exec_and_wait(self, source, options, **kargs):
+        if self.transport == 'pipe':
+            return self._pipe_exec_and_wait(source, options, **kargs)
+        return PexpectMixin._exec_and_wait(self, source, options, **kargs)
 
     def conf_pretty_print(self, columns, options):
         # Important: do not use a single quote ' in the following python code
@@ -511,6 +772,9 @@ if True:
         )
 
     def run(self, example, options):
+        if self.transport == 'pipe':
+            # there is no terminal so there is no geometry to change
+            return self._run_impl(example, options)
         return PexpectMixin._run(self, example, options)
 
     def _run_impl(self, example, options):
@@ -527,37 +791,95 @@ if True:
         PexpectMixin._change_terminal_geometry(self, rows, cols, options)
 
     def interact(self, example, options):
+        if self.transport == 'pipe':
+            raise Exception("Interact is not supported with pipes.")
+        if self._zygote_requested is not None:
+            raise Exception("Interact is not supported with a zygote.")
         PexpectMixin.interact(self)
 
+    def _zygote_preload(self, options):
+        # a zygote requires a terminal
+        if options['py_zygote'] and options['py_transport'] == 'pty':
+            return options['py_zygote_preload']
+        return None
+
+    def build_cmd(self, options):
+        shebang, tokens = self.get_default_cmd(
+            transport=options['py_transport'],
+            zygote=self._zygote_preload(options)
+        )
+        shebang = options['shebangs'].get(self.language, shebang)
+        return ShebangTemplate(shebang).quote_and_substitute(tokens)
+
     def initialize(self, options):
         py_doctest = options['py_doctest']
         py_pretty_print = options['py_pretty_print']
         pretty_print = (py_doctest and py_pretty_print) \
                         or not py_doctest
 
-        shebang, tokens = self.get_default_cmd()
-        shebang = options['shebangs'].get(self.language, shebang)
+        self.transport = options['py_transport']
+        self._zygote_requested = self._zygote_preload(options)
 
-        cmd = ShebangTemplate(shebang).quote_and_substitute(tokens)
+        cmd = self.build_cmd(options)
 
         # run!
-        self._spawn_interpreter(cmd, options, initial_prompt=r'>>> ')
-
-        # change the prompts in the first line so by the moment that we
-        # wait for its completion we will be waiting for PS1 and PS2, the
-        # new prompts
-        self._exec_and_wait(
-            r'import sys; sys.ps1="%s" ; sys.ps2="%s"; del sys' %
-            (self._PS1, self._PS2),
-            options,
-            timeout=options['x']['dfl_timeout']
-        )
+        if self.transport == 'pipe':
+            self._pipe_spawn_interpreter(cmd, options)
+
+            # without a terminal there is no need of prompts
+            self._exec_and_wait(
+                r'import sys; sys.ps1=""; sys.ps2=""; del sys',
+                options,
+                timeout=options['x']['dfl_timeout']
+            )
+        else:
+            self._spawn_interpreter(cmd, options, initial_prompt=r'>>> ')
+
+            # change the prompts in the first line so by the moment that we
+            # wait for its completion we will be waiting for PS1 and PS2,
+            # the new prompts
+            self._exec_and_wait(
+                r'import sys; sys.ps1="%s" ; sys.ps2="%s"; del sys' %
+                (self._PS1, self._PS2),
+                options,
+                timeout=options['x']['dfl_timeout']
+            )
 
         if pretty_print:
             self.conf_pretty_print(options['geometry'][1], options)
 
+    def reset(self, options):
+        # Same rules than in conf_pretty_print: do not use a single
+        # quote ' and do not add any empty line in the following code.
+        # Delete any global except the ones that a fresh interpreter
+        # (and byexample itself) would have. The imported modules
+        # are not reset.
+        reset_globals = r'''
+if True:
+    import builtins as _byexample_builtins
+    _byexample_builtins.__dict__.pop("_", None)
+    import os as _byexample_os
+    _byexample_os.chdir(%s)
+    for _byexample_name in list(globals()):
+        if _byexample_name not in ("__name__", "__doc__", "__package__",
+                "__loader__", "__spec__", "__annotations__", "__builtins__") \
+                and not _byexample_name.startswith(("_byexample", "__byexample")):
+            del globals()[_byexample_name]
+    del _byexample_builtins, _byexample_os, _byexample_name
+''' % json.dumps(os.getcwd())
+
+        self._exec_and_wait(
+            reset_globals, options, timeout=options['x']['dfl_timeout']
+        )
+        self._drop_output()
+
     def shutdown(self):
-        self._shutdown_interpreter()
+        if self.transport == 'pipe':
+            self._pipe_shutdown_interpreter()
+        else:
+            self._shutdown_interpreter()
 
     def cancel(self, example, options):
+        if self.transport == 'pipe':
+            return self._pipe_abort(example, options)
         return self._abort(example, options)
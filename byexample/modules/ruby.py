@@ -83,6 +83,9 @@ class RubyPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '>> '
+
     def get_language_of(self, *args, **kargs):
         return 'ruby'
 
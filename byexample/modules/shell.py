@@ -21,14 +21,27 @@ Example:
   this
   is a multiline
   string
+
+  Send all the lines at once:
+  $ for i in 0 1 2; do       # byexample: +batch-send
+  >    echo "$i"
+  > done; echo "this
+  > is a multiline
+  > string"
+  0
+  1
+  2
+  this
+  is a multiline
+  string
 """
 
 from __future__ import unicode_literals
-import re, pexpect, sys, time
+import re, pexpect, sys, time, os, shlex
 from byexample.common import constant, Countdown
 from byexample.parser import ExampleParser
 from byexample.finder import ExampleFinder
-from byexample.runner import ExampleRunner, PexpectMixin, ShebangTemplate
+from byexample.runner import ExampleRunner, PexpectMixin, PipeMixin, ShebangTemplate
 from byexample.executor import TimeoutException
 
 stability = 'provisional'
@@ -53,6 +66,9 @@ class ShellPromptFinder(ExampleFinder):
             ''', re.MULTILINE | re.VERBOSE
         )
 
+    def example_prefilter(self):
+        return '$ '
+
     def get_language_of(self, *args, **kargs):
         return 'shell'
 
@@ -97,9 +113,16 @@ class ShellParser(ExampleParser):
             help=
             "shell to use with default settings ('bash' by default). For full control use -x-shebang)"
         )
+        parser.add_argument(
+            "+shell-transport",
+            choices=['pty', 'pipe'],
+            default='pty',
+            help=
+            "talk with the shell through a pseudo terminal (pty, the default) or through plain pipes (pipe)."
+        )
 
 
-class ShellInterpreter(ExampleRunner, PexpectMixin):
+class ShellInterpreter(ExampleRunner, PexpectMixin, PipeMixin):
     language = 'shell'
 
     def __init__(self, verbosity, encoding, **unused):
@@ -110,6 +133,11 @@ class ShellInterpreter(ExampleRunner, PexpectMixin):
             PS1_re=r"/byexample/sh/ps1> ",
             any_PS_re=r"/byexample/sh/ps\d+> "
         )
+        PipeMixin.__init__(
+            self, sentinel_cmd='echo "%s"', transport_flag='+shell-transport'
+        )
+
+        self.transport = 'pty'
 
     def get_default_cmd(self, *args, **kargs):
         shell = kargs.pop('shell', 'bash')
@@ -136,7 +164,18 @@ class ShellInterpreter(ExampleRunner, PexpectMixin):
             },
         }[shell]
 
+    def _exec_and_wait(self, source, options, **kargs):
+        if self.transport == 'pipe':
+            return self._pipe_exec_and_wait(source, options, **kargs)
+        return PexpectMixin._exec_and_wait(self, source, options, **kargs)
+
     def run(self, example, options):
+        if self.transport == 'pipe':
+            # there is no terminal so there is no geometry to change
+            # neither job control to stop a process on timeout
+            return self._exec_and_wait(
+                example.source, options, from_example=example
+            )
         return PexpectMixin._run(self, example, options)
 
     def _run_impl(self, example, options):
@@ -202,13 +241,24 @@ class ShellInterpreter(ExampleRunner, PexpectMixin):
             )
 
     def interact(self, example, options):
+        if self.transport == 'pipe':
+            raise Exception("Interact is not supported with pipes.")
         PexpectMixin.interact(self)
 
-    def initialize(self, options):
+    def build_cmd(self, options):
         shebang, tokens = self.get_default_cmd(shell=options['shell'])
         shebang = options['shebangs'].get(self.language, shebang)
+        return ShebangTemplate(shebang).quote_and_substitute(tokens)
+
+    def initialize(self, options):
+        cmd = self.build_cmd(options)
+
+        self.transport = options['shell_transport']
+        if self.transport == 'pipe':
+            # a non-interactive shell: no prompts to set
+            self._pipe_spawn_interpreter(cmd, options)
+            return
 
-        cmd = ShebangTemplate(shebang).quote_and_substitute(tokens)
         self._spawn_interpreter(cmd, options, wait_first_prompt=False)
 
         self._exec_and_wait(
@@ -223,8 +273,36 @@ export PS4="/byexample/sh/ps4> "
 
         self._drop_output()  # discard banner and things like that
 
+    def reset(self, options):
+        if self.transport == 'pipe' or \
+                options['shell_transport'] != self.transport:
+            # a non-interactive shell may read its input from the pipe in
+            # blocks (like dash does) so the lines after the exec would be
+            # consumed by the old shell: start a new shell instead
+            return ExampleRunner.reset(self, options)
+
+        cmd = self.build_cmd(options)
+
+        # kill any job left in background and replace the shell by a new
+        # one; the prompts are inherited from the environment because
+        # they were exported (but any other exported variable will be
+        # inherited too)
+        self._exec_and_wait(
+            'kill -9 $(jobs -p) 2>/dev/null; cd %s; exec %s' %
+            (shlex.quote(os.getcwd()), cmd),
+            options,
+            timeout=options['x']['dfl_timeout']
+        )
+
+        self._drop_output()
+
     def shutdown(self):
-        self._shutdown_interpreter()
+        if self.transport == 'pipe':
+            self._pipe_shutdown_interpreter()
+        else:
+            self._shutdown_interpreter()
 
     def cancel(self, example, options):
+        if self.transport == 'pipe':
+            return False  # a non-interactive shell dies on SIGINT
         return self._abort(example, options)
@@ -1,8 +1,9 @@
 from __future__ import unicode_literals
-import re, shlex, argparse, bisect, collections
+import re, shlex, argparse, bisect, collections, sys
+from array import array
 from .common import tohuman, constant
 from .options import OptionParser, UnrecognizedOption, ExtendOptionParserMixin
-from .expected import _LinearExpected, _RegexExpected
+from .expected import _LinearExpected, _LinearTimeExpected, _RegexExpected
 from .parser_sm import SM_NormWS, SM_NotNormWS
 '''
 >>> from byexample.log import init_log_system
@@ -30,6 +31,10 @@ class ExampleParser(ExtendOptionParserMixin):
         self._optparser_extended_cache = None
         self._opts_cache = {}
 
+        # the options that built the regexs of the last example parsed,
+        # see parse_ahead
+        self._last_regexs_opts = None
+
     def __repr__(self):
         return '%s Parser' % tohuman(self.language if self.language else self)
 
@@ -157,26 +162,40 @@ class ExampleParser(ExtendOptionParserMixin):
         for x in options['rm']:
             example.expected_str = example.expected_str.replace(x, '')
 
-        input_prefix_len_range = options['input_prefix_range']
-        expected_regexs, charnos, rcounts, tags_by_idx, input_list = self.expected_as_regexs(
-            example.expected_str, options['tags'], options['input'],
-            options['norm_ws'], input_prefix_len_range
-        )
+        args = self._regexs_args(example.expected_str, options)
+        self._last_regexs_opts = (tuple(options['rm']), args[1:])
 
-        ExpectedClass = _LinearExpected
+        regexs_cache = example.regexs_cache
+        if regexs_cache is None:
+            parsed = self._expected_as_compact_regexs(*args)
+        else:
+            key = (self.language, ) + args
+            try:
+                parsed = regexs_cache[key]
+            except KeyError:
+                parsed = regexs_cache[key] = self._expected_as_compact_regexs(
+                    *args
+                )
+
+        expected_regexs, charnos, rcounts, tags_by_idx, input_list = parsed
+
+        if options.get('match_engine', 'regex') == 'linear':
+            ExpectedClass = _LinearTimeExpected
+        else:
+            ExpectedClass = _LinearExpected
 
         expected = ExpectedClass(
             # the output expected
             expected_str=example.expected_str,
 
             # expected regex version
-            regexs=list(expected_regexs),
+            regexs=expected_regexs,
 
             # where each regex comes from
-            charnos=list(charnos),
+            charnos=charnos,
 
             # the 'real count' of literals
-            rcounts=list(rcounts),
+            rcounts=rcounts,
 
             # all the regexs that are not literal (tags) indexed
             # by their position in the regex list.
@@ -195,6 +214,79 @@ class ExampleParser(ExtendOptionParserMixin):
         options.down()
         return example
 
+    def _regexs_args(self, expected_str, options):
+        ''' Return the arguments for expected_as_regexs (and the key of
+            the regexs cache without the language). '''
+        return (
+            expected_str, options['tags'], options['input'],
+            options['norm_ws'], tuple(options['input_prefix_range'])
+        )
+
+    def parse_ahead(self, example):
+        r''' Build the regexs of the <example> before it is parsed and
+            return them in a dictionary like the regexs cache (see parse).
+            Return None if no example was parsed yet.
+
+            This is a guess made in background (see FileExecutor): the
+            options of the example are not extracted here as that is
+            done by parse, in order. Instead, the options of the last
+            example parsed are used.
+            If the options are others or the expected string changes
+            until its real parse (by a concern or by a parser's
+            process_snippet_and_expected), the key will not match
+            and parse will build the regexs again.
+
+            >>> from byexample.finder import _build_fake_example as build_example
+            >>> from byexample.options import Options
+
+            >>> opts = Options({'norm_ws': False, 'tags': True, 'rm': [], 'input': False,
+            ...                 'input_prefix_range': (6, 12)})
+            >>> ex = build_example('f()', 'a <b>', opts=opts, fully_parsed=False)
+            >>> ex.parser.parse_ahead(ex) is None
+            True
+
+            >>> parser = build_example('g()', '', opts=opts).parser
+            >>> ahead = parser.parse_ahead(ex)
+            >>> regexs = list(ahead.values())[0][0]
+            >>> regexs
+            ('\\A', 'a', '\\ ', '(?:(?P<b>.+?)(?<!\\n))?', '\\n*\\Z')
+
+            >>> ex.regexs_cache = ahead
+            >>> ex.parse_yourself().expected.regexs is regexs
+            True
+            '''
+        last = self._last_regexs_opts
+        if last is None:
+            return None
+
+        rm, opts = last
+        expected_str = example.expected_str or ''
+        for x in rm:
+            expected_str = expected_str.replace(x, '')
+
+        args = (expected_str, ) + opts
+        key = (self.language, ) + args
+        return {key: self._expected_as_compact_regexs(*args)}
+
+    def _expected_as_compact_regexs(self, *args):
+        ''' Like expected_as_regexs but the results take less memory:
+            the regexs are interned so the same regex in different
+            examples is stored once (most of them are short literals
+            like a space or a word) and the charnos and the rcounts are
+            arrays of integers instead of tuples.
+
+            The results are not copied after this: the Expected objects
+            (and the regexs cache) share them, so they must not be
+            modified.
+            '''
+        regexs, charnos, rcounts, tags_by_idx, input_list = self.expected_as_regexs(
+            *args
+        )
+        return (
+            tuple(sys.intern(r) for r in regexs), array('I', charnos),
+            array('I', rcounts), tags_by_idx, input_list
+        )
+
     def expected_as_regexs(
         self, expected, tags_enabled, input_enabled, normalize_whitespace,
         input_prefix_len_range
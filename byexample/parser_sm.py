@@ -92,7 +92,7 @@ class SM(object):
     def emit(self, charno, regex, rcount):
         item = (charno, regex, rcount)
         self.results.append(item)
-        clog().debug("emit: %06i (rc %06i): %s" % (charno, rcount, regex))
+        clog().debug("emit: %06i (rc %06i): %s", charno, rcount, regex)
         return item
 
     def emit_literals(self):
@@ -483,7 +483,7 @@ class SM(object):
         while not self.ended():
             charno, ttype, token = next(tokenizer, (None, None, None))
             if charno is not None:
-                clog().debug("tokn: %06i [% 9s]: %s" % (charno, ttype, token))
+                clog().debug("tokn: %06i [% 9s]: %s", charno, ttype, token)
 
             if ttype == 'input':
                 self.record_input_event(charno, 'input', token)
@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
 import re, pexpect, time, termios, operator, os, itertools, contextlib
+import subprocess, shlex, select, signal, codecs, uuid, threading
+import collections, tempfile
+import functools
 from functools import reduce, partial
 from .executor import TimeoutException, InputPrefixNotFound
 from .common import tohuman, ShebangTemplate, Countdown, short_string
@@ -9,6 +12,72 @@ from .log import clog
 from pyte import Stream, Screen
 
 
+# threads that are shutting down and reaping interpreters; the runners
+# may be shutdown from several threads (see FileExecutor)
+_reapers = []
+_reapers_lock = threading.Lock()
+
+
+def reap_in_background(func, *args):
+    ''' Call <func> with <args> in a background thread.
+
+        This is used to shutdown and reap the interpreters (which
+        may require sleeping and waiting) without blocking the caller
+        so it can process the next file straight away.
+
+        See wait_for_reapers.
+
+        >>> import threading, time
+        >>> from byexample.log import init_log_system
+        >>> from byexample.runner import reap_in_background, wait_for_reapers
+        >>> init_log_system()
+
+        >>> reaped = []
+        >>> def reap(i):
+        ...     time.sleep(0.01)
+        ...     reaped.append(i)
+
+        >>> def shutdown_several(n):
+        ...     for i in range(n, n + 10):
+        ...         reap_in_background(reap, i)
+
+        >>> threads = [threading.Thread(target=shutdown_several, args=(n, ))
+        ...            for n in range(0, 100, 10)]
+        >>> for t in threads: t.start()
+        >>> for t in threads: t.join()
+
+        >>> wait_for_reapers()
+        >>> sorted(reaped) == list(range(100))
+        True
+        '''
+    log = clog()
+
+    def reaper():
+        try:
+            func(*args)
+        except Exception as e:
+            log.warn("Shutdown in background failed: %s", str(e))
+
+    t = threading.Thread(target=reaper, daemon=True)
+    with _reapers_lock:
+        _reapers[:] = [t for t in _reapers if t.is_alive()]
+
+        # start it here: wait_for_reapers cannot join it before
+        t.start()
+        _reapers.append(t)
+
+
+def wait_for_reapers():
+    ''' Wait until all the interpreters being shutdown in background
+        are reaped. Call this before exiting.'''
+    while True:
+        with _reapers_lock:
+            if not _reapers:
+                return
+            t = _reapers.pop()
+        t.join()
+
+
 class ExampleRunner(object):
     def __init__(self, verbosity, encoding, **unused):
         self.verbosity = verbosity
@@ -60,6 +129,18 @@ class ExampleRunner(object):
         '''
         raise NotImplementedError()  # pragma: no cover
 
+    def build_cmd(self, options):
+        '''
+        Return the command line that spawns the interpreter with
+        these <options>: the default command (get_default_cmd) or the
+        one given with -x-shebang.
+
+        Override this if the command depends on other options.
+        '''
+        shebang, tokens = self.get_default_cmd()
+        shebang = options['shebangs'].get(self.language, shebang)
+        return ShebangTemplate(shebang).quote_and_substitute(tokens)
+
     def shutdown(self):
         '''
         Hook to shutdown the runner. This method will be called
@@ -67,6 +148,20 @@ class ExampleRunner(object):
         '''
         raise NotImplementedError()  # pragma: no cover
 
+    def reset(self, options):
+        '''
+        Hook to reset the runner. This method will be called instead
+        of initialize when the runner was kept running from a previous
+        file (see -x-warm-runners).
+
+        The runner should be left in a state as close as possible to
+        the one that a freshly initialized runner would have.
+
+        By default, shutdown and initialize the runner again.
+        '''
+        self.shutdown()
+        self.initialize(options)
+
     def cancel(self, example, options):
         '''
         Abort the execution of the current example. This method will typically
@@ -78,12 +173,320 @@ class ExampleRunner(object):
         return False
 
 
+class OutputBuffer(object):
+    r''' Collect the chunks of output of an interpreter keeping at most
+        <limit> characters in memory: the first half of them and the last
+        half. The characters in between are written to a temporal file.
+
+        >>> from byexample.runner import OutputBuffer
+        >>> buf = OutputBuffer(limit=8)
+        >>> buf.append('abc')
+        >>> buf.extend('def')
+        >>> buf.append('gh')
+        >>> list(buf)
+        ['abcdef', 'gh']
+
+        Once the limit is exceeded, a marker takes the place of the
+        characters omitted:
+
+        >>> buf.append('ijklmn')
+        >>> list(buf)
+        ['abcd', '\n[byexample: output truncated, 6 characters omitted]\n', 'klmn']
+
+        >>> buf.tail(3)
+        'lmn'
+
+        On clear, the whole output is saved in the temporal file and its
+        name is returned (or None if nothing was truncated):
+
+        >>> filename = buf.clear()
+        >>> with open(filename, 'rt') as f:
+        ...     f.read()
+        'abcdefghijklmn'
+
+        >>> list(buf), buf.clear()
+        ([], None)
+
+        >>> import os
+        >>> os.unlink(filename)
+        '''
+    def __init__(self, limit=None):
+        self.limit = limit
+        self._head = []
+        self._chunks = collections.deque()
+        self._size = 0  # characters in self._chunks (and self._parts)
+        self._spill = None
+        self.omitted = 0
+
+        # pieces to be added to the last chunk, joined only when needed
+        # so extending a large chunk several times is not quadratic
+        self._parts = []
+
+    def append(self, chunk):
+        ''' Add a new <chunk>. '''
+        self._join_parts()
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        self._enforce_limit()
+
+    def extend(self, chunk):
+        ''' Add <chunk> to the last chunk added (if any). '''
+        if not self._chunks:
+            return self.append(chunk)
+
+        self._parts.append(chunk)
+        self._size += len(chunk)
+        self._enforce_limit()
+
+    def _join_parts(self):
+        if self._parts:
+            self._parts.insert(0, self._chunks[-1])
+            self._chunks[-1] = ''.join(self._parts)
+            self._parts = []
+
+    def __iter__(self):
+        self._join_parts()
+        yield from self._head
+        if self.omitted:
+            yield '\n[byexample: output truncated, %i characters omitted]\n' % self.omitted
+        yield from self._chunks
+
+    def tail(self, n):
+        ''' Return the last <n> characters (not including the ones
+            omitted).'''
+        self._join_parts()
+        parts, size = [], 0
+        for chunk in reversed(self._chunks):
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= n:
+                return ''.join(reversed(parts))[-n:]
+
+        return ''.join(self)[-n:]
+
+    def _enforce_limit(self):
+        limit = self.limit
+        if limit is None or (self._spill is None and self._size <= limit):
+            return
+
+        self._join_parts()
+        chunks = self._chunks
+        if self._spill is None:
+            # first time exceeding the limit: move the first half
+            # to the head where it will stay
+            self._spill = tempfile.NamedTemporaryFile(
+                'wt',
+                prefix='byexample-output-',
+                suffix='.txt',
+                encoding='utf-8',
+                errors='surrogateescape',
+                delete=False
+            )
+            left = limit // 2
+            while left > 0:
+                chunk = chunks.popleft()
+                if len(chunk) > left:
+                    chunks.appendleft(chunk[left:])
+                    chunk = chunk[:left]
+
+                self._head.append(chunk)
+                self._spill.write(chunk)
+                self._size -= len(chunk)
+                left -= len(chunk)
+
+        # the rest is the tail: keep only the last half
+        excess = self._size - (limit - limit // 2)
+        while excess > 0:
+            chunk = chunks.popleft()
+            if len(chunk) > excess:
+                chunks.appendleft(chunk[excess:])
+                chunk = chunk[:excess]
+
+            self._spill.write(chunk)
+            self._size -= len(chunk)
+            self.omitted += len(chunk)
+            excess -= len(chunk)
+
+    def clear(self):
+        ''' Discard the output. If some output was truncated, return
+            the name of the file where the whole output was saved.'''
+        self._join_parts()
+        filename = None
+        if self._spill is not None:
+            for chunk in self._chunks:
+                self._spill.write(chunk)
+            self._spill.close()
+            filename = self._spill.name
+
+        self._head = []
+        self._chunks.clear()
+        self._size = 0
+        self._spill = None
+        self.omitted = 0
+        return filename
+
+
+_regex_special = set('.^$*+?{}[]\\|()')
+
+
+def _has_top_level_alternation(pattern):
+    depth, in_class, i = 0, False, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+
+        if in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return True
+        i += 1
+
+    return False
+
+
+@functools.lru_cache(maxsize=128)
+def _literal_prefix_of(pattern, flags=0):
+    r''' Return the literal string that any match of the regex
+        <pattern> must begin with (or an empty string if there
+        is none).
+
+        >>> from byexample.runner import _literal_prefix_of as lp
+        >>> lp(r'/byexample/sh/ps\d+> ')
+        '/byexample/sh/ps'
+        >>> lp(r'\[cling\][$!](?: \?)?')
+        '[cling]'
+        >>> lp(r'ab*c'), lp(r'ab+c'), lp(r'ab|c'), lp(r'(?:ab)')
+        ('a', 'ab', '', '')
+        '''
+    if flags & (re.IGNORECASE | re.VERBOSE):
+        return ''
+
+    if _has_top_level_alternation(pattern):
+        return ''
+
+    literal, i = [], 0
+    while i < len(pattern):
+        c, step = pattern[i], 1
+        if c == '\\':
+            c, step = pattern[i + 1:i + 2], 2
+            if not c or c.isalnum() or c == '_':
+                break  # a class like \d, a backreference, ...
+        elif c in _regex_special:
+            break
+
+        # a quantifier makes the char optional (or repeated)
+        quantifier = pattern[i + step:i + step + 1]
+        if quantifier and quantifier in '*?{':
+            break
+
+        literal.append(c)
+        if quantifier == '+':
+            break
+
+        i += step
+
+    return ''.join(literal)
+
+
+class PromptSearcher(object):
+    r''' Search the prompts (or any other regex) in the output of
+        the interpreter like pexpect's searcher_re does but only in
+        the output that has just arrived plus the last <window>
+        characters read before.
+
+        pexpect's searcher_re searches in all the output read so far
+        on each read, which it is quadratic for large outputs.
+
+        Each regex is searched looking for its literal prefix first
+        (if it has one) and then trying to match the regex there.
+
+        >>> from byexample.runner import PromptSearcher
+        >>> import pexpect, re
+        >>> searcher = PromptSearcher(
+        ...     [re.compile(r'/byexample/sh/ps\d+> '), pexpect.TIMEOUT, 'foo'],
+        ...     window=32)
+        >>> searcher.timeout_index, searcher.eof_index
+        (1, -1)
+
+        >>> output = 'some output /byexample/sh/ps2> foo'
+        >>> searcher.search(output, freshlen=len(output))
+        0
+        >>> searcher.match.group(), searcher.start
+        ('/byexample/sh/ps2> ', 12)
+
+        Only the fresh output and the window before it are searched:
+
+        >>> output = 'foo' + (' ' * 32) + 'bar'
+        >>> searcher.search(output, freshlen=3)
+        -1
+        '''
+    def __init__(self, patterns, window):
+        self.eof_index = -1
+        self.timeout_index = -1
+
+        self._searches = []
+        for index, pattern in enumerate(patterns):
+            if pattern is pexpect.EOF:
+                self.eof_index = index
+            elif pattern is pexpect.TIMEOUT:
+                self.timeout_index = index
+            else:
+                if isinstance(pattern, str):
+                    pattern = re.compile(pattern)
+
+                prefix = _literal_prefix_of(pattern.pattern, pattern.flags)
+                self._searches.append((index, pattern, prefix))
+
+        # only this amount of characters (besides the fresh ones)
+        # are searched on each read
+        self.window = window
+
+    def _search_one(self, regex, prefix, buffer, begin):
+        if not prefix:
+            return regex.search(buffer, begin)
+
+        pos = buffer.find(prefix, begin)
+        while pos != -1:
+            match = regex.match(buffer, pos)
+            if match:
+                return match
+            pos = buffer.find(prefix, pos + 1)
+
+        return None
+
+    def search(self, buffer, freshlen):
+        begin = max(0, len(buffer) - freshlen - self.window)
+
+        best_index, best_match = -1, None
+        for index, regex, prefix in self._searches:
+            match = self._search_one(regex, prefix, buffer, begin)
+            if match and (
+                best_match is None or match.start() < best_match.start()
+            ):
+                best_index, best_match = index, match
+
+        if best_match is None:
+            return -1
+
+        self.match = best_match
+        self.start, self.end = best_match.start(), best_match.end()
+        return best_index
+
+
 class PexpectMixin(object):
     def __init__(self, PS1_re, any_PS_re):
         self.PS1_re = re.compile(PS1_re)
         self.any_PS_re = re.compile(any_PS_re)
 
-        self.output_between_prompts = []
+        self.output_between_prompts = OutputBuffer()
         self.last_output_may_be_incomplete = False
 
     def _spawn_interpreter(
@@ -104,13 +507,7 @@ class PexpectMixin(object):
         env.update({'LINES': str(rows), 'COLUMNS': str(cols)})
 
         self._drop_output()  # there shouldn't be any output yet but...
-        self.interpreter = pexpect.spawn(
-            cmd,
-            echo=False,
-            encoding=self.encoding,
-            dimensions=(rows, cols),
-            env=env
-        )
+        self.interpreter = self._pexpect_spawn(cmd, rows, cols, env)
         self.interpreter.delaybeforesend = options['x']['delaybeforesend']
         self.interpreter.delayafterread = None
 
@@ -125,6 +522,22 @@ class PexpectMixin(object):
             )
             self._drop_output()  # discard banner and things like that
 
+    def _pexpect_spawn(self, cmd, rows, cols, env):
+        ''' Start the interpreter and return a pexpect's spawn-like
+            object connected to it.
+
+            By default run <cmd> in a new pseudo terminal but you may
+            want to override this to obtain the interpreter in a different
+            way.
+            '''
+        return pexpect.spawn(
+            cmd,
+            echo=False,
+            encoding=self.encoding,
+            dimensions=(rows, cols),
+            env=env
+        )
+
     def interact(
         self,
         send='\n',
@@ -158,14 +571,27 @@ class PexpectMixin(object):
         raise NotImplementedError()  # pragma: no cover
 
     def _drop_output(self):
-        self.output_between_prompts = []
+        filename = self.output_between_prompts.clear()
         self.last_output_may_be_incomplete = False
 
+        if filename is not None:
+            clog().warn(
+                "The output was too long and it was truncated (see +output-limit); the whole output was saved in '%s'.",
+                filename
+            )
+
     def _shutdown_interpreter(self):
-        self.interpreter.sendeof()
-        self.interpreter.close()
+        # a new interpreter may be spawned while the old one is being
+        # shutdown in background so do not touch self.interpreter there
+        interpreter, self.interpreter = self.interpreter, None
+        reap_in_background(self._close_and_terminate, interpreter)
+
+    @staticmethod
+    def _close_and_terminate(interpreter):
+        interpreter.sendeof()
+        interpreter.close()
         time.sleep(0.001)
-        self.interpreter.terminate(force=True)
+        interpreter.terminate(force=True)
 
     def _exec_and_wait(self, source, options, *, from_example=None, **kargs):
         if from_example is None:
@@ -180,17 +606,25 @@ class PexpectMixin(object):
 
         countdown = Countdown(timeout)
         lines = source.split('\n')
-        for line in lines[:-1]:
-            self.interpreter.sendline(line)
+        if options['batch_send'] and not input_list:
+            # typing requires to wait each prompt before sending
+            # the next line; this is not the case
+            self._send_in_batches_and_wait(lines, options, countdown)
+        else:
+            for line in lines[:-1]:
+                self.interpreter.sendline(line)
+                self._expect_prompt_or_type(
+                    options, countdown, input_list=input_list
+                )
+
+            self.interpreter.sendline(lines[-1])
             self._expect_prompt_or_type(
-                options, countdown, input_list=input_list
+                options,
+                countdown,
+                prompt_re=self.PS1_re,
+                input_list=input_list
             )
 
-        self.interpreter.sendline(lines[-1])
-        self._expect_prompt_or_type(
-            options, countdown, prompt_re=self.PS1_re, input_list=input_list
-        )
-
         if input_list:
             s = short_string(input_list[0][-1])
             if len(input_list) > 1:
@@ -204,6 +638,43 @@ class PexpectMixin(object):
 
         return self._get_output(options)
 
+    # max count of characters sent at once by _send_in_batches_and_wait;
+    # keep it below the size of the terminal's input buffer
+    # (4096 bytes in Linux) or the interpreter may not be able to
+    # read the whole batch.
+    batch_send_max_size = 1024
+
+    def _send_in_batches_and_wait(self, lines, options, countdown):
+        ''' Send several <lines> at once and then wait for one prompt
+            per line sent: any prompt for all the lines except for the
+            last one where we wait for the PS1 prompt.
+
+            This saves a round trip per line but it is only possible
+            if we don't need to type anything in the middle.
+            '''
+        linesep = self.interpreter.linesep
+        max_size = self.batch_send_max_size
+
+        begin, end = 0, 0
+        while begin < len(lines):
+            # take as many lines as they fit in a batch (at least one)
+            size = 0
+            while end < len(lines) and (
+                end == begin or size + len(lines[end]) < max_size
+            ):
+                size += len(lines[end]) + len(linesep)
+                end += 1
+
+            self.interpreter.send(
+                ''.join(line + linesep for line in lines[begin:end])
+            )
+
+            for i in range(begin, end):
+                prompt_re = self.PS1_re if i == len(lines) - 1 else None
+                self._expect_prompt(options, countdown, prompt_re)
+
+            begin = end
+
     def _create_terminal(self, options):
         rows, cols = options['geometry']
 
@@ -307,7 +778,7 @@ class PexpectMixin(object):
             # echo-emulation (TODO: some interpreters have echo activated,
             # should this be necessary?)
             chunk = "{}[{}]\n".format(self.interpreter.match.group(), input)
-            self.output_between_prompts[-1] += chunk
+            self.output_between_prompts.extend(chunk)
             assert self.last_output_may_be_incomplete
 
             self.interpreter.sendline(input)
@@ -356,19 +827,17 @@ class PexpectMixin(object):
         if earlier_re is None:
             del expect[-1]
 
+        self.output_between_prompts.limit = options.get('output_limit', None)
+
         countdown.start()
-        what = self.interpreter.expect(expect, timeout=timeout)
+        what = self._expect_keeping_tail(expect, timeout, Timeout)
         countdown.stop()
 
-        output = self.interpreter.before
-        if self.last_output_may_be_incomplete:
-            self.output_between_prompts[-1] += output
-        else:
-            self.output_between_prompts.append(output)
+        self._collect_output(self.interpreter.before)
 
         if what == Timeout:
             msg = "Prompt not found: the code is taking too long to finish or there is a syntax error.\nLast 1000 bytes read:\n%s"
-            msg = msg % ''.join(self.output_between_prompts)[-1000:]
+            msg = msg % self.output_between_prompts.tail(1000)
             out = self._get_output(options)
             raise TimeoutException(msg, out)
 
@@ -379,6 +848,88 @@ class PexpectMixin(object):
         self.last_output_may_be_incomplete = False
         return True
 
+    # only the last characters read are kept while waiting for a prompt
+    # in case that the prompt is still arriving; the rest is moved to
+    # self.output_between_prompts (where it is bounded, see OutputBuffer)
+    # once there are at least <expect_move> of them.
+    # The kept characters are also searched again on each read
+    # (see PromptSearcher)
+    expect_keep = 4096
+    expect_move = 256 * 1024
+
+    def _expect_keeping_tail(self, expect, timeout, Timeout):
+        ''' Wait for any of the <expect> regexs like pexpect's expect does
+            and return the index of the one found.
+
+            The output is read with pexpect's read_nonblocking but it is
+            kept here, not in pexpect, so the older output can be moved to
+            self.output_between_prompts as it arrives.
+
+            Like pexpect, the output before the match is left in the
+            interpreter's 'before' and the output after it in its 'buffer'
+            for the next call.
+            '''
+        searcher = PromptSearcher(expect, window=self.expect_keep)
+        interpreter = self.interpreter
+        keep = self.expect_keep
+
+        # the output read in a previous call but not consumed yet
+        window = interpreter.buffer
+        freshlen = len(window)
+        interpreter.buffer = window[:0]
+
+        # output older than the window not moved yet
+        older, older_size = [], 0
+
+        deadline = time.time() + timeout
+        while True:
+            what = searcher.search(window, freshlen)
+            if what >= 0:
+                if older:
+                    self._collect_output(''.join(older))
+                    self.last_output_may_be_incomplete = True
+
+                interpreter.before = window[:searcher.start]
+                interpreter.after = window[searcher.start:searcher.end]
+                interpreter.match = searcher.match
+                interpreter.match_index = what
+                interpreter.buffer = window[searcher.end:]
+                return what
+
+            if len(window) > 2 * keep:
+                older.append(window[:-keep])
+                older_size += len(older[-1])
+                window = window[-keep:]
+
+                if older_size >= self.expect_move:
+                    self._collect_output(''.join(older))
+                    self.last_output_may_be_incomplete = True
+                    older, older_size = [], 0
+
+            try:
+                data = interpreter.read_nonblocking(
+                    interpreter.maxread, max(deadline - time.time(), 0)
+                )
+            except (pexpect.TIMEOUT, pexpect.EOF) as e:
+                interpreter.before = ''.join(older) + window
+                interpreter.match = interpreter.after = type(e)
+                index = searcher.timeout_index if isinstance(
+                    e, pexpect.TIMEOUT
+                ) else searcher.eof_index
+                if index < 0:
+                    raise
+                interpreter.match_index = index
+                return index
+
+            window += data
+            freshlen = len(data)
+
+    def _collect_output(self, output):
+        if self.last_output_may_be_incomplete:
+            self.output_between_prompts.extend(output)
+        else:
+            self.output_between_prompts.append(output)
+
     def _get_output(self, options):
         if options['term'] == 'dumb':
             out = self._emulate_dumb_terminal(self.output_between_prompts)
@@ -537,3 +1088,188 @@ class PexpectMixin(object):
                 self._drop_output()
 
         return good
+
+
+class PipeMixin(object):
+    ''' Drive the interpreter through plain pipes instead of a
+        pseudo terminal (see PexpectMixin).
+
+        There are no prompts to wait for: after sending the example's
+        source, a command to print a unique sentinel is sent and
+        the output of the example is everything before the sentinel.
+
+        <sentinel_cmd> is the command that prints the sentinel and
+        it must have a single %s where the sentinel goes.
+
+        <transport_flag> is the option that selects the pipes, used
+        in the error messages.
+        '''
+    def __init__(self, sentinel_cmd, transport_flag):
+        self.sentinel_cmd = sentinel_cmd
+        self.transport_flag = transport_flag
+        self._pipe_process = None
+
+    def _pipe_spawn_interpreter(self, cmd, options, env={}):
+        rows, cols = options['geometry']
+
+        env = dict(os.environ, LINES=str(rows), COLUMNS=str(cols), **env)
+        self._pipe_process = subprocess.Popen(
+            shlex.split(cmd),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+            bufsize=0
+        )
+
+        self._pipe_decoder = codecs.getincrementaldecoder(self.encoding)()
+        self._pipe_pending = ''
+        self._pipe_sentinel_prefix = '/byexample/%s/' % uuid.uuid4().hex
+        self._pipe_sentinel_cnt = 0
+
+        self._screen = Screen(cols, rows)
+        self._stream = Stream(self._screen)
+
+        # discard banner and things like that
+        self._pipe_exec_and_wait(
+            '', options, timeout=options['x']['dfl_timeout']
+        )
+
+    def _pipe_exec_and_wait(
+        self, source, options, *, from_example=None, **kargs
+    ):
+        if from_example is not None and \
+                (options['input'] or from_example.input_list):
+            # without a terminal there is no prompt to wait for before
+            # typing: the example would run without its input
+            raise Exception(
+                "Typing (+input) is not supported with pipes: remove the +input or set %s=pty."
+                % self.transport_flag
+            )
+
+        timeout = kargs.get('timeout', options['timeout'])
+
+        self._pipe_sentinel_cnt += 1
+        sentinel = '%s%i' % (
+            self._pipe_sentinel_prefix, self._pipe_sentinel_cnt
+        )
+
+        data = '%s\n%s\n' % (source, self.sentinel_cmd % sentinel)
+        out = self._pipe_send_and_read_until(
+            data.encode(self.encoding), sentinel + '\n', options,
+            Countdown(timeout)
+        )
+        return self._pipe_get_output(out, options)
+
+    def _pipe_send_and_read_until(self, data, sentinel, options, countdown):
+        ''' Send <data> to the interpreter and read from it until
+            the <sentinel> is found.
+
+            Return the output before the sentinel and keep anything
+            after it for the next read.
+
+            Raise a timeout if the sentinel is not found in time.
+            '''
+        infd = self._pipe_process.stdin.fileno()
+        outfd = self._pipe_process.stdout.fileno()
+
+        chunks = []
+        incoming, self._pipe_pending = self._pipe_pending, ''
+
+        # search the sentinel only in the new chunk read plus the
+        # last few characters before it (the sentinel may had been split)
+        tail = ''
+        size = 0  # count of characters read before the current chunk
+        while True:
+            if incoming:
+                chunks.append(incoming)
+                window = tail + incoming
+                idx = window.find(sentinel)
+                if idx != -1:
+                    idx += size - len(tail)  # position in the joined chunks
+                    break
+                tail = window[-len(sentinel):]
+                size += len(incoming)
+                incoming = ''
+
+            timeout = countdown.left()
+            countdown.start()
+            readables, writables, _ = select.select(
+                [outfd], [infd] if data else [], [], timeout
+            )
+            countdown.stop()
+
+            if not readables and not writables:
+                out = ''.join(chunks)
+                msg = "Sentinel not found: the code is taking too long to finish.\nLast 1000 bytes read:\n%s"
+                msg = msg % out[-1000:]
+                raise TimeoutException(
+                    msg, self._pipe_get_output(out, options)
+                )
+
+            if writables:
+                # writing up to PIPE_BUF bytes to a pipe ready for
+                # writing never blocks
+                n = os.write(infd, data[:select.PIPE_BUF])
+                data = data[n:]
+
+            if readables:
+                raw = os.read(outfd, 4096)
+                if not raw:
+                    raise EOFError(
+                        "The interpreter finished unexpectedly. Last 1000 bytes read:\n%s"
+                        % ''.join(chunks)[-1000:]
+                    )
+                incoming = self._pipe_decoder.decode(raw)
+
+        out = ''.join(chunks)
+        self._pipe_pending = out[idx + len(sentinel):]
+        out = out[:idx]
+        return out
+
+    def _pipe_get_output(self, out, options):
+        if options['term'] == 'dumb':
+            out = PexpectMixin._universal_new_lines(out).expandtabs(8)
+            return '\n'.join(line.rstrip() for line in out.split('\n'))
+        elif options['term'] == 'ansi':
+            self._stream.feed(out)
+            lines = self._screen.display
+            self._screen.reset()
+            return '\n'.join(line.rstrip() for line in lines)
+        elif options['term'] == 'as-is':
+            return PexpectMixin._universal_new_lines(out)
+        else:
+            raise TypeError(
+                "Unknown terminal type '+term=%s'." % options['term']
+            )
+
+    def _pipe_shutdown_interpreter(self):
+        process, self._pipe_process = self._pipe_process, None
+        reap_in_background(self._pipe_close_and_wait, process)
+
+    @staticmethod
+    def _pipe_close_and_wait(process):
+        try:
+            process.stdin.close()
+            process.wait(timeout=0.1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        finally:
+            process.stdout.close()
+
+    def _pipe_abort(self, example, options):
+        ''' Interrupt the interpreter (SIGINT) and wait for a new
+            sentinel to be sure that we are in sync again.
+
+            Return False if we couldn't get the sentinel back.
+            '''
+        self._pipe_process.send_signal(signal.SIGINT)
+        try:
+            self._pipe_exec_and_wait(
+                '', options, timeout=options['x']['dfl_timeout']
+            )
+            return True
+        except TimeoutException:
+            return False
+
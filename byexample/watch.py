@@ -0,0 +1,362 @@
+from __future__ import unicode_literals
+import os, time, select, struct
+from .log import clog
+from .finder import declared_inputs
+
+try:
+    import ctypes, ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    inotify_available = hasattr(_libc, 'inotify_init1')
+except Exception:
+    inotify_available = False
+
+# see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+
+_event_header = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class FileWatcher(object):
+    r''' Wait until any of the watched files changes.
+
+        On Linux, inotify is used. Otherwise (or if <polling> is True)
+        the files are polled every <interval> seconds.
+
+        >>> from byexample.watch import FileWatcher
+        >>> import tempfile, os
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> foo, bar = os.path.join(tmpdir, 'foo'), os.path.join(tmpdir, 'bar')
+        >>> for filename in (foo, bar):
+        ...     with open(filename, 'wt') as f:
+        ...         _ = f.write('hello')
+
+        >>> watcher = FileWatcher(polling=True, interval=0.01)
+        >>> watcher.watch([foo, bar])
+
+        Nothing changed so far:
+
+        >>> watcher.wait(timeout=0.05)
+        set()
+
+        But as soon as a file is modified, wait returns it:
+
+        >>> with open(bar, 'wt') as f:
+        ...     _ = f.write('hello world')
+        >>> watcher.wait(timeout=2) == {bar}
+        True
+
+        >>> watcher.close()
+
+        On Linux the changes are notified by inotify. The editors usually
+        save a file writing a new one and renaming it, this is a change
+        too; the changes of the files not watched are ignored:
+
+        >>> from byexample.watch import inotify_available
+        >>> print('yes' if inotify_available else '')
+        <inotify>
+
+        >>> watcher = FileWatcher(interval=0.01)
+        >>> watcher                                 # byexample: +if=inotify
+        File Watcher (inotify)
+
+        >>> watcher.watch([foo])
+
+        >>> other, tmp = os.path.join(tmpdir, 'other'), os.path.join(tmpdir, 'foo~')
+        >>> for filename in (other, tmp):
+        ...     with open(filename, 'wt') as f:
+        ...         _ = f.write('bye bye')
+        >>> watcher.wait(timeout=0.05)
+        set()
+
+        >>> os.rename(tmp, foo)
+        >>> watcher.wait(timeout=2) == {foo}
+        True
+
+        >>> watcher.close()
+        >>> import shutil
+        >>> shutil.rmtree(tmpdir)
+        '''
+    def __init__(self, polling=False, interval=0.5, settle=0.1):
+        self.interval = interval
+
+        # wait this amount of seconds after a change to collect
+        # the rest of the changes (editors may write a file in
+        # several steps)
+        self.settle = settle
+
+        self.filenames = set()
+        self._stamps = {}
+
+        self._fd = None
+        self._dirs = {}  # watch descriptor -> directory
+        if not polling and inotify_available:
+            fd = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+            else:
+                clog().info(
+                    "inotify is not available (errno %i), polling instead.",
+                    ctypes.get_errno()
+                )
+
+    def __repr__(self):
+        return 'File Watcher (%s)' % (
+            'inotify' if self._fd is not None else 'polling'
+        )
+
+    def watch(self, filenames):
+        ''' Watch these <filenames> too. '''
+        for filename in filenames:
+            filename = os.path.abspath(filename)
+            if filename in self.filenames:
+                continue
+
+            self.filenames.add(filename)
+            self._stamps[filename] = self._stamp_of(filename)
+
+            # watch the directory and not the file: the editors
+            # usually save a file writing a new one and renaming it
+            dirname = os.path.dirname(filename)
+            if self._fd is not None and dirname not in self._dirs.values():
+                mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+                wd = _libc.inotify_add_watch(
+                    self._fd, os.fsencode(dirname), mask
+                )
+                if wd < 0:
+                    clog().warn(
+                        "Directory '%s' cannot be watched (errno %i).",
+                        dirname, ctypes.get_errno()
+                    )
+                    continue
+                self._dirs[wd] = dirname
+
+    def _stamp_of(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _changed_by_polling(self):
+        changed = set()
+        for filename in self.filenames:
+            stamp = self._stamp_of(filename)
+            if stamp != self._stamps[filename]:
+                self._stamps[filename] = stamp
+                changed.add(filename)
+        return changed
+
+    def _changed_by_inotify(self, timeout):
+        changed = set()
+        readables, _, _ = select.select([self._fd], [], [], timeout)
+        if not readables:
+            return changed
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, namelen = _event_header.unpack_from(data, offset)
+            offset += _event_header.size
+            name = data[offset:offset + namelen].rstrip(b'\0')
+            offset += namelen
+
+            dirname = self._dirs.get(wd)
+            if dirname is None or not name:
+                continue
+
+            filename = os.path.join(dirname, os.fsdecode(name))
+            if filename in self.filenames:
+                changed.add(filename)
+
+        # do not report a file if its content did not change
+        # (it was written with the same content for example)
+        for filename in list(changed):
+            stamp = self._stamp_of(filename)
+            if stamp == self._stamps[filename]:
+                changed.discard(filename)
+            self._stamps[filename] = stamp
+
+        return changed
+
+    def _changed(self, timeout):
+        if self._fd is not None:
+            return self._changed_by_inotify(timeout)
+
+        time.sleep(timeout)
+        return self._changed_by_polling()
+
+    def wait(self, timeout=None):
+        ''' Block until one or more watched files change and return them
+            (their absolute paths) or return an empty set if <timeout>
+            seconds elapsed without changes.
+            '''
+        begin = time.time()
+        changed = set()
+        while not changed:
+            step = self.interval
+            if timeout is not None:
+                step = min(step, max(timeout - (time.time() - begin), 0))
+
+            changed = self._changed(step)
+            if not changed and timeout is not None and \
+                    time.time() - begin >= timeout:
+                return changed
+
+        # collect any other change that follows the first one
+        more = self._changed(self.settle)
+        while more:
+            changed |= more
+            more = self._changed(self.settle)
+
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def dependencies_of(harvester, filename):
+    ''' Return the files that the examples in <filename> depend on
+        (see the +depends-on option) or None if the examples could
+        not be found.
+        '''
+    try:
+        with harvester.examples_cache.synced(label=filename):
+            examples = harvester.get_examples_from_file(filename)
+    except Exception as err:
+        clog().warn(
+            "The dependencies of '%s' could not be found: %s", filename, err
+        )
+        return None
+
+    files, _ = declared_inputs(examples)
+    return files
+
+
+class ChangedFiles(object):
+    ''' Callable that blocks until one or more of the <testfiles>
+        or their dependencies change and returns the <testfiles> that
+        need to be run again.
+
+        Meant to be used as the next_items of Jobs.run_and_watch.
+
+        >>> from byexample.log import init_log_system
+        >>> init_log_system()
+
+        >>> from byexample.watch import ChangedFiles
+        >>> from byexample.finder import _build_fake_example
+        >>> from byexample.options import Options
+        >>> import contextlib
+
+        A fake harvester where a.md depends on data.txt and b.md on nothing.
+        A file in <broken> cannot be read:
+
+        >>> class Harvester:
+        ...     class examples_cache:
+        ...         synced = staticmethod(lambda label: contextlib.nullcontext())
+        ...     deps = {'/docs/a.md': ['/docs/data.txt'], '/docs/b.md': []}
+        ...     broken = set()
+        ...     def get_examples_from_file(self, filename):
+        ...         if filename in self.broken:
+        ...             raise Exception("Invalid syntax")
+        ...         opts = Options({'depends_on': self.deps[filename]})
+        ...         return [_build_fake_example('f()', '', fully_parsed=False, opts=opts)]
+
+        And a fake watcher that returns the changes that we want:
+
+        >>> class Watcher:
+        ...     filenames, changes = set(), []
+        ...     def watch(self, filenames):
+        ...         self.filenames.update(filenames)
+        ...     def wait(self):
+        ...         return self.changes.pop(0)
+
+        >>> harvester, watcher = Harvester(), Watcher()
+        >>> changed_files = ChangedFiles(['/docs/a.md', '/docs/b.md'], harvester, watcher)
+        >>> sorted(watcher.filenames)
+        ['/docs/a.md', '/docs/b.md', '/docs/data.txt']
+
+        A change in a dependency reruns the files that depend on it;
+        a change in a test file reruns it:
+
+        >>> watcher.changes = [{'/docs/data.txt'}, {'/docs/b.md'}]
+        >>> changed_files(0)
+        [i] Watching 3 files for changes (ctrl-c to stop).
+        ['/docs/a.md']
+
+        >>> changed_files(0)
+        [i] Watching 3 files for changes (ctrl-c to stop).
+        ['/docs/b.md']
+
+        The changes in files that do not matter are ignored:
+
+        >>> watcher.changes = [{'/docs/unknown.txt'}, {'/docs/b.md'}]
+        >>> changed_files(0)
+        [i] Watching 3 files for changes (ctrl-c to stop).
+        ['/docs/b.md']
+
+        If a test file cannot be read, it is rerun anyways (to show the
+        error) and its previous dependencies are still watched:
+
+        >>> harvester.broken.add('/docs/a.md')
+        >>> watcher.changes = [{'/docs/a.md'}, {'/docs/data.txt'}]
+        >>> changed_files(0)
+        [i] Watching 3 files for changes (ctrl-c to stop).
+        [w] The dependencies of '/docs/a.md' could not be found: Invalid syntax
+        ['/docs/a.md']
+
+        >>> changed_files(0)
+        [i] Watching 3 files for changes (ctrl-c to stop).
+        ['/docs/a.md']
+        '''
+    def __init__(self, testfiles, harvester, watcher=None):
+        self.testfiles = testfiles
+        self.harvester = harvester
+        self.watcher = FileWatcher() if watcher is None else watcher
+
+        self.deps = {}
+        for testfile in testfiles:
+            self._update_dependencies_of(testfile)
+
+    def _update_dependencies_of(self, testfile):
+        deps = dependencies_of(self.harvester, testfile)
+        if deps is None:
+            # keep watching the previous ones until the file is fixed
+            deps = self.deps.get(testfile, set())
+
+        deps = set(os.path.abspath(d) for d in deps)
+        self.deps[testfile] = deps
+
+        self.watcher.watch([testfile])
+        self.watcher.watch(deps)
+
+    def __call__(self, exit_status):
+        clog().note(
+            "Watching %i files for changes (ctrl-c to stop).",
+            len(self.watcher.filenames)
+        )
+        while True:
+            changed = self.watcher.wait()
+
+            rerun = []
+            for testfile in self.testfiles:
+                if os.path.abspath(testfile) in changed:
+                    # the +depends-on options may had changed too
+                    self._update_dependencies_of(testfile)
+                    rerun.append(testfile)
+                elif self.deps[testfile] & changed:
+                    rerun.append(testfile)
+
+            if rerun:
+                clog().chat("Files changed: %s.", ', '.join(sorted(changed)))
+                return rerun
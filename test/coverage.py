@@ -1,4 +1,5 @@
 from byexample.concern import Concern
+from byexample.options import Options
 import coverage
 
 class ByexampleCoverage(Concern):
@@ -8,25 +9,32 @@ class ByexampleCoverage(Concern):
         pass
 
     def start(self, examples, runners, filepath, options):
-        self.runners = runners
-        self.options = options
-        for runner in runners:
-            if runner.language == 'python':
-                coverage_start_code = r'''
+        # the runners are not initialized yet: the coverage is started
+        # once the Python runner is up (see event), perhaps from another
+        # thread so keep a copy of the options of the file
+        self.runner = None
+        self.options = Options(options.as_dict())
+
+    def event(self, what, runner=None, error=None, **unused):
+        if what not in ('finish_initialize', 'finish_reset'):
+            return
+
+        if error is not None or runner.language != 'python':
+            return
+
+        coverage_start_code = r'''
 from coverage import Coverage as _cov_class
 _cov_instance = _cov_class(source=['byexample'], auto_data=True)
 _cov_instance.start()
 '''
-                runner._exec_and_wait(coverage_start_code, options, timeout=10)
-                break
+        runner._exec_and_wait(coverage_start_code, self.options, timeout=10)
+        self.runner = runner
 
 
     def finish(self, *args):
-        for runner in self.runners:
-            if runner.language == 'python':
-                coverage_end_code = r'''
+        if self.runner is not None:
+            coverage_end_code = r'''
 _cov_instance.stop()
 _cov_instance.save()
 '''
-                runner._exec_and_wait(coverage_end_code, self.options, timeout=10)
-                break
+            self.runner._exec_and_wait(coverage_end_code, self.options, timeout=10)
@@ -0,0 +1,18 @@
+from byexample.concern import Concern
+from byexample.options import Options
+
+
+class InjectCode(Concern):
+    target = 'inject-code'
+
+    def __init__(self, **unused):
+        pass
+
+    def start(self, examples, runners, filepath, options):
+        self.options = Options(options.as_dict())
+
+    def event(self, what, runner=None, error=None, **unused):
+        # the runner is up here, not in start
+        if what in ('finish_initialize', 'finish_reset') and \
+                error is None and runner.language == 'python':
+            runner._exec_and_wait('injected = 42\n', self.options, timeout=10)